@@ -0,0 +1,58 @@
+"""
+Benchmark for text/binary classification of a large synthetic tree.
+
+Classifies every file of a generated tree several times in a row, the way
+repeated tree refreshes do, and reports the cost of the cold first pass
+against the warm passes that are answered from the verdict cache.
+
+Usage:
+    python benchmarks/bench_classifier.py [--files N] [--passes N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from codestract.utils.file_utils import is_text_file
+
+
+def generate_tree(root: str, file_count: int) -> list:
+    """Create a flat-ish tree of small text and binary files."""
+    paths = []
+    for i in range(file_count):
+        directory = os.path.join(root, f"d{i % 500:03d}")
+        os.makedirs(directory, exist_ok=True)
+        if i % 10 == 0:
+            path = os.path.join(directory, f"blob{i}.data")
+            payload = bytes(range(256))
+        else:
+            path = os.path.join(directory, f"module{i}.py")
+            payload = b"def f():\n    return 1\n" * 8
+        with open(path, "wb") as f:
+            f.write(payload)
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--passes", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        print(f"Generating {args.files:,} files...")
+        paths = generate_tree(root, args.files)
+
+        for index in range(args.passes):
+            start = time.perf_counter()
+            text_count = sum(1 for path in paths if is_text_file(path))
+            elapsed = time.perf_counter() - start
+            label = "cold" if index == 0 else "warm"
+            print(f"pass {index + 1} ({label}): {elapsed:.3f}s, {text_count:,} text files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark and check for exports of a git revision.
+
+Generates a repository in which many paths share blobs, as empty
+``__init__.py`` files and copied modules do, commits it, then times
+``codestract export --rev`` and checks that every exported entry holds the
+contents ``git show <rev>:<path>`` gives for its path. Exits with status 1
+if any entry differs.
+
+Usage:
+    python benchmarks/bench_git_export.py [--files N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from codestract.headless import run_export
+
+_ENTRY = re.compile(
+    rb"^={80}\n# File: (?P<path>[^\n]*)\n(?P<meta>(?:# [^\n]*\n)*?)={80}\n\n", re.MULTILINE
+)
+_SIZE = re.compile(rb"^# Size: ([\d,]+) bytes", re.MULTILINE)
+_DUPLICATE = re.compile(rb"^# Duplicate of: ([^\n]*)", re.MULTILINE)
+
+
+def _git(repo: str, *args: str) -> bytes:
+    return subprocess.run(["git", "-C", repo, *args], check=True, stdout=subprocess.PIPE).stdout
+
+
+def generate_repo(root: str, file_count: int) -> None:
+    """Create and commit a tree in which about half the paths share a blob."""
+    for i in range(file_count):
+        directory = os.path.join(root, f"pkg{i % 20:02d}", f"mod{i % 5}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "__init__.py"), "wb"):
+            pass
+        # Every other module is a copy of one of a few shared ones
+        variant = i % 7 if i % 2 else i
+        with open(os.path.join(directory, f"file{i}.py"), "wb") as f:
+            f.write(b"".join(b"value_%d = %d\n" % (variant, line) for line in range(40)))
+    _git(root, "init", "-q")
+    _git(root, "add", "-A")
+    _git(
+        root,
+        "-c",
+        "user.name=bench",
+        "-c",
+        "user.email=bench@example.com",
+        "commit",
+        "-q",
+        "-m",
+        "Generated tree",
+    )
+
+
+def exported_contents(export_file: str) -> Dict[str, bytes]:
+    """Get the contents of every entry of an export by path."""
+    with open(export_file, "rb") as f:
+        data = f.read()
+    contents: Dict[str, bytes] = {}
+    for entry in _ENTRY.finditer(data):
+        path = entry.group("path").decode()
+        duplicate = _DUPLICATE.search(entry.group("meta"))
+        if duplicate is not None:
+            contents[path] = contents[duplicate.group(1).decode()]
+            continue
+        size = int(_SIZE.search(entry.group("meta")).group(1).replace(b",", b""))
+        contents[path] = data[entry.end() : entry.end() + size]
+    return contents
+
+
+def main() -> None:
+    """Run the benchmark and check the export."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        repo = os.path.join(root, "repo")
+        print(f"Generating and committing {args.files:,} modules...")
+        generate_repo(repo, args.files)
+        output = os.path.join(root, "export.txt")
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_export(repo, output=output, revision="HEAD")
+        elapsed = time.perf_counter() - start
+        print(f"codestract export --rev HEAD: {elapsed:.3f}s")
+
+        contents = exported_contents(output)
+        paths = _git(repo, "ls-tree", "-r", "-z", "--name-only", "HEAD").split(b"\0")
+        mismatched = [
+            path.decode()
+            for path in paths
+            if path and contents.get(path.decode()) != _git(repo, "show", b"HEAD:" + path)
+        ]
+        print(f"Checked {len(contents):,} entries against git show")
+        if mismatched:
+            print(f"{len(mismatched):,} entries differ, e.g. {', '.join(mismatched[:5])}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
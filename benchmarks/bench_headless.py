@@ -0,0 +1,70 @@
+"""
+Benchmark for headless exports against a plain ``find | xargs cat``.
+
+Generates a synthetic tree with a pruned ``node_modules`` directory, then
+times ``codestract export`` (walk, classify and export) and a shell pipeline
+that simply concatenates every file in the tree.
+
+Usage:
+    python benchmarks/bench_headless.py [--files N] [--readers N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import tempfile
+import time
+
+from codestract.headless import run_export
+
+
+def generate_tree(root: str, file_count: int) -> None:
+    """Create a nested tree of source files plus an ignored dependency folder."""
+    body = b"".join(
+        b"def function_%d(value):\n    return value * %d\n\n" % (i, i) for i in range(40)
+    )
+    for i in range(file_count):
+        directory = os.path.join(root, "src", f"pkg{i % 50:02d}", f"mod{i % 7}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"file{i}.py"), "wb") as f:
+            f.write(body)
+
+    ignored = os.path.join(root, "node_modules", "dep")
+    os.makedirs(ignored, exist_ok=True)
+    for i in range(file_count // 10):
+        with open(os.path.join(ignored, f"index{i}.js"), "wb") as f:
+            f.write(b"module.exports = {};\n")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        print(f"Generating {args.files:,} files...")
+        generate_tree(root, args.files)
+        output = os.path.join(root, "export.txt")
+
+        start = time.perf_counter()
+        subprocess.run(
+            f"find {root}/src -type f -print0 | xargs -0 cat > {output}",
+            shell=True,
+            check=True,
+        )
+        baseline = time.perf_counter() - start
+        print(f"find | xargs cat:  {baseline:.3f}s")
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_export(root, output=output, exclude=["export.txt"], readers=args.readers)
+        elapsed = time.perf_counter() - start
+        print(f"codestract export: {elapsed:.3f}s ({elapsed / baseline:.1f}x baseline)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark for .gitignore-based pruning on a monorepo-shaped tree.
+
+Generates a tree where most files live in gitignored build and dependency
+directories (1M by default), then times a full walk that lists every file
+against a walk that applies the ignore engine and prunes those subtrees.
+
+Usage:
+    python benchmarks/bench_ignore.py [--ignored N] [--sources N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from codestract.utils.ignore import IgnoreEngine
+from codestract.utils.walker import walk_files
+
+FILES_PER_DIR = 1000
+
+
+def generate_tree(root: str, ignored: int, sources: int) -> None:
+    """Create a monorepo with many packages, each with ignored build output."""
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("node_modules/\ndist/\n*.log\n")
+
+    packages = max(ignored // (FILES_PER_DIR * 2), 1)
+    for i in range(packages):
+        package = os.path.join(root, "packages", f"pkg{i:04d}")
+        for folder in ("node_modules/dep", "dist"):
+            directory = os.path.join(package, folder)
+            os.makedirs(directory, exist_ok=True)
+            for j in range(FILES_PER_DIR):
+                open(os.path.join(directory, f"f{j}.js"), "w").close()
+        src = os.path.join(package, "src")
+        os.makedirs(src, exist_ok=True)
+        for j in range(max(sources // packages, 1)):
+            with open(os.path.join(src, f"module{j}.ts"), "w") as f:
+                f.write("export const value = 1;\n")
+
+
+def time_walk(label: str, root: str, **kwargs) -> None:
+    """Walk the tree and report the elapsed time and file count."""
+    start = time.perf_counter()
+    count = sum(1 for _ in walk_files(root, **kwargs))
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed:.3f}s, {count:,} files")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ignored", type=int, default=1_000_000)
+    parser.add_argument("--sources", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        print(f"Generating {args.ignored:,} ignored and {args.sources:,} source files...")
+        generate_tree(root, args.ignored, args.sources)
+
+        time_walk("full walk   ", root, pruned_dirs=())
+        time_walk("ignore rules", root, pruned_dirs=(), ignore=IgnoreEngine(root))
+
+
+if __name__ == "__main__":
+    main()
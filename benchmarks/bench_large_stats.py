@@ -0,0 +1,75 @@
+"""
+Benchmark for statistics of very large files.
+
+Generates files of increasing size and computes their statistics in a
+fresh process each, reporting the time taken and the peak resident memory
+of that process. Peak memory should stay flat as files grow.
+
+Usage:
+    python benchmarks/bench_large_stats.py [--sizes-mb 64,256,1024] [--invalid]
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+_MEASURE = """
+import resource, sys, time
+from codestract.exporter import calculate_file_stats
+from codestract.utils.stats_cache import StatsCache
+start = time.perf_counter()
+stats = calculate_file_stats({sys.argv[1]}, cache=StatsCache())[sys.argv[1]]
+elapsed = time.perf_counter() - start
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, peak_kb, stats["lines"], stats["chars"])
+"""
+
+
+def generate_file(path: str, size_mb: int, invalid: bool) -> None:
+    """Write a log-like file of roughly ``size_mb`` megabytes."""
+    line = "2024-01-01T00:00:00 INFO request handled in 12ms — user=ünïcode\n".encode()
+    if invalid:
+        line = line[:-1] + b"\xff\xfe\n"
+    block = line * (1024 * 1024 // len(line))
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes-mb", default="64,256,1024")
+    parser.add_argument("--invalid", action="store_true", help="include invalid UTF-8")
+    args = parser.parse_args()
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"benchmark process peak RSS: {baseline_kb / 1024:.1f} MB")
+
+    with tempfile.TemporaryDirectory() as root:
+        for size_mb in (int(size) for size in args.sizes_mb.split(",")):
+            path = os.path.join(root, f"large_{size_mb}.log")
+            generate_file(path, size_mb, args.invalid)
+
+            start = time.perf_counter()
+            output = subprocess.run(
+                [sys.executable, "-c", _MEASURE, path],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout.split()
+            wall = time.perf_counter() - start
+            elapsed, peak_kb, lines, chars = float(output[0]), int(output[1]), *output[2:]
+            print(
+                f"{size_mb:>6} MB: stats {elapsed:.2f}s (process {wall:.2f}s), "
+                f"peak RSS {peak_kb / 1024:.1f} MB, {int(lines):,} lines, {int(chars):,} chars"
+            )
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
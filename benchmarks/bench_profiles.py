@@ -0,0 +1,57 @@
+"""
+Benchmark for saving and loading selection profiles.
+
+Builds a selection of individually chosen files (100k by default) spread
+over packages and modules, then times encoding it as a profile, decoding
+the profile and rebuilding the selection from its rules.
+
+Usage:
+    python benchmarks/bench_profiles.py [--files N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from codestract.profiles import load_profile, save_profile
+from codestract.utils.selection import Selection
+
+
+def build_selection(root: str, files: int) -> Selection:
+    """Select files one by one across many package and module directories."""
+    paths = [
+        os.path.join(root, f"pkg{i // 1000:03d}", "src", f"mod{i // 100 % 10}", f"f{i}.py")
+        for i in range(files)
+    ]
+    selection = Selection(root)
+    selection.set_rules((path, True, False) for path in sorted(paths))
+    return selection
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        root = os.path.realpath(root)
+        selection = build_selection(root, args.files)
+
+        start = time.perf_counter()
+        profile_file = save_profile(selection, "bench")
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(profile_file)
+        print(f"save: {elapsed:.3f}s, {size:,} bytes ({size / args.files:.1f} per path)")
+
+        start = time.perf_counter()
+        rules = load_profile(root, "bench")
+        loaded = Selection(root)
+        loaded.set_rules(rules)
+        elapsed = time.perf_counter() - start
+        print(f"load: {elapsed:.3f}s, {len(rules):,} rules")
+
+
+if __name__ == "__main__":
+    main()
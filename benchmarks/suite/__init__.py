@@ -0,0 +1,10 @@
+"""
+Benchmark suite timing codestract against deterministic synthetic repositories.
+
+Run it from the repository root:
+
+    python -m benchmarks.suite --preset medium --save baseline.json
+    python -m benchmarks.suite --preset medium --compare baseline.json --threshold 0.15
+
+See ``python -m benchmarks.suite --help`` for every option.
+"""
@@ -0,0 +1,121 @@
+"""
+Run the benchmark suite, optionally saving or comparing against a JSON baseline.
+
+Usage:
+    python -m benchmarks.suite [--preset NAME] [--files N] [--seed N] [--repeat N]
+        [--scenario NAME ...] [--save FILE] [--compare FILE] [--threshold RATIO]
+
+Exits with status 1 if a scenario regressed against the compared baseline.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from .baseline import (
+    DEFAULT_THRESHOLD,
+    build_results,
+    compare,
+    load_results,
+    repo_mismatch,
+    save_results,
+)
+from .generator import PRESETS, RepoSpec, generate_repo
+from .scenarios import SCENARIOS, Timings
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.suite",
+        description="Time codestract against a deterministic synthetic repository.",
+    )
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--files", type=int, help="override the preset's file count")
+    parser.add_argument("--seed", type=int, help="override the preset's random seed")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per scenario (default: 5)")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="run only this scenario (repeatable)",
+    )
+    parser.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a JSON baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        metavar="RATIO",
+        help=f"allowed slowdown of a median before it counts as a regression "
+        f"(default: {DEFAULT_THRESHOLD})",
+    )
+    return parser
+
+
+def _spec(args: argparse.Namespace) -> RepoSpec:
+    """Get the repository spec of the preset with the overrides applied."""
+    values = PRESETS[args.preset].to_dict()
+    if args.files is not None:
+        values["files"] = args.files
+    if args.seed is not None:
+        values["seed"] = args.seed
+    return RepoSpec(**values)
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the suite and return the exit status."""
+    args = _build_parser().parse_args(argv)
+    spec = _spec(args)
+    baseline = load_results(args.compare) if args.compare else None
+    names = args.scenario or list(SCENARIOS)
+
+    timings: Dict[str, Timings] = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        repo = generate_repo(os.path.join(workdir, "repo"), spec)
+        print(
+            f"Generated {len(repo.text_files):,} text and {len(repo.binary_files):,} binary "
+            f"files, {repo.total_bytes / 1024 / 1024:.1f} MB, "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        # Exports of the app go to the working directory
+        os.chdir(workdir)
+        try:
+            for name in names:
+                timings[name] = SCENARIOS[name](repo, args.repeat)
+                runs = sorted(timings[name])
+                print(f"{name:<20} median {runs[len(runs) // 2]:.4f}s  min {runs[0]:.4f}s")
+        finally:
+            os.chdir(cwd)
+
+    results = build_results(spec, args.repeat, timings)
+    if args.save:
+        save_results(results, args.save)
+        print(f"Saved results to {args.save}")
+    if baseline is None:
+        return 0
+
+    mismatch = repo_mismatch(baseline, results)
+    if mismatch:
+        print(f"warning: the baseline used a different repository ({', '.join(mismatch)})")
+    regressed = 0
+    print(f"\nAgainst {args.compare} (threshold {args.threshold:.0%}):")
+    for comparison in compare(baseline, results, args.threshold):
+        if comparison.ratio is None:
+            verdict = "new"
+        elif comparison.regressed:
+            verdict = "REGRESSED"
+            regressed += 1
+        else:
+            verdict = "ok"
+        ratio = f"{comparison.ratio:.2f}x" if comparison.ratio is not None else "-"
+        print(f"{comparison.scenario:<20} {ratio:>7}  {verdict}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Benchmark results stored as JSON baselines, and comparison against them.
+
+Scenarios are compared by their median time. A scenario regresses when its
+median exceeds the baseline's by more than the threshold, e.g. 0.1 for 10%.
+"""
+
+import json
+import platform
+import statistics
+import sys
+from typing import Dict, List, Optional
+
+from .generator import RepoSpec
+from .scenarios import Timings
+
+RESULTS_VERSION = 1
+
+DEFAULT_THRESHOLD = 0.1
+
+
+class Comparison:
+    """Median time of a scenario in the current run against the baseline."""
+
+    __slots__ = ("scenario", "baseline", "current", "threshold")
+
+    def __init__(
+        self, scenario: str, baseline: Optional[float], current: float, threshold: float
+    ) -> None:
+        self.scenario = scenario
+        self.baseline = baseline  # None if the baseline lacks the scenario
+        self.current = current
+        self.threshold = threshold
+
+    @property
+    def ratio(self) -> Optional[float]:
+        """Current median relative to the baseline's."""
+        if not self.baseline:
+            return None
+        return self.current / self.baseline
+
+    @property
+    def regressed(self) -> bool:
+        """Whether the scenario got slower than the threshold allows."""
+        ratio = self.ratio
+        return ratio is not None and ratio > 1 + self.threshold
+
+
+def summarize(timings: Timings) -> Dict[str, object]:
+    """Summarize the timings of one scenario."""
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "runs": timings,
+    }
+
+
+def build_results(spec: RepoSpec, repeat: int, timings: Dict[str, Timings]) -> Dict[str, object]:
+    """Assemble the results of a run, with what is needed to tell runs apart."""
+    return {
+        "version": RESULTS_VERSION,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repo": spec.to_dict(),
+        "repeat": repeat,
+        "scenarios": {name: summarize(runs) for name, runs in timings.items()},
+    }
+
+
+def save_results(results: Dict[str, object], results_file: str) -> None:
+    """Write results as a JSON baseline."""
+    with open(results_file, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+
+
+def load_results(results_file: str) -> Dict[str, object]:
+    """
+    Read results written by ``save_results``.
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file does not hold results of a supported version
+    """
+    with open(results_file, "r", encoding="utf-8") as f:
+        results = json.load(f)
+    if not isinstance(results, dict) or results.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{results_file} does not hold supported benchmark results")
+    return results
+
+
+def compare(
+    baseline: Dict[str, object],
+    current: Dict[str, object],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Comparison]:
+    """Compare the scenarios of a run against a baseline."""
+    base_scenarios = baseline["scenarios"]
+    return [
+        Comparison(
+            name,
+            base_scenarios[name]["median"] if name in base_scenarios else None,
+            summary["median"],
+            threshold,
+        )
+        for name, summary in current["scenarios"].items()
+    ]
+
+
+def repo_mismatch(baseline: Dict[str, object], current: Dict[str, object]) -> List[str]:
+    """Get the repository parameters in which two runs differ."""
+    base_repo, current_repo = baseline["repo"], current["repo"]
+    return sorted(name for name in current_repo if base_repo.get(name) != current_repo[name])
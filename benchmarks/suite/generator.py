@@ -0,0 +1,174 @@
+"""
+Deterministic generator of synthetic repositories.
+
+The same spec and seed always produce the same tree: the same paths, the
+same sizes and the same bytes, so timings of different runs and different
+machines measure the code rather than the input.
+"""
+
+import math
+import os
+import random
+from typing import Dict, List
+
+# Extensions of generated text files, with their relative frequency
+TEXT_EXTENSIONS = ((".py", 5), (".ts", 3), (".md", 1), (".json", 1))
+
+# Binary files either carry an extension filtered by name or must be sniffed
+BINARY_EXTENSIONS = (".png", ".data")
+
+# Bytes of generated text the contents of text files are cut from
+_CORPUS_SIZE = 1024 * 1024
+
+
+class RepoSpec:
+    """Shape of a synthetic repository."""
+
+    __slots__ = (
+        "files",
+        "depth",
+        "fanout",
+        "median_size",
+        "size_sigma",
+        "binary_ratio",
+        "large_files",
+        "large_size",
+        "seed",
+    )
+
+    def __init__(
+        self,
+        files: int,
+        depth: int = 4,
+        fanout: int = 6,
+        median_size: int = 2048,
+        size_sigma: float = 1.2,
+        binary_ratio: float = 0.1,
+        large_files: int = 0,
+        large_size: int = 16 * 1024 * 1024,
+        seed: int = 1,
+    ) -> None:
+        """
+        Initialize a spec.
+
+        Args:
+            files: Number of files to create
+            depth: Maximum directory depth below the root
+            fanout: Subdirectories per directory
+            median_size: Median size of a file in bytes; sizes are log-normal
+            size_sigma: Spread of the log-normal size distribution
+            binary_ratio: Fraction of files that are binary
+            large_files: Number of additional large text files
+            large_size: Size of each large file in bytes
+            seed: Seed of the random generator
+        """
+        self.files = files
+        self.depth = depth
+        self.fanout = fanout
+        self.median_size = median_size
+        self.size_sigma = size_sigma
+        self.binary_ratio = binary_ratio
+        self.large_files = large_files
+        self.large_size = large_size
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, object]:
+        """Get the spec as a JSON-serializable mapping."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+PRESETS: Dict[str, RepoSpec] = {
+    "small": RepoSpec(files=2_000, depth=3, fanout=5),
+    "medium": RepoSpec(files=20_000, depth=4, fanout=6, large_files=1),
+    "large": RepoSpec(files=100_000, depth=5, fanout=7, large_files=2),
+}
+
+
+class GeneratedRepo:
+    """A synthetic repository on disk."""
+
+    __slots__ = ("root", "spec", "text_files", "binary_files", "total_bytes")
+
+    def __init__(self, root: str, spec: RepoSpec) -> None:
+        self.root = root
+        self.spec = spec
+        self.text_files: List[str] = []
+        self.binary_files: List[str] = []
+        self.total_bytes = 0
+
+    @property
+    def files(self) -> List[str]:
+        """All generated files, text files first."""
+        return self.text_files + self.binary_files
+
+
+def _corpus(rng: random.Random) -> bytes:
+    """Generate source-like text to cut file contents from."""
+    words = ["value", "result", "index", "items", "config", "handler", "return", "self"]
+    lines = []
+    size = 0
+    while size < _CORPUS_SIZE:
+        indent = "    " * rng.randrange(3)
+        line = f"{indent}{rng.choice(words)}_{rng.randrange(1000)} = {rng.choice(words)}()\n"
+        lines.append(line)
+        size += len(line)
+    return "".join(lines).encode()
+
+
+def _text_content(rng: random.Random, corpus: bytes, size: int) -> bytes:
+    """Cut ``size`` bytes of text from the corpus, repeating it if needed."""
+    if size <= len(corpus):
+        start = rng.randrange(len(corpus) - size + 1)
+        return corpus[start : start + size]
+    repeats, rest = divmod(size, len(corpus))
+    return corpus * repeats + corpus[:rest]
+
+
+def _directory(rng: random.Random, spec: RepoSpec) -> str:
+    """Pick a directory at a random depth of the tree."""
+    depth = rng.randint(0, spec.depth)
+    return os.path.join(*(f"d{rng.randrange(spec.fanout)}" for _ in range(depth)), "")
+
+
+def generate_repo(root: str, spec: RepoSpec) -> GeneratedRepo:
+    """
+    Create a synthetic repository under ``root``.
+
+    Args:
+        root: Empty directory to generate the repository in
+        spec: Shape of the repository
+
+    Returns:
+        The generated repository
+    """
+    rng = random.Random(spec.seed)
+    corpus = _corpus(rng)
+    repo = GeneratedRepo(os.path.realpath(root), spec)
+    extensions = [ext for ext, weight in TEXT_EXTENSIONS for _ in range(weight)]
+    mu = math.log(spec.median_size)
+
+    for i in range(spec.files):
+        directory = os.path.join(repo.root, _directory(rng, spec))
+        os.makedirs(directory, exist_ok=True)
+        size = max(1, int(rng.lognormvariate(mu, spec.size_sigma)))
+        if rng.random() < spec.binary_ratio:
+            path = os.path.join(directory, f"asset{i}{rng.choice(BINARY_EXTENSIONS)}")
+            length = min(size, 4096)
+            content = rng.getrandbits(8 * length).to_bytes(length, "little") + b"\0"
+            repo.binary_files.append(path)
+        else:
+            path = os.path.join(directory, f"file{i}{rng.choice(extensions)}")
+            content = _text_content(rng, corpus, size)
+            repo.text_files.append(path)
+        with open(path, "wb") as f:
+            f.write(content)
+        repo.total_bytes += len(content)
+
+    for i in range(spec.large_files):
+        path = os.path.join(repo.root, f"large{i}.log")
+        with open(path, "wb") as f:
+            f.write(_text_content(rng, corpus, spec.large_size))
+        repo.text_files.append(path)
+        repo.total_bytes += spec.large_size
+
+    return repo
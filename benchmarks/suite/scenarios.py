@@ -0,0 +1,186 @@
+"""
+Timed scenarios run against a generated repository.
+
+Each scenario takes the repository and a number of repetitions and returns
+the wall time of every repetition, in seconds. Setup, such as resetting
+caches, happens outside the timed part. Scenarios driving the interface
+import Textual only when they run.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from codestract.compaction import CompactionOptions
+from codestract.exporter import calculate_file_stats, export_selected_files
+from codestract.utils.constants import PRUNED_DIR_NAMES
+from codestract.utils.file_utils import forget_text_file, is_text_file
+from codestract.utils.stats_cache import StatsCache, get_stats_cache
+
+from .generator import GeneratedRepo
+
+Timings = List[float]
+
+Scenario = Callable[[GeneratedRepo, int], Timings]
+
+# Terminal size of the headless app
+APP_SIZE = (160, 50)
+
+# Seconds to wait for the app to settle before giving up
+SETTLE_TIMEOUT = 120.0
+
+# Directories expanded in the tree; Textual rebuilds every line of the tree
+# after each directory is filled, so expanding everything takes quadratic time
+MAX_EXPANDED_DIRS = 150
+
+
+def _timed(run: Callable[[], object]) -> float:
+    """Time a single call."""
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def classify_cold(repo: GeneratedRepo, repeat: int) -> Timings:
+    """Classify every file with an empty verdict cache."""
+    files = repo.files
+    timings = []
+    for _ in range(repeat):
+        for path in files:
+            forget_text_file(path)
+        timings.append(_timed(lambda: [is_text_file(path) for path in files]))
+    return timings
+
+
+def classify_warm(repo: GeneratedRepo, repeat: int) -> Timings:
+    """Classify every file again, answered from the verdict cache."""
+    files = repo.files
+    for path in files:
+        is_text_file(path)
+    return [_timed(lambda: [is_text_file(path) for path in files]) for _ in range(repeat)]
+
+
+def stats_cold(repo: GeneratedRepo, repeat: int) -> Timings:
+    """Compute statistics of every text file with an empty statistics cache."""
+    files = set(repo.text_files)
+    return [_timed(lambda: calculate_file_stats(files, cache=StatsCache())) for _ in range(repeat)]
+
+
+def stats_warm(repo: GeneratedRepo, repeat: int) -> Timings:
+    """Compute statistics of every text file again, answered from the cache."""
+    files = set(repo.text_files)
+    cache = StatsCache()
+    calculate_file_stats(files, cache=cache)
+    return [_timed(lambda: calculate_file_stats(files, cache=cache)) for _ in range(repeat)]
+
+
+def export(repo: GeneratedRepo, repeat: int) -> Timings:
+    """Export every text file into a context file."""
+    files = set(repo.text_files)
+    timings = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        output = os.path.join(out_dir, "export.txt")
+        for _ in range(repeat):
+            timings.append(_timed(lambda: export_selected_files(files, output_file_name=output)))
+    return timings
+
+
+def export_compact(repo: GeneratedRepo, repeat: int) -> Timings:
+    """Export every text file with comments stripped and whitespace compacted."""
+    files = set(repo.text_files)
+    compaction = CompactionOptions(strip_comments=True, strip_docstrings=True)
+    timings = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        output = os.path.join(out_dir, "export.txt")
+        for _ in range(repeat):
+            timings.append(
+                _timed(
+                    lambda: export_selected_files(
+                        files, output_file_name=output, compaction=compaction
+                    )
+                )
+            )
+    return timings
+
+
+async def _wait_for(condition: Callable[[], bool]) -> None:
+    """Let the app run until a condition holds."""
+    deadline = time.monotonic() + SETTLE_TIMEOUT
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("The app did not settle in time")
+        # Unlike pilot.pause, this does not wait for every widget to go idle
+        await asyncio.sleep(0.01)
+
+
+async def _expand_tree(tree) -> None:
+    """Expand directories breadth first, up to ``MAX_EXPANDED_DIRS``, and wait until filled."""
+    pending = [tree.root]
+    expanded = 0
+    while pending:
+        pending = pending[: MAX_EXPANDED_DIRS - expanded]
+        expected = {}
+        for node in pending:
+            node.expand()
+            # The app's state directory, holding its log, is hidden from the tree
+            names = os.listdir(node.data.path)
+            expected[node] = sum(name not in PRUNED_DIR_NAMES for name in names)
+        await _wait_for(lambda: all(len(node.children) == n for node, n in expected.items()))
+        expanded += len(pending)
+        pending = [child for node in pending for child in node.children if child.allow_expand]
+
+
+def refresh_tree_icons(repo: GeneratedRepo, repeat: int) -> Timings:
+    """Relabel the expanded file tree with every other text file selected."""
+    from codestract.app import FileExportApp
+    from codestract.ui.widgets.file_tree_panel import FileTreePanel
+
+    async def run() -> Timings:
+        app = FileExportApp(repo.root)
+        async with app.run_test(size=APP_SIZE):
+            panel = app.query_one(FileTreePanel)
+            await _expand_tree(panel.get_tree())
+            app.apply_selection(repo.text_files[::2])
+            return [_timed(panel.refresh_tree_icons) for _ in range(repeat)]
+
+    return asyncio.run(run())
+
+
+def preview_update(repo: GeneratedRepo, repeat: int) -> Timings:
+    """Select every text file at once and wait until the preview shows their totals."""
+    from codestract.app import FileExportApp
+    from codestract.ui.widgets.file_preview import FilePreview
+
+    async def run() -> Timings:
+        app = FileExportApp(repo.root)
+        timings = []
+        async with app.run_test(size=APP_SIZE):
+            preview = app.query_one(FilePreview)
+            cache = get_stats_cache()
+            for _ in range(repeat):
+                app.apply_selection([])
+                await _wait_for(lambda: not preview.files_info)
+                for path in repo.text_files:
+                    cache.invalidate(path)
+
+                start = time.perf_counter()
+                app.apply_selection(repo.text_files)
+                await _wait_for(lambda: len(preview.files_info) == len(repo.text_files))
+                timings.append(time.perf_counter() - start)
+        return timings
+
+    return asyncio.run(run())
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "classify_cold": classify_cold,
+    "classify_warm": classify_warm,
+    "stats_cold": stats_cold,
+    "stats_warm": stats_warm,
+    "export": export,
+    "export_compact": export_compact,
+    "refresh_tree_icons": refresh_tree_icons,
+    "preview_update": preview_update,
+}
@@ -0,0 +1,8 @@
+"""
+Allow running Codestract with ``python -m codestract``.
+"""
+
+from .cli import main
+
+if __name__ == "__main__":
+    main()
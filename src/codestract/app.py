@@ -4,16 +4,47 @@ Codestract - A CLI tool for extracting and combining code files.
 
 import os
 import sys
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from textual import on
+from textual import on, work
 from textual.app import App, ComposeResult
 from textual.binding import Binding
+from textual.message import Message
+from textual.timer import Timer
 from textual.widgets import DirectoryTree, Header
+from textual.widgets.tree import TreeNode
 
+from .autofit import DEFAULT_TOKEN_BUDGET, auto_fit, gather_candidates
+from .compaction import CompactionOptions
+from .exporter import ShardBudget, default_output_name
+from .git_source import GitError
+from .headless import collect_files, collect_git_files
+from .manifest import last_manifest
+from .profiles import list_profiles, load_profile, save_profile
+from .ui.widgets.content_finder import ContentFinder
 from .ui.widgets.file_tree_panel import FileTreePanel
+from .ui.widgets.path_finder import PathFinder
+from .ui.widgets.perf_panel import PerfPanel
+from .ui.widgets.profile_prompt import ProfilePrompt
+from .ui.widgets.project_tree import ProjectTree
 from .ui.widgets.summary_panel import SummaryPanel
-from .utils.file_utils import is_text_file
+from .utils import perf
+from .utils.file_utils import forget_text_file, is_text_file
+from .utils.ignore import IgnoreEngine
 from .utils.logging import setup_logging
+from .utils.path_index import PathIndex
+from .utils.stats_cache import get_stats_cache, load_stats_cache
+from .utils.walker import walk_files
+from .utils.watcher import FileWatcher
+
+
+class FilesChanged(Message):
+    """Posted from the watcher thread with a batch of changed paths."""
+
+    def __init__(self, paths: Set[str], structural: Set[str]) -> None:
+        super().__init__()
+        self.paths = paths
+        self.structural = structural
 
 
 class FileExportApp(App):
@@ -27,9 +58,18 @@ class FileExportApp(App):
     BINDINGS = [
         Binding("q", "quit", "Quit", show=True),
         Binding("e", "export", "Export Files", show=True),
+        Binding("d", "delta_export", "Export Changes", show=True),
         Binding("space", "toggle_file", "Toggle Selection", show=True),
         Binding("f", "toggle_files", "Show/Hide Files", show=True),
         Binding("/", "search", "Search", show=True),
+        Binding("g", "content_search", "Search Contents", show=True),
+        Binding("a", "auto_fit", "Auto-fit", show=True),
+        Binding("w", "toggle_watch", "Watch", show=True),
+        Binding("s", "save_profile", "Save Profile", show=True),
+        Binding("p", "toggle_perf", "Performance", show=False),
+        Binding("P", "dump_perf", "Dump Performance Profile", show=False),
+        Binding("[", "preview_page(-1)", "Previous Page", show=False),
+        Binding("]", "preview_page(1)", "Next Page", show=False),
     ]
 
     DEFAULT_CSS = """
@@ -38,17 +78,64 @@ class FileExportApp(App):
     }
     """
 
-    def __init__(self, start_path: str | None = None) -> None:
-        """Initialize the application with an optional starting path."""
+    # Seconds without further changes before the export is regenerated
+    AUTO_EXPORT_DELAY = 1.0
+
+    def __init__(
+        self,
+        start_path: str | None = None,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        watch: bool = False,
+        auto_export: bool = False,
+        profile: Optional[str] = None,
+        record_perf: bool = False,
+        log_levels: Optional[Dict[str, int]] = None,
+        since: Optional[str] = None,
+        shard_budget: Optional[ShardBudget] = None,
+        compaction: Optional[CompactionOptions] = None,
+    ) -> None:
+        """
+        Initialize the application.
+
+        Args:
+            start_path: Directory to browse, the working directory if not given
+            token_budget: Token budget used by auto-fit
+            watch: Whether to watch the project for changes from the start
+            auto_export: Whether to regenerate the export when selected files change;
+                implies ``watch``
+            profile: Name of a saved selection profile to restore at startup
+            record_perf: Whether to record timing spans and counters from the start
+            log_levels: Log levels by logger name, e.g. from ``parse_levels``
+            since: Git branch or commit; files changed since the current branch was
+                forked from it are selected at startup
+            shard_budget: If given, exports are split into shards within this budget
+            compaction: Compaction steps applied to the contents of exports, if any
+        """
         super().__init__()
         self.start_path = start_path or os.getcwd()
-        setup_logging()
+        self.token_budget = token_budget
+        self.path_index: PathIndex | None = None
+        self._search_requested = False
+        self.watch_on_start = watch or auto_export
+        self.auto_export = auto_export
+        self.export_file: str | None = None
+        self._watcher: FileWatcher | None = None
+        self._auto_export_timer: Timer | None = None
+        self.profile = profile
+        self.since = since
+        self.shard_budget = shard_budget
+        self.compaction = compaction
+        if record_perf:
+            perf.enable()
+        setup_logging(self.start_path, log_levels)
+        load_stats_cache(self.start_path)
 
     def compose(self) -> ComposeResult:
         """Create child widgets for the app."""
         yield Header(show_clock=False)
         yield FileTreePanel(self.start_path)
         yield SummaryPanel()
+        yield PerfPanel()
 
     def on_mount(self) -> None:
         """Handle app mount event."""
@@ -56,6 +143,21 @@ class FileExportApp(App):
         tree = tree_panel.get_tree()
         tree.focus()
         tree_panel.refresh_tree_icons()
+        summary_panel = self.query_one(SummaryPanel)
+        summary_panel.set_dir_index(tree_panel.dir_index)
+        summary_panel.update_selection_count(tree_panel.selection)
+        self._build_path_index()
+        if self.profile is not None:
+            self._load_profile(self.profile)
+        if self.since is not None:
+            self._select_changed_files(self.since)
+        if self.watch_on_start:
+            self.start_watching()
+
+    def on_unmount(self) -> None:
+        """Stop watching and persist the statistics cache when the app shuts down."""
+        self.stop_watching()
+        get_stats_cache().save()
 
     @on(DirectoryTree.FileSelected)
     def handle_file_selected(self, event: DirectoryTree.FileSelected) -> None:
@@ -64,39 +166,302 @@ class FileExportApp(App):
         if not os.path.isfile(file_path) or not is_text_file(file_path):
             return
 
+        tree_panel = self.query_one(FileTreePanel)
+        self.set_files_selected([file_path], file_path not in tree_panel.selection)
+
+    @on(ProjectTree.SelectionToggled)
+    def handle_selection_toggled(self, event: ProjectTree.SelectionToggled) -> None:
+        """Toggle the selection of a file or a whole directory."""
+        self.toggle_node(event.node)
+
+    def toggle_node(self, node: TreeNode) -> None:
+        """Toggle the selection of the file or directory a tree node represents."""
+        tree_panel = self.query_one(FileTreePanel)
+        path = tree_panel.node_path(node)
+        if node.allow_expand:
+            self.set_dir_selected(path, tree_panel.selection.dir_state(path) != "all")
+        elif os.path.isfile(path) and is_text_file(path):
+            self.set_files_selected([path], path not in tree_panel.selection)
+
+    def set_files_selected(self, paths: Iterable[str], selected: bool) -> None:
+        """Select or deselect files in one batch, skipping non-text files."""
+        tree_panel = self.query_one(FileTreePanel)
+        summary_panel = self.query_one(SummaryPanel)
+
+        changed = [
+            path
+            for path in paths
+            if (path in tree_panel.selection) != selected and (not selected or is_text_file(path))
+        ]
+        if not changed:
+            return
+        tree_panel.set_selected(changed, selected)
+        summary_panel.update_preview(tree_panel.selection, changed=changed)
+        summary_panel.update_selection_count(tree_panel.selection)
+
+    def set_dir_selected(self, dir_path: str, selected: bool) -> None:
+        """Select or deselect a whole directory without enumerating its files."""
         tree_panel = self.query_one(FileTreePanel)
         summary_panel = self.query_one(SummaryPanel)
+        tree_panel.set_dir_selected(dir_path, selected)
+        summary_panel.update_preview(tree_panel.selection, changed=[dir_path])
+        summary_panel.update_selection_count(tree_panel.selection)
+
+    @on(FileTreePanel.DirectoryTotalsChanged)
+    def handle_directory_totals_changed(self, event: FileTreePanel.DirectoryTotalsChanged) -> None:
+        """Measure selected directories again as the background scan progresses."""
+        selection = self.query_one(FileTreePanel).selection
+        if any(is_dir for is_dir in selection.entries().values()):
+            self.query_one(SummaryPanel).update_preview(selection, changed=event.dir_paths)
+
+    def action_toggle_file(self) -> None:
+        """Toggle selection of the currently focused file or directory."""
+        tree = self.query_one(FileTreePanel).get_tree()
+        if tree.cursor_node is not None and tree.cursor_node.data is not None:
+            self.toggle_node(tree.cursor_node)
+
+    @work(thread=True, exclusive=True, group="path-index")
+    def _build_path_index(self) -> None:
+        """Index the project's paths for the finder in a background thread."""
+        root = os.path.realpath(self.start_path)
+        index = PathIndex(root)
+        for path, _ in walk_files(root, ignore=IgnoreEngine(root)):
+            index.add(path)
+        index.prepare()
+        self.call_from_thread(self._path_index_ready, index)
+
+    def _path_index_ready(self, index: PathIndex) -> None:
+        """Install a freshly built path index, opening the finder if it was requested."""
+        self.path_index = index
+        if self._search_requested:
+            self._search_requested = False
+            self.action_search()
+
+    def action_search(self) -> None:
+        """Open the path finder."""
+        if self.path_index is None:
+            self._search_requested = True
+            self.notify("Indexing project paths...")
+            return
+        tree_panel = self.query_one(FileTreePanel)
+        self.push_screen(PathFinder(self.path_index, tree_panel.selection, self.set_files_selected))
 
-        if file_path in tree_panel.selected_files:
-            tree_panel.selected_files.remove(file_path)
+    def action_content_search(self) -> None:
+        """Open the content search screen."""
+        tree_panel = self.query_one(FileTreePanel)
+        self.push_screen(
+            ContentFinder(self.start_path, tree_panel.selection, self.set_files_selected)
+        )
+
+    def start_watching(self) -> None:
+        """Start watching the project for changes made outside the app."""
+        if self._watcher is not None:
+            return
+        root = os.path.realpath(self.start_path)
+        selection = self.query_one(FileTreePanel).selection
+        self._watcher = FileWatcher(
+            root,
+            lambda paths, structural: self.post_message(FilesChanged(paths, structural)),
+            ignore=IgnoreEngine(root),
+            interest=selection.explicit_files,
+        )
+        self._watcher.start()
+        self.sub_title = "Watching for changes"
+
+    def stop_watching(self) -> None:
+        """Stop watching the project."""
+        if self._watcher is None:
+            return
+        self._watcher.stop()
+        self._watcher = None
+        self.sub_title = self.SUB_TITLE
+
+    def action_toggle_watch(self) -> None:
+        """Start or stop watching the project for changes."""
+        if self._watcher is None:
+            self.start_watching()
+            self.notify("Watching for changes")
         else:
-            tree_panel.selected_files.add(file_path)
+            self.stop_watching()
+            self.notify("Stopped watching for changes")
 
-        tree_panel.refresh_tree_icons()
-        summary_panel.update_selection_count(tree_panel.selected_files)
-        summary_panel.update_preview()
+    @on(FilesChanged)
+    def handle_files_changed(self, event: FilesChanged) -> None:
+        """Update caches, the tree and the totals for files changed on disk."""
+        if self._watcher is None:
+            return
+        paths = event.paths
+        tree_panel = self.query_one(FileTreePanel)
+        summary_panel = self.query_one(SummaryPanel)
+
+        cache = get_stats_cache()
+        for path in paths:
+            cache.invalidate(path)
+            forget_text_file(path)
+
+        # A change to a directory may stand for its whole subtree, e.g. when deleted
+        selection = tree_panel.selection
+        affected = [
+            path for path in paths if path in selection or selection.dir_state(path) == "partial"
+        ]
+        for path in event.structural:
+            if not os.path.lexists(path):
+                selection.forget(path)
+
+        tree_panel.handle_external_changes(paths, event.structural)
+        if affected:
+            summary_panel.update_preview(selection, changed=affected)
+            summary_panel.update_selection_count(selection)
+            if self.auto_export:
+                self._schedule_auto_export()
+        if event.structural:
+            self._build_path_index()
+
+    def _schedule_auto_export(self) -> None:
+        """Regenerate the export once changes have settled."""
+        if self._auto_export_timer is not None:
+            self._auto_export_timer.stop()
+        self._auto_export_timer = self.set_timer(self.AUTO_EXPORT_DELAY, self._auto_export)
+
+    def _auto_export(self) -> None:
+        """Regenerate the export file after selected files changed."""
+        self._auto_export_timer = None
+        if not self.query_one(FileTreePanel).selection:
+            return
+        self.action_export()
+
+    def action_auto_fit(self) -> None:
+        """Replace the selection with the best files fitting the token budget."""
+        self.notify(f"Fitting files into {self.token_budget:,} tokens...")
+        self._run_auto_fit()
 
-    @on(DirectoryTree.NodeExpanded)
-    def handle_directory_expanded(self, _: DirectoryTree.NodeExpanded) -> None:
-        """Handle directory expansion by refreshing icons for newly visible nodes."""
+    @work(thread=True, exclusive=True, group="auto-fit")
+    def _run_auto_fit(self) -> None:
+        """Scan the project and solve the token budget in a background thread."""
+        candidates = gather_candidates(collect_files(self.start_path))
+        chosen = auto_fit(candidates, self.token_budget, self.start_path)
+        tokens = {candidate.path: candidate.tokens for candidate in candidates}
+        used = sum(tokens[path] for path in chosen)
+        self.call_from_thread(self.apply_selection, chosen)
+        self.call_from_thread(
+            self.notify,
+            f"Auto-fit selected {len(chosen):,} of {len(candidates):,} files "
+            f"(~{used:,} of {self.token_budget:,} tokens)",
+        )
+
+    def apply_selection(self, paths: Iterable[str]) -> None:
+        """Replace the current selection with the given files in one batch."""
+        self.apply_rules([(path, True, False) for path in sorted(paths)])
+
+    def apply_rules(self, rules: List[Tuple[str, bool, bool]]) -> None:
+        """
+        Replace the current selection with selection rules in one batch.
+
+        The tree is relabeled and the preview updated once, however many
+        rules there are.
+
+        Args:
+            rules: (path, selected, is_dir) tuples, each directory before
+                the rules below it
+        """
         tree_panel = self.query_one(FileTreePanel)
+        summary_panel = self.query_one(SummaryPanel)
+        tree_panel.selection.set_rules(rules)
         tree_panel.refresh_tree_icons()
+        summary_panel.update_preview(tree_panel.selection)
+        summary_panel.update_selection_count(tree_panel.selection)
 
-    def action_toggle_file(self) -> None:
-        """Toggle selection of the currently focused file."""
-        tree_panel = self.query_one(FileTreePanel)
-        tree = tree_panel.get_tree()
-        if (
-            tree.cursor_node
-            and hasattr(tree.cursor_node, "data")
-            and tree.cursor_node.data
-        ):
-            tree.select_node(tree.cursor_node)
+    @work(thread=True, exclusive=True, group="profile")
+    def _load_profile(self, name: str) -> None:
+        """Read a saved selection profile in a background thread and apply it."""
+        try:
+            rules = load_profile(self.start_path, name)
+        except (OSError, ValueError) as e:
+            self.call_from_thread(self.notify, f"Cannot load profile {name}: {e}", severity="error")
+            return
+        self.call_from_thread(self.apply_rules, rules)
+        self.call_from_thread(self.notify, f"Loaded profile {name} ({len(rules):,} rules)")
+
+    @work(thread=True, exclusive=True, group="git")
+    def _select_changed_files(self, base: str) -> None:
+        """List the files changed since ``base`` with git in a background thread and select them."""
+        try:
+            paths = collect_git_files(self.start_path, since=base)
+        except GitError as e:
+            self.call_from_thread(
+                self.notify, f"Cannot list changes since {base}: {e}", severity="error"
+            )
+            return
+        self.call_from_thread(self.apply_selection, paths)
+        self.call_from_thread(self.notify, f"Selected {len(paths):,} files changed since {base}")
+
+    def action_save_profile(self) -> None:
+        """Ask for a name and save the selection as a profile."""
+        self.push_screen(
+            ProfilePrompt(self.profile, list_profiles(self.start_path)), self._save_profile
+        )
+
+    def _save_profile(self, name: Optional[str]) -> None:
+        """Save the selection under the name entered in the prompt."""
+        if name is None:
+            return
+        selection = self.query_one(FileTreePanel).selection
+        try:
+            save_profile(selection, name)
+        except (OSError, ValueError) as e:
+            self.notify(f"Cannot save profile {name}: {e}", severity="error")
+            return
+        self.profile = name
+        self.notify(f"Saved profile {name}")
+
+    def action_toggle_perf(self) -> None:
+        """Show or hide the performance panel, recording from the first time it is shown."""
+        perf_panel = self.query_one(PerfPanel)
+        if perf_panel.shown:
+            perf_panel.hide()
+            return
+        perf.enable()
+        perf_panel.show()
+
+    def action_dump_perf(self) -> None:
+        """Write the recorded timing spans and counters to a JSON file."""
+        try:
+            profile_file = perf.dump()
+        except OSError as e:
+            self.notify(f"Cannot write performance profile: {e}", severity="error")
+            return
+        if profile_file is None:
+            self.notify("Performance recording is off; press p to start it", severity="warning")
+            return
+        self.notify(f"Saved performance profile to {profile_file}")
+
+    def action_preview_page(self, pages: int) -> None:
+        """Page through the selected-files list in the preview."""
+        summary_panel = self.query_one(SummaryPanel)
+        summary_panel.scroll_preview(pages)
 
     def action_export(self) -> None:
-        """Export selected files."""
+        """Export selected files, to the same file on every export when auto-exporting."""
+        if self.auto_export and self.export_file is None:
+            self.export_file = default_output_name()
+        summary_panel = self.query_one(SummaryPanel)
+        summary_panel.handle_export(
+            project_root=self.start_path,
+            output_file=self.export_file,
+            shard_budget=self.shard_budget,
+            compaction=self.compaction,
+        )
+
+    def action_delta_export(self) -> None:
+        """Export only the files that changed since the last export."""
+        baseline_file = last_manifest(self.start_path)
+        if baseline_file is None:
+            self.notify("No earlier export to compare against", severity="warning")
+            return
         summary_panel = self.query_one(SummaryPanel)
-        summary_panel.handle_export()
+        summary_panel.handle_export(
+            project_root=self.start_path, baseline_file=baseline_file, compaction=self.compaction
+        )
 
 
 def main() -> None:
@@ -0,0 +1,142 @@
+"""
+Budget-constrained file selection ("auto-fit") for Codestract.
+
+Nothing in this module may import Textual or Rich.
+"""
+
+import fnmatch
+import os
+import re
+import time
+from typing import Iterable, List, Optional, Pattern, Sequence, Tuple
+
+from .exporter import calculate_file_stats
+
+# Default token budget used when none is configured
+DEFAULT_TOKEN_BUDGET = 100_000
+
+# Files lose half of their recency priority every this many days
+DEFAULT_HALF_LIFE_DAYS = 30.0
+
+_SECONDS_PER_DAY = 86400.0
+
+
+class FitCandidate:
+    """A file that may be picked by ``auto_fit``."""
+
+    __slots__ = ("path", "tokens", "mtime")
+
+    def __init__(self, path: str, tokens: int, mtime: float) -> None:
+        self.path = path
+        self.tokens = tokens
+        self.mtime = mtime
+
+
+def gather_candidates(paths: Iterable[str]) -> List[FitCandidate]:
+    """
+    Build auto-fit candidates from file paths using the statistics cache.
+
+    Args:
+        paths: Paths of the files to consider
+
+    Returns:
+        Candidates with their estimated tokens and modification times
+    """
+    candidates = []
+    for path, stats in calculate_file_stats(set(paths)).items():
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            continue
+        candidates.append(FitCandidate(path, stats["tokens"], mtime))
+    return candidates
+
+
+def parse_path_weights(specs: Iterable[str]) -> List[Tuple[str, float]]:
+    """
+    Parse ``GLOB=WEIGHT`` specifications.
+
+    Raises:
+        ValueError: If a specification is malformed
+    """
+    weights = []
+    for spec in specs:
+        glob, sep, weight = spec.rpartition("=")
+        if not sep or not glob:
+            raise ValueError(f"invalid path weight {spec!r}, expected GLOB=WEIGHT")
+        weights.append((glob, float(weight)))
+    return weights
+
+
+def auto_fit(
+    candidates: Sequence[FitCandidate],
+    budget: int,
+    root: str,
+    path_weights: Iterable[Tuple[str, float]] = (),
+    half_life_days: float = DEFAULT_HALF_LIFE_DAYS,
+    now: Optional[float] = None,
+) -> List[str]:
+    """
+    Pick the most valuable subset of candidates that fits in a token budget.
+
+    A file's value is its path weight (from the last matching glob, 1.0 if
+    none match; 0 excludes the file) times a recency factor that halves every
+    ``half_life_days``. The 0/1 knapsack is solved greedily by value per token,
+    skipping files that no longer fit, and the result is compared with the
+    single most valuable file that fits, which bounds the answer to at least
+    half the optimum. This runs in O(n log n), a few tens of milliseconds for
+    50k candidates.
+
+    Args:
+        candidates: Files to choose from
+        budget: Maximum total tokens of the chosen files
+        root: Directory the path weight globs are relative to
+        path_weights: (glob, weight) pairs matched against "/"-separated relative paths
+        half_life_days: Age in days at which a file's recency factor halves
+        now: Reference time for recency, defaults to the current time
+
+    Returns:
+        Paths of the chosen files
+    """
+    if now is None:
+        now = time.time()
+    weights: List[Tuple[Pattern[str], float]] = [
+        (re.compile(fnmatch.translate(glob)), weight) for glob, weight in path_weights
+    ]
+    prefix = os.path.realpath(root) + os.sep
+    decay = max(half_life_days, 1e-9) * _SECONDS_PER_DAY
+
+    scored: List[Tuple[float, float, FitCandidate]] = []
+    for candidate in candidates:
+        if candidate.tokens > budget:
+            continue
+        weight = 1.0
+        if weights:
+            rel_path = candidate.path
+            if rel_path.startswith(prefix):
+                rel_path = rel_path[len(prefix) :]
+            rel_path = rel_path.replace(os.sep, "/")
+            for pattern, glob_weight in weights:
+                if pattern.match(rel_path):
+                    weight = glob_weight
+        if weight <= 0:
+            continue
+        age = max(now - candidate.mtime, 0.0)
+        value = weight * 0.5 ** (age / decay)
+        scored.append((value / max(candidate.tokens, 1), value, candidate))
+
+    scored.sort(key=lambda item: item[0], reverse=True)
+
+    chosen: List[str] = []
+    used = 0
+    total_value = 0.0
+    for _, value, candidate in scored:
+        if used + candidate.tokens <= budget:
+            chosen.append(candidate.path)
+            used += candidate.tokens
+            total_value += value
+
+    best = max(scored, key=lambda item: item[1], default=None)
+    if best is not None and best[1] > total_value:
+        return [best[2].path]
+    return chosen
@@ -0,0 +1,440 @@
+"""
+Command-line entry point dispatching between the TUI and headless commands.
+"""
+
+import argparse
+import os
+import re
+import sys
+from typing import Callable, List, Optional
+
+from .autofit import DEFAULT_HALF_LIFE_DAYS, DEFAULT_TOKEN_BUDGET, parse_path_weights
+from .compaction import CompactionOptions
+from .exporter import DEFAULT_READERS, ShardBudget
+from .utils import perf
+from .utils.logging import parse_levels
+
+
+def build_app_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the interactive app."""
+    parser = argparse.ArgumentParser(
+        prog="codestract",
+        description="Interactively select files and export them into a context file.",
+        epilog=(
+            "Run 'codestract export --help' or 'codestract search --help' "
+            "for the non-interactive modes."
+        ),
+    )
+    parser.add_argument("directory", nargs="?", default=None, help="directory to browse")
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=DEFAULT_TOKEN_BUDGET,
+        help=f"token budget used by auto-fit (default: {DEFAULT_TOKEN_BUDGET:,})",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="watch the project and update the selection totals when files change",
+    )
+    parser.add_argument(
+        "--auto-export",
+        action="store_true",
+        help="regenerate the export file whenever selected files change (implies --watch)",
+    )
+    parser.add_argument(
+        "-p",
+        "--profile",
+        metavar="NAME",
+        help="restore the selection saved as profile NAME (save profiles with 's')",
+    )
+    parser.add_argument(
+        "--perf",
+        action="store_true",
+        help="record timing spans and counters from the start (show them with 'p')",
+    )
+    parser.add_argument(
+        "--since",
+        metavar="BASE",
+        help="select the files changed since the branch was forked from BASE, e.g. origin/main",
+    )
+    _add_shard_arguments(parser)
+    _add_compaction_arguments(parser)
+    _add_log_level_argument(parser)
+    return parser
+
+
+def _add_filter_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the file filtering options shared by the headless commands."""
+    parser.add_argument(
+        "-i",
+        "--include",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="only consider files whose relative path matches GLOB (repeatable)",
+    )
+    parser.add_argument(
+        "-x",
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="skip files and directories whose relative path matches GLOB (repeatable)",
+    )
+    parser.add_argument(
+        "--no-ignore",
+        action="store_true",
+        help="do not honor .gitignore, .ignore and .codestractignore files",
+    )
+
+
+def _add_perf_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the option writing a performance profile of the run."""
+    parser.add_argument(
+        "--perf-out",
+        metavar="FILE",
+        help="record timing spans and counters and write them to FILE as JSON",
+    )
+
+
+def _add_log_level_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the option setting the levels of the project's log."""
+    parser.add_argument(
+        "--log-level",
+        metavar="SPEC",
+        help=(
+            "log levels as LEVEL or SUBSYSTEM=LEVEL items separated by commas, "
+            "e.g. 'warning,exporter=debug' (default: info)"
+        ),
+    )
+
+
+def _log_levels_or_exit(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Get the log levels given on the command line, if any."""
+    if not args.log_level:
+        return None
+    try:
+        return parse_levels(args.log_level)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def _run_recorded(profile_file: Optional[str], run: Callable[[], int]) -> int:
+    """Run a headless command, recording a performance profile if a file is given."""
+    if not profile_file:
+        return run()
+    perf.enable()
+    status = run()
+    try:
+        perf.dump(profile_file)
+    except OSError as e:
+        print(f"codestract: cannot write performance profile {profile_file}: {e}", file=sys.stderr)
+        return status or 1
+    return status
+
+
+def _add_shard_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options splitting an export into shards."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--shard-bytes",
+        type=int,
+        metavar="N",
+        help="split the export into files of at most N bytes, listed in an index file",
+    )
+    group.add_argument(
+        "--shard-tokens",
+        type=int,
+        metavar="N",
+        help="split the export into files of at most N estimated tokens, listed in an index file",
+    )
+
+
+def _shard_budget_or_exit(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Get the shard budget given on the command line, if any."""
+    if args.shard_bytes is not None:
+        limit, unit = args.shard_bytes, "bytes"
+    elif args.shard_tokens is not None:
+        limit, unit = args.shard_tokens, "tokens"
+    else:
+        return None
+    try:
+        return ShardBudget(limit, unit)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def _add_compaction_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options compacting exported contents."""
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help=(
+            "strip trailing whitespace, collapse blank lines, drop repeated license headers "
+            "and shorten minified or generated files"
+        ),
+    )
+    parser.add_argument(
+        "--strip-comments", action="store_true", help="remove comments (implies --compact)"
+    )
+    parser.add_argument(
+        "--strip-docstrings",
+        action="store_true",
+        help="remove Python docstrings (implies --compact)",
+    )
+    parser.add_argument(
+        "--generated",
+        choices=CompactionOptions.GENERATED_MODES,
+        default="truncate",
+        help="what compaction does with minified or generated files (default: %(default)s)",
+    )
+
+
+def _compaction_or_exit(
+    parser: argparse.ArgumentParser, args: argparse.Namespace, shard_budget: Optional[ShardBudget]
+) -> Optional[CompactionOptions]:
+    """Get the compaction steps given on the command line, if any."""
+    if not (args.compact or args.strip_comments or args.strip_docstrings):
+        return None
+    if shard_budget is not None:
+        parser.error("compaction cannot be combined with a shard budget")
+    return CompactionOptions(
+        strip_comments=args.strip_comments,
+        strip_docstrings=args.strip_docstrings,
+        generated=args.generated,
+    )
+
+
+def _add_pattern_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options controlling how a content search pattern is matched."""
+    parser.add_argument(
+        "--ignore-case",
+        action="store_true",
+        help="match the content pattern case-insensitively",
+    )
+    parser.add_argument(
+        "-F",
+        "--fixed-strings",
+        action="store_true",
+        help="treat the content pattern as literal text",
+    )
+
+
+def build_export_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the ``export`` subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="codestract export",
+        description="Export matching files under a directory into a context file.",
+    )
+    parser.add_argument("root", nargs="?", default=".", help="directory to export")
+    parser.add_argument("-o", "--output", help="path of the context file to write")
+    _add_filter_arguments(parser)
+    parser.add_argument(
+        "-g",
+        "--grep",
+        metavar="PATTERN",
+        help="only export files whose contents match the regular expression PATTERN",
+    )
+    _add_pattern_arguments(parser)
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        help="only export the highest-priority files that fit in this many tokens",
+    )
+    parser.add_argument(
+        "-w",
+        "--weight",
+        action="append",
+        default=[],
+        metavar="GLOB=WEIGHT",
+        help="priority multiplier for files matching GLOB when fitting a budget (repeatable)",
+    )
+    parser.add_argument(
+        "--half-life",
+        type=float,
+        default=DEFAULT_HALF_LIFE_DAYS,
+        metavar="DAYS",
+        help="age at which a file's recency priority halves (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--delta",
+        nargs="?",
+        const="",
+        metavar="MANIFEST",
+        help=(
+            "write only files added, modified or deleted since the export described by "
+            "MANIFEST (default: the last export of the directory)"
+        ),
+    )
+    parser.add_argument(
+        "--no-dedupe",
+        action="store_true",
+        help="write files with identical contents in full instead of as references",
+    )
+    parser.add_argument(
+        "--readers",
+        type=int,
+        default=DEFAULT_READERS,
+        help=f"number of reader threads (default: {DEFAULT_READERS})",
+    )
+    _add_shard_arguments(parser)
+    _add_compaction_arguments(parser)
+    parser.add_argument(
+        "--rev",
+        metavar="REVISION",
+        help=(
+            "export the tracked files as of a git branch, tag or commit, read from the "
+            "repository without checking it out"
+        ),
+    )
+    parser.add_argument(
+        "--since",
+        metavar="BASE",
+        help="only export files changed since the branch was forked from BASE, e.g. origin/main",
+    )
+    parser.add_argument(
+        "--tracked",
+        action="store_true",
+        help="list files with git instead of walking the directory, leaving untracked files out",
+    )
+    _add_perf_argument(parser)
+    _add_log_level_argument(parser)
+    return parser
+
+
+def build_search_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the ``search`` subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="codestract search",
+        description="List the files under a directory whose contents match a pattern.",
+    )
+    parser.add_argument("pattern", help="regular expression to search for")
+    parser.add_argument("root", nargs="?", default=".", help="directory to search")
+    _add_filter_arguments(parser)
+    _add_pattern_arguments(parser)
+    parser.add_argument(
+        "-l",
+        "--files-with-matches",
+        action="store_true",
+        help="print only the paths of matching files",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_READERS,
+        help=f"number of search threads (default: {DEFAULT_READERS})",
+    )
+    _add_perf_argument(parser)
+    return parser
+
+
+def _compile_or_exit(parser: argparse.ArgumentParser, args: argparse.Namespace, pattern: str):
+    """Compile a content search pattern, reporting invalid ones as usage errors."""
+    # Imported lazily so the interactive app does not pay for it
+    from .content_search import compile_pattern
+
+    try:
+        return compile_pattern(pattern, args.ignore_case, args.fixed_strings)
+    except re.error as e:
+        parser.error(f"invalid pattern {pattern!r}: {e}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Entry point for the ``codestract`` command."""
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if argv[:1] == ["export"]:
+        # Imported lazily so headless runs never load Textual or Rich
+        from .headless import run_export
+
+        parser = build_export_parser()
+        args = parser.parse_args(argv[1:])
+        try:
+            path_weights = parse_path_weights(args.weight)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.rev is not None:
+            for option, value in (
+                ("--grep", args.grep),
+                ("--token-budget", args.token_budget),
+                ("--delta", args.delta),
+                ("--shard-bytes", args.shard_bytes),
+                ("--shard-tokens", args.shard_tokens),
+            ):
+                if value is not None:
+                    parser.error(f"{option} cannot be combined with --rev")
+        shard_budget = _shard_budget_or_exit(parser, args)
+        if shard_budget is not None and args.delta is not None:
+            parser.error("--delta cannot be combined with a shard budget")
+        compaction = _compaction_or_exit(parser, args, shard_budget)
+        grep = _compile_or_exit(parser, args, args.grep) if args.grep is not None else None
+        log_levels = _log_levels_or_exit(parser, args)
+        sys.exit(
+            _run_recorded(
+                args.perf_out,
+                lambda: run_export(
+                    args.root,
+                    output=args.output,
+                    include=args.include,
+                    exclude=args.exclude,
+                    readers=args.readers,
+                    use_ignore_files=not args.no_ignore,
+                    token_budget=args.token_budget,
+                    path_weights=path_weights,
+                    half_life_days=args.half_life,
+                    grep=grep,
+                    dedupe=not args.no_dedupe,
+                    delta_from=args.delta,
+                    revision=args.rev,
+                    since=args.since,
+                    tracked=args.tracked,
+                    shard_budget=shard_budget,
+                    compaction=compaction,
+                    log_levels=log_levels,
+                ),
+            )
+        )
+
+    if argv[:1] == ["search"]:
+        from .headless import run_search
+
+        parser = build_search_parser()
+        args = parser.parse_args(argv[1:])
+        pattern = _compile_or_exit(parser, args, args.pattern)
+        sys.exit(
+            _run_recorded(
+                args.perf_out,
+                lambda: run_search(
+                    args.root,
+                    pattern,
+                    include=args.include,
+                    exclude=args.exclude,
+                    workers=args.workers,
+                    use_ignore_files=not args.no_ignore,
+                    files_only=args.files_with_matches,
+                ),
+            )
+        )
+
+    from .app import FileExportApp
+
+    parser = build_app_parser()
+    args = parser.parse_args(argv)
+    shard_budget = _shard_budget_or_exit(parser, args)
+    compaction = _compaction_or_exit(parser, args, shard_budget)
+    log_levels = _log_levels_or_exit(parser, args)
+    app = FileExportApp(
+        args.directory or os.getcwd(),
+        token_budget=args.token_budget,
+        watch=args.watch,
+        auto_export=args.auto_export,
+        profile=args.profile,
+        record_perf=args.perf,
+        log_levels=log_levels,
+        since=args.since,
+        shard_budget=shard_budget,
+        compaction=compaction,
+    )
+    app.run()
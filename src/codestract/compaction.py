@@ -0,0 +1,685 @@
+"""
+Compaction of exported contents, applied as they are streamed into an export.
+
+A file's contents pass through a chain of line transforms on their way from
+the input stream to the export file, so only a few lines are held in memory
+at a time:
+
+- minified and generated files, recognized by name, by markers such as
+  ``@generated`` or by very long lines without whitespace, are truncated or
+  omitted;
+- a license banner at the top of a file is dropped when an earlier file of
+  the export carried the same one;
+- comments, and Python docstrings, are stripped when asked for, with rules
+  chosen by the file's language;
+- trailing whitespace is removed and runs of blank lines are collapsed.
+
+Languages are registered by extension with ``register_language``. Python is
+stripped with ``tokenize``; other languages are described by their comment
+and string syntax and stripped with regular expressions, line by line.
+
+Nothing in this module may import Textual or Rich.
+"""
+
+import codecs
+import collections
+import hashlib
+import itertools
+import logging
+import os
+import re
+import threading
+import tokenize
+from typing import BinaryIO, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .utils.tokens import get_token_counter
+
+logger = logging.getLogger(__name__)
+
+# Size of the blocks contents are read in, and longest line passed on whole
+CHUNK_SIZE = 256 * 1024
+
+# Characters at the start of a file examined for minified or generated contents
+DETECT_SIZE = 64 * 1024
+
+# Lines at least this long with fewer spaces than the ratio are taken as minified
+MINIFIED_LINE_LENGTH = 1000
+MINIFIED_SPACE_RATIO = 0.1
+
+# Characters at the start of a file searched for generated-file markers
+MARKER_WINDOW = 2048
+
+# Most lines of a leading comment block examined as a license banner
+MAX_BANNER_LINES = 100
+
+# Markers open a line after comment punctuation, so prose mentioning them does not count
+_GENERATED_MARKERS = re.compile(
+    r"^[\s#/*;!<>\-\"']*(?:@generated|do not edit|code generated|auto-?generated"
+    r"|this file (?:is|was|has been) (?:auto-?|automatically )generated)",
+    re.IGNORECASE | re.MULTILINE,
+)
+_LICENSE_MARKERS = re.compile(r"copyright|licen[cs]e|spdx-license-identifier", re.IGNORECASE)
+
+# A regular expression literal, where an operand is expected: at the start of a line,
+# after an operator or opening bracket, or after "return"; a "/" after an identifier,
+# number or closing bracket divides. Slashes inside a character class do not end it.
+_REGEX_LITERAL = (
+    r"(?:^|(?<=[(\[{,;:=!&|?+\-*%<>~^])|(?<=\breturn))\s*"
+    r"/(?![/*])(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\[\n])+/[a-z]*"
+)
+
+_MINIFIED_NAMES = re.compile(r"[.-]min\.(?:js|mjs|css)$")
+_GENERATED_NAMES = re.compile(r"(?:_pb2\.pyi?|\.pb\.go|\.g\.dart|\.designer\.cs)$")
+LOCK_FILE_NAMES = {
+    "cargo.lock",
+    "composer.lock",
+    "gemfile.lock",
+    "package-lock.json",
+    "pnpm-lock.yaml",
+    "poetry.lock",
+    "yarn.lock",
+}
+
+
+class CompactionOptions:
+    """Which compaction steps to apply to an export."""
+
+    __slots__ = (
+        "strip_comments",
+        "strip_docstrings",
+        "max_blank_lines",
+        "drop_repeated_licenses",
+        "generated",
+        "truncate_chars",
+    )
+
+    GENERATED_MODES = ("keep", "truncate", "skip")
+
+    def __init__(
+        self,
+        strip_comments: bool = False,
+        strip_docstrings: bool = False,
+        max_blank_lines: int = 1,
+        drop_repeated_licenses: bool = True,
+        generated: str = "truncate",
+        truncate_chars: int = 2048,
+    ) -> None:
+        """
+        Initialize the options.
+
+        Args:
+            strip_comments: Whether to remove comments
+            strip_docstrings: Whether to remove Python docstrings
+            max_blank_lines: Longest run of blank lines kept
+            drop_repeated_licenses: Whether to drop license banners seen in an earlier file
+            generated: What to do with minified or generated files: ``"keep"``
+                them, ``"truncate"`` them to ``truncate_chars`` or ``"skip"``
+                their contents
+            truncate_chars: Characters kept of a truncated file
+
+        Raises:
+            ValueError: If the mode for generated files is unknown
+        """
+        if generated not in self.GENERATED_MODES:
+            raise ValueError(f"unknown mode for generated files: {generated}")
+        self.strip_comments = strip_comments
+        self.strip_docstrings = strip_docstrings
+        self.max_blank_lines = max(max_blank_lines, 0)
+        self.drop_repeated_licenses = drop_repeated_licenses
+        self.generated = generated
+        self.truncate_chars = truncate_chars
+
+
+# Transform of a file's lines, each ending with "\n" except possibly the last
+LineFilter = Callable[["Language", Iterator[str], CompactionOptions], Iterator[str]]
+
+
+class Language:
+    """Comment and string syntax of a family of languages."""
+
+    __slots__ = (
+        "name",
+        "line_comment",
+        "block_comment",
+        "quotes",
+        "regex_literals",
+        "strip",
+        "_pattern",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        line_comment: Optional[str] = None,
+        block_comment: Optional[Tuple[str, str]] = None,
+        quotes: str = "\"'",
+        regex_literals: bool = False,
+        strip: Optional[LineFilter] = None,
+    ) -> None:
+        """
+        Initialize a language.
+
+        Args:
+            name: Name of the language family
+            line_comment: Marker of comments running to the end of the line
+            block_comment: Start and end markers of comments spanning lines
+            quotes: Characters delimiting string literals, which are never
+                searched for comments; strings end at the end of a line
+            regex_literals: Whether ``/.../`` regular expression literals, as in
+                JavaScript, are recognized where an operand is expected and
+                never searched for comments
+            strip: Transform removing comments, and docstrings where the
+                language has them; by default comments are found with the
+                syntax above
+        """
+        self.name = name
+        self.line_comment = line_comment
+        self.block_comment = block_comment
+        self.quotes = quotes
+        self.regex_literals = regex_literals
+        self.strip = strip or _strip_comments
+        self._pattern: Optional["re.Pattern[str]"] = None
+
+    @property
+    def pattern(self) -> "re.Pattern[str]":
+        """
+        Regular expression matching a literal or the start of a comment.
+
+        Literals, which are copied unchanged, match as the ``literal`` group.
+        """
+        if self._pattern is None:
+            literals = [rf"{q}(?:\\.|[^{q}\\\n])*{q}" for q in map(re.escape, self.quotes)]
+            if self.regex_literals:
+                literals.append(_REGEX_LITERAL)
+            alternatives = [f"(?P<literal>{'|'.join(literals)})"] if literals else []
+            if self.block_comment is not None:
+                alternatives.append(re.escape(self.block_comment[0]))
+            if self.line_comment == "#":
+                # Only after whitespace, so "$#" or "color: #fff" are left alone
+                alternatives.append(r"(?<!\S)#.*")
+            elif self.line_comment is not None:
+                alternatives.append(re.escape(self.line_comment) + ".*")
+            self._pattern = re.compile("|".join(alternatives))
+        return self._pattern
+
+    def is_comment(self, stripped: str) -> bool:
+        """Check whether a line, stripped of surrounding whitespace, starts with a comment."""
+        return bool(
+            (self.line_comment and stripped.startswith(self.line_comment))
+            or (self.block_comment and stripped.startswith(self.block_comment[0]))
+        )
+
+
+def _ending(line: str) -> Tuple[str, str]:
+    """Split a line into its text and its line ending."""
+    if line.endswith("\n"):
+        return line[:-1], "\n"
+    return line, ""
+
+
+def _strip_comments(
+    language: Language, lines: Iterator[str], options: CompactionOptions
+) -> Iterator[str]:
+    """Remove comments found with the language's syntax, dropping lines left empty."""
+    if not options.strip_comments:
+        yield from lines
+        return
+    pattern = language.pattern
+    block_start, block_end = language.block_comment or (None, "")
+    in_block = False
+
+    for line in lines:
+        text, ending = _ending(line)
+        parts: List[str] = []
+        position = 0
+        removed = False
+        if in_block:
+            end = text.find(block_end)
+            if end < 0:
+                continue
+            position = end + len(block_end)
+            in_block = False
+            removed = True
+
+        while True:
+            match = pattern.search(text, position)
+            if match is None:
+                parts.append(text[position:])
+                break
+            if match.lastgroup == "literal":
+                parts.append(text[position : match.end()])
+                position = match.end()
+                continue
+            parts.append(text[position : match.start()])
+            removed = True
+            if match.group() != block_start:
+                break  # A line comment runs to the end of the line
+            end = text.find(block_end, match.end())
+            if end < 0:
+                in_block = True
+                break
+            position = end + len(block_end)
+            # Leave a single space between the code on either side of an inline comment
+            if parts[-1].strip():
+                parts[-1] = parts[-1].rstrip()
+                if text[position : position + 1].strip():
+                    parts.append(" ")
+            else:
+                # Keep the indentation before the comment but not the space after it
+                while text[position : position + 1] in (" ", "\t"):
+                    position += 1
+
+        if not removed:
+            yield line
+            continue
+        stripped = "".join(parts).rstrip()
+        if stripped.strip():
+            yield stripped + ending
+
+
+def _strip_python(
+    language: Language, lines: Iterator[str], options: CompactionOptions
+) -> Iterator[str]:
+    """
+    Remove comments and docstrings from Python source using ``tokenize``.
+
+    Lines are handed to the tokenizer one at a time and passed on as soon as
+    no later token can change them. A docstring that is the only statement
+    of a function or class body is replaced with ``...``, keeping the body
+    valid. Source the tokenizer rejects is passed on unchanged from the
+    point where it failed.
+    """
+    if not (options.strip_comments or options.strip_docstrings):
+        yield from lines
+        return
+
+    pending: Deque[str] = collections.deque()  # Lines read but not passed on yet
+    first_row = 1  # Row of the first pending line
+    dropped: Set[int] = set()
+    cut: Dict[int, int] = {}  # Row -> column a trailing comment starts at
+    replaced: Dict[int, str] = {}
+
+    def readline() -> str:
+        line = next(lines, "")
+        if line:
+            pending.append(line)
+        return line
+
+    def passed_on(row: int) -> Iterator[str]:
+        """Pass on the pending lines before a row."""
+        nonlocal first_row
+        while pending and first_row < row:
+            line = pending.popleft()
+            column = cut.pop(first_row, None)
+            if first_row in replaced:
+                yield replaced.pop(first_row)
+            elif column is not None and first_row not in dropped:
+                text, ending = _ending(line)
+                yield text[:column].rstrip() + ending
+            elif first_row not in dropped:
+                yield line
+            dropped.discard(first_row)
+            first_row += 1
+
+    # A string opening a module or a def/class body may be a docstring
+    docstring_allowed = options.strip_docstrings
+    header = ""  # First token of the current logical line
+    previous_header = ""
+    line_start = True
+    # (first row, last row, column, inside a def/class) of a string statement
+    candidate: Optional[Tuple[int, int, int, bool]] = None
+    docstring: Optional[Tuple[int, int, int, bool]] = None  # Waiting for the next statement
+    in_body = False
+
+    try:
+        for token in tokenize.generate_tokens(readline):
+            kind = token.type
+            row = token.start[0]
+            if kind == tokenize.COMMENT:
+                if options.strip_comments and not (row == 1 and token.string.startswith("#!")):
+                    if token.line[: token.start[1]].strip():
+                        cut[row] = token.start[1]
+                    else:
+                        dropped.add(row)
+            elif kind == tokenize.NL:
+                pass
+            elif kind == tokenize.NEWLINE:
+                if candidate is not None:
+                    docstring, candidate = candidate, None
+                previous_header, line_start = header, True
+            else:
+                if docstring is not None:
+                    start, end, column, body = docstring
+                    dropped.update(range(start, end + 1))
+                    if body and kind in (tokenize.DEDENT, tokenize.ENDMARKER):
+                        replaced[start] = " " * column + "...\n"
+                    docstring = None
+                if kind == tokenize.INDENT:
+                    in_body = previous_header in ("def", "class", "async")
+                    docstring_allowed = options.strip_docstrings and in_body
+                elif kind != tokenize.DEDENT and kind != tokenize.ENDMARKER:
+                    if line_start:
+                        if docstring_allowed and kind == tokenize.STRING:
+                            candidate = (row, token.end[0], token.start[1], in_body)
+                        docstring_allowed = False
+                        header = token.string
+                        line_start = False
+                    else:
+                        candidate = None  # More follows the string on its line
+            # Lines a pending docstring decision may still change are held back
+            waiting = candidate or docstring
+            yield from passed_on(min(row, waiting[0]) if waiting else row)
+    except (tokenize.TokenError, SyntaxError) as e:
+        logger.debug(f"Passing on Python source unchanged after a tokenizer error: {e}")
+        dropped.clear()
+        cut.clear()
+        replaced.clear()
+        yield from pending
+        yield from lines
+        return
+    yield from passed_on(first_row + len(pending))
+
+
+def _collapse_whitespace(lines: Iterator[str], max_blank_lines: int) -> Iterator[str]:
+    """Remove trailing whitespace and blank lines at the ends, and shorten blank runs."""
+    blank = 0
+    started = False
+    for line in lines:
+        text, ending = _ending(line)
+        if not ending:
+            # A fragment of an overlong line, or the last line
+            if not text.strip():
+                continue
+            if started and blank:
+                yield "\n" * min(blank, max_blank_lines)
+            yield line
+            started, blank = True, 0
+            continue
+        text = text.rstrip()
+        if not text:
+            blank += 1
+            continue
+        if started and blank:
+            yield "\n" * min(blank, max_blank_lines)
+        yield text + "\n"
+        started, blank = True, 0
+
+
+PYTHON = Language("python", "#", strip=_strip_python)
+C_LIKE = Language("c", "//", ("/*", "*/"), quotes="\"'`")
+JAVASCRIPT = Language("javascript", "//", ("/*", "*/"), quotes="\"'`", regex_literals=True)
+# Lifetimes such as 'a would be taken as the start of a character literal
+RUST = Language("rust", "//", ("/*", "*/"), quotes='"')
+CSS = Language("css", block_comment=("/*", "*/"))
+HASH = Language("hash", "#")
+SQL = Language("sql", "--", ("/*", "*/"))
+LUA = Language("lua", "--")
+MARKUP = Language("markup", block_comment=("<!--", "-->"), quotes="")
+
+# Lowercased extension, or file name for files without one -> language
+_LANGUAGES: Dict[str, Language] = {}
+
+
+def register_language(language: Language, extensions: Iterable[str]) -> None:
+    """
+    Use a language's rules for files with the given extensions.
+
+    Args:
+        language: Language to register
+        extensions: Extensions such as ``".py"``, or whole file names such as
+            ``"Makefile"`` for files without an extension
+    """
+    for extension in extensions:
+        _LANGUAGES[extension.lower()] = language
+
+
+register_language(PYTHON, (".py", ".pyi", ".pyw"))
+register_language(
+    C_LIKE,
+    ".c .h .cc .cpp .cxx .hh .hpp .m .mm .cs .java .kt .kts .scala .groovy .swift .dart .go "
+    ".proto".split(),
+)
+register_language(JAVASCRIPT, ".js .jsx .mjs .cjs .ts .tsx .mts .cts".split())
+register_language(RUST, [".rs"])
+register_language(CSS, [".css", ".scss", ".less"])
+register_language(
+    HASH,
+    ".sh .bash .zsh .fish .rb .pl .pm .r .yaml .yml .toml .cmake makefile dockerfile".split(),
+)
+register_language(SQL, [".sql"])
+register_language(LUA, [".lua"])
+register_language(MARKUP, [".html", ".htm", ".xml", ".svg", ".vue", ".md"])
+
+
+def language_for(file_path: str) -> Optional[Language]:
+    """Get the language of a file from its extension or name, or None if unknown."""
+    name = os.path.basename(file_path).lower()
+    ext = os.path.splitext(name)[1]
+    return _LANGUAGES.get(ext or name)
+
+
+def detect_generated(file_path: str, head: str) -> Optional[str]:
+    """
+    Check whether a file looks minified or generated.
+
+    Args:
+        file_path: Path of the file
+        head: Text at the start of the file, ideally ``DETECT_SIZE`` characters
+
+    Returns:
+        ``"minified"`` or ``"generated"``, or None for an ordinary file
+    """
+    name = os.path.basename(file_path).lower()
+    if _MINIFIED_NAMES.search(name):
+        return "minified"
+    if name in LOCK_FILE_NAMES or _GENERATED_NAMES.search(name):
+        return "generated"
+    if _GENERATED_MARKERS.search(head, 0, MARKER_WINDOW):
+        return "generated"
+    for line in head.split("\n"):
+        if len(line) < MINIFIED_LINE_LENGTH:
+            continue
+        if line.count(" ") < len(line) * MINIFIED_SPACE_RATIO:
+            return "minified"
+    return None
+
+
+def _banner_key(lines: List[str]) -> bytes:
+    """Identify a banner by its words, ignoring comment markers, punctuation and years."""
+    words = re.sub(r"[\W\d_]+", " ", "".join(lines).lower()).strip()
+    return hashlib.blake2b(words.encode(), digest_size=16).digest()
+
+
+class Compactor:
+    """
+    Compacts the files of one export.
+
+    License banners are remembered across the files of the export, which may
+    be compacted on several threads.
+    """
+
+    def __init__(self, options: CompactionOptions) -> None:
+        self.options = options
+        self._banners: Set[bytes] = set()
+        self._lock = threading.Lock()
+
+    def reader(self, file_path: str, infile: BinaryIO, hasher=None) -> "CompactedReader":
+        """
+        Wrap a file's contents in a stream yielding them compacted.
+
+        Args:
+            file_path: Path of the file, used to choose its language
+            infile: Binary stream of the contents
+            hasher: Optional hash object updated with the contents before compaction
+
+        Returns:
+            Stream to read the compacted contents from
+        """
+        return CompactedReader(self, file_path, infile, hasher)
+
+    def _is_repeated(self, key: bytes) -> bool:
+        """Check whether a banner was seen before, remembering it otherwise."""
+        with self._lock:
+            if key in self._banners:
+                return True
+            self._banners.add(key)
+            return False
+
+    def _drop_repeated_banner(self, language: Language, lines: Iterator[str]) -> Iterator[str]:
+        """Drop a leading comment block naming a license if an earlier file had the same."""
+        block_start, block_end = language.block_comment or ("", "")
+        banner: List[str] = []
+        code: List[str] = []  # The line ending the banner
+        in_block = False
+        for line in lines:
+            stripped = line.strip()
+            if not banner and stripped.startswith("#!"):
+                yield line
+                continue
+            if in_block:
+                in_block = block_end not in stripped
+            elif block_start and stripped.startswith(block_start):
+                in_block = block_end not in stripped[len(block_start) :]
+            elif stripped and not language.is_comment(stripped):
+                code.append(line)
+                break
+            banner.append(line)
+            if len(banner) >= MAX_BANNER_LINES:
+                break
+
+        repeated = (
+            len(banner) < MAX_BANNER_LINES
+            and _LICENSE_MARKERS.search("".join(banner)) is not None
+            and self._is_repeated(_banner_key(banner))
+        )
+        if not repeated:
+            yield from banner
+        yield from code
+        yield from lines
+
+    def _compact(self, language: Optional[Language], lines: Iterator[str]) -> Iterator[str]:
+        """Chain the transforms that apply to a file of a language."""
+        options = self.options
+        if language is not None:
+            if options.drop_repeated_licenses:
+                lines = self._drop_repeated_banner(language, lines)
+            lines = language.strip(language, lines, options)
+        return _collapse_whitespace(lines, options.max_blank_lines)
+
+
+class CompactedReader:
+    """
+    Stream of a file's contents after compaction.
+
+    Contents are read from the underlying stream only as compacted output is
+    requested. The statistics of the original contents are counted in the
+    same pass, the way ``exporter`` counts them, and are available in
+    ``original_stats`` once everything has been read.
+    """
+
+    def __init__(self, compactor: Compactor, file_path: str, infile: BinaryIO, hasher=None):
+        self.file_path = file_path
+        self.original_stats: Dict[str, int] = {}
+        self.generated: Optional[str] = None  # Why the file was truncated or skipped
+        self._compactor = compactor
+        self._infile = infile
+        self._hasher = hasher
+        self._lines = self._read_lines()
+        self._output: Optional[Iterator[str]] = None
+        self._buffer = b""
+
+    def _read_lines(self) -> Iterator[str]:
+        """Decode the contents into lines, counting their statistics."""
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        counter = get_token_counter()
+        chars = lines = size = 0
+        tokens = 0.0
+        last_byte = b""
+        partial = ""
+
+        while True:
+            chunk = self._infile.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if self._hasher is not None:
+                self._hasher.update(chunk)
+            text = decoder.decode(chunk)
+            chars += len(text)
+            tokens += counter.count(chunk, text)
+            lines += chunk.count(b"\n")
+            size += len(chunk)
+            last_byte = chunk[-1:]
+
+            *complete, partial = (partial + text).split("\n")
+            for line in complete:
+                yield line + "\n"
+            while len(partial) > CHUNK_SIZE:
+                yield partial[:CHUNK_SIZE]
+                partial = partial[CHUNK_SIZE:]
+
+        text = decoder.decode(b"", final=True)
+        chars += len(text)
+        if size and last_byte != b"\n":
+            lines += 1
+        self.original_stats = {
+            "chars": chars,
+            "lines": lines,
+            "size": size,
+            "tokens": counter.finish(tokens),
+        }
+        if partial + text:
+            yield partial + text
+
+    def _truncated(self, head: List[str]) -> Iterator[str]:
+        """Yield the start of a minified or generated file and a note on what was left out."""
+        options = self._compactor.options
+        if options.generated == "truncate":
+            text = "".join(head)[: options.truncate_chars]
+            if "\n" in text:
+                text = text[: text.rindex("\n") + 1]
+            if text:
+                yield text if text.endswith("\n") else text + "\n"
+        for _ in self._lines:
+            pass
+        action = "truncated" if options.generated == "truncate" else "omitted"
+        yield f"... [{self.generated} file {action}, {self.original_stats['size']:,} bytes]\n"
+
+    def _start(self) -> Iterator[str]:
+        """Look at the start of the file and chain the transforms that apply to it."""
+        head: List[str] = []
+        if self._compactor.options.generated != "keep":
+            length = 0
+            for line in self._lines:
+                head.append(line)
+                length += len(line)
+                if length >= DETECT_SIZE:
+                    break
+            self.generated = detect_generated(self.file_path, "".join(head))
+            if self.generated is not None:
+                logger.debug(f"Compacting {self.generated} file {self.file_path}")
+                return self._truncated(head)
+        lines = itertools.chain(head, self._lines)
+        return self._compactor._compact(language_for(self.file_path), lines)
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to ``size`` bytes of compacted contents, or all of them if negative."""
+        if self._output is None:
+            self._output = self._start()
+        pieces: List[str] = []
+        # Every character takes at least a byte, so this many characters are enough
+        needed = size - len(self._buffer)
+        for text in self._output:
+            pieces.append(text)
+            needed -= len(text)
+            if size >= 0 and needed <= 0:
+                break
+        else:
+            # Transforms may stop early; the original statistics need every byte
+            for _ in self._lines:
+                pass
+        data = self._buffer + "".join(pieces).encode("utf-8")
+        if size < 0:
+            self._buffer = b""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
@@ -0,0 +1,185 @@
+"""
+Parallel content search for selecting files by what they contain.
+
+Nothing in this module may import Textual or Rich.
+"""
+
+import logging
+import mmap
+import os
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Optional, Pattern, Set
+
+from .exporter import DEFAULT_READERS
+from .utils import perf
+from .utils.file_utils import is_text_file
+from .utils.ignore import IgnoreEngine
+from .utils.walker import walk_files
+
+logger = logging.getLogger(__name__)
+
+# Files at least this large are searched through a memory map instead of read
+MMAP_THRESHOLD = 1024 * 1024
+
+# Longest matching line kept for display, in bytes
+MAX_LINE_PREVIEW = 200
+
+# Called with the number of files searched so far
+SearchProgressCallback = Callable[[int], None]
+
+
+class ContentMatch:
+    """The first line of a file matching a content search."""
+
+    __slots__ = ("path", "line_number", "line")
+
+    def __init__(self, path: str, line_number: int, line: str) -> None:
+        self.path = path
+        self.line_number = line_number
+        self.line = line
+
+
+def compile_pattern(
+    pattern: str, ignore_case: bool = False, fixed_strings: bool = False
+) -> Pattern[bytes]:
+    """
+    Compile a search pattern for matching raw file contents.
+
+    Args:
+        pattern: Regular expression, or literal text if ``fixed_strings``
+        ignore_case: Whether to match case-insensitively
+        fixed_strings: Whether the pattern is literal text
+
+    Returns:
+        Compiled bytes pattern
+
+    Raises:
+        re.error: If the pattern is not a valid regular expression
+    """
+    source = pattern.encode("utf-8")
+    if fixed_strings:
+        source = re.escape(source)
+    return re.compile(source, re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+
+
+def _first_match(path: str, data, pattern: Pattern[bytes]) -> Optional[ContentMatch]:
+    """Locate the first match of a pattern in a file's bytes or memory map."""
+    match = pattern.search(data)
+    if match is None:
+        return None
+    start = match.start()
+    line_start = data.rfind(b"\n", 0, start) + 1
+    line_end = data.find(b"\n", start)
+    if line_end == -1:
+        line_end = len(data)
+    line_number = data[:line_start].count(b"\n") + 1
+    line = data[line_start : min(line_end, line_start + MAX_LINE_PREVIEW)]
+    return ContentMatch(path, line_number, line.decode("utf-8", "replace").strip())
+
+
+@perf.timed("search.file")
+def search_file(path: str, pattern: Pattern[bytes]) -> Optional[ContentMatch]:
+    """
+    Search one file for a pattern.
+
+    Args:
+        path: Path of the file
+        pattern: Pattern from ``compile_pattern``
+
+    Returns:
+        The first match, or None if the file does not match
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        perf.count("files_opened")
+        perf.count("bytes_read", size)
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _first_match(path, data, pattern)
+        return _first_match(path, f.read(), pattern)
+
+
+def _search_one(
+    path: str, st: os.stat_result, pattern: Pattern[bytes], cancel: threading.Event
+) -> Optional[ContentMatch]:
+    """Classify and search a file on a worker thread."""
+    if cancel.is_set() or not is_text_file(path, st):
+        return None
+    try:
+        return search_file(path, pattern)
+    except (OSError, ValueError) as e:
+        logger.debug(f"Skipping {path} in content search: {e}")
+        return None
+
+
+def search_contents(
+    root: str,
+    pattern: Pattern[bytes],
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+    use_ignore_files: bool = True,
+    workers: int = DEFAULT_READERS,
+    cancel: Optional[threading.Event] = None,
+    progress: Optional[SearchProgressCallback] = None,
+) -> Iterator[ContentMatch]:
+    """
+    Search the text files under a root in parallel, yielding matches as they are found.
+
+    The walk feeds a pool of worker threads that classify, read and search
+    files; at most a few files per worker are in flight, so memory stays
+    bounded on large trees. Matches arrive in completion order. Setting
+    ``cancel`` stops the walk and skips files that have not been searched
+    yet; closing the generator drops queued files. Files already being
+    searched finish first.
+
+    Args:
+        root: Directory to search
+        pattern: Pattern from ``compile_pattern``
+        include: Globs a file's root-relative path must match, if any are given
+        exclude: Globs excluding files and directories by root-relative path
+        use_ignore_files: Whether to honor .gitignore, .ignore and .codestractignore
+        workers: Number of worker threads
+        cancel: Event that stops the search when set
+        progress: Optional callback receiving the number of files searched
+
+    Yields:
+        The first match of each matching file
+    """
+    root = os.path.realpath(root)
+    ignore = IgnoreEngine(root) if use_ignore_files else None
+    cancel = cancel or threading.Event()
+    workers = max(1, workers)
+    max_pending = workers * 4
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="codestract-search")
+    pending: Set[Future] = set()
+    searched = 0
+
+    def collect(done: Set[Future]) -> Iterator[ContentMatch]:
+        nonlocal searched
+        for future in done:
+            searched += 1
+            match = future.result()
+            if match is not None:
+                yield match
+        if progress is not None:
+            progress(searched)
+
+    try:
+        for path, st in walk_files(root, include=include, exclude=exclude, ignore=ignore):
+            if cancel.is_set():
+                return
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from collect(done)
+            pending.add(executor.submit(_search_one, path, st, pattern, cancel))
+
+        while pending and not cancel.is_set():
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from collect(done)
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -2,126 +2,1512 @@
 Module for handling file export operations in Codestract.
 """
 
+import codecs
+import hashlib
+import io
+import json
 import logging
+import math
+import mmap
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
 from datetime import datetime
-from typing import Dict, Set
+from typing import BinaryIO, Callable, Dict, List, Optional, Set, Tuple
 
+from .compaction import CompactedReader, CompactionOptions, Compactor
+from .git_source import CatFileBatch, TrackedFile
+from .manifest import Manifest, manifest_path, record_last_manifest
+from .utils import perf
+from .utils.file_utils import SNIFF_SIZE, is_text_data
+from .utils.stats_cache import StatsCache, get_stats_cache
+from .utils.tokens import estimate_tokens, get_token_counter
 
-def calculate_file_stats(files: Set[str]) -> Dict[str, Dict[str, int]]:
+logger = logging.getLogger(__name__)
+
+# Size of the blocks files are streamed in; bounds peak memory per file
+CHUNK_SIZE = 256 * 1024
+
+# Files at least this large get their statistics counted through a memory map
+MMAP_STATS_THRESHOLD = 8 * 1024 * 1024
+
+# UTF-8 continuation bytes; every other byte starts a code point
+_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+# Width reserved for numeric header fields while their values are not known yet
+STAT_FIELD_WIDTH = 24
+
+# Number of threads prefetching file contents during export
+DEFAULT_READERS = 8
+
+# Upper bound on file contents held in memory while waiting to be written
+MAX_INFLIGHT_BYTES = 64 * 1024 * 1024
+
+# Bytes of the content hash used to detect duplicate files
+DIGEST_SIZE = 16
+
+# Index of a sharded export, next to its shards
+SHARD_INDEX_SUFFIX = ".index.json"
+SHARD_INDEX_VERSION = 1
+
+# Called with (files done, total files) as an export progresses
+ProgressCallback = Callable[[int, int], None]
+
+
+def _content_hash(data: bytes = b""):
+    """Create the hash object used to identify duplicate contents."""
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE)
+
+
+def _scan_stream(
+    infile: BinaryIO, outfile: Optional[BinaryIO] = None, hasher=None
+) -> Dict[str, int]:
+    """
+    Count lines, characters, bytes and tokens of a stream in bounded chunks.
+
+    Contents are validated as UTF-8 on the fly and, when ``outfile`` is given,
+    copied to it in the same pass. Lines are counted the way ``str.splitlines``
+    counts ``\\n`` terminated text: one per newline plus a final unterminated line.
+
+    Args:
+        infile: Binary stream to read from
+        outfile: Optional binary stream to copy the contents to
+        hasher: Optional hash object updated with the contents
+
+    Returns:
+        Dictionary with the chars, lines, size and estimated tokens of the stream
+
+    Raises:
+        UnicodeDecodeError: If the contents are not valid UTF-8
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    counter = get_token_counter()
+    chars = lines = size = 0
+    tokens = 0.0
+    last_byte = b""
+
+    while True:
+        chunk = infile.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        text = decoder.decode(chunk)
+        chars += len(text)
+        tokens += counter.count(chunk, text)
+        lines += chunk.count(b"\n")
+        size += len(chunk)
+        last_byte = chunk[-1:]
+        if outfile is not None:
+            outfile.write(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+
+    chars += len(decoder.decode(b"", final=True))
+    if size and last_byte != b"\n":
+        lines += 1
+
+    return {"chars": chars, "lines": lines, "size": size, "tokens": counter.finish(tokens)}
+
+
+def _scan_bytes(data, release: bool = False) -> Dict[str, int]:
+    """
+    Count lines, code points, bytes and tokens of a buffer without decoding it.
+
+    Code points are counted as the bytes that are not UTF-8 continuation
+    bytes, which is exact for valid UTF-8 and a close estimate otherwise, so
+    invalid contents still get useful statistics. Only one chunk is copied
+    at a time.
+
+    Args:
+        data: Bytes or memory map to scan
+        release: Whether to drop scanned pages of a memory map from the
+            process, keeping resident memory flat for huge files
+
+    Returns:
+        Dictionary with the chars, lines, size and estimated tokens of the buffer
+    """
+    counter = get_token_counter()
+    decoder = codecs.getincrementaldecoder("utf-8")("replace") if counter.needs_text else None
+    release = release and hasattr(data, "madvise")
+    size = len(data)
+    chars = lines = 0
+    tokens = 0.0
+
+    for start in range(0, size, CHUNK_SIZE):
+        chunk = data[start : start + CHUNK_SIZE]
+        chars += len(chunk.translate(None, _CONTINUATION_BYTES))
+        lines += chunk.count(b"\n")
+        tokens += counter.count(chunk, decoder.decode(chunk) if decoder else None)
+        if release:
+            data.madvise(mmap.MADV_DONTNEED, start, len(chunk))
+
+    if size and data[size - 1 : size] != b"\n":
+        lines += 1
+
+    return {"chars": chars, "lines": lines, "size": size, "tokens": counter.finish(tokens)}
+
+
+def _scan_mapped(infile: BinaryIO) -> Dict[str, int]:
+    """Count the statistics of a large file through a read-only memory map."""
+    with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if hasattr(data, "madvise"):
+            data.madvise(mmap.MADV_SEQUENTIAL)
+        return _scan_bytes(data, release=True)
+
+
+def calculate_file_stats(
+    files: Set[str], cache: Optional[StatsCache] = None
+) -> Dict[str, Dict[str, int]]:
     """
     Calculate statistics for the given files.
 
+    Files whose inode, size and modification time match a cached entry are
+    answered from the cache without being opened. Files of at least
+    ``MMAP_STATS_THRESHOLD`` bytes, and files that are not valid UTF-8, are
+    counted on their raw bytes instead of being decoded.
+
     Args:
         files: Set of file paths to analyze
+        cache: Statistics cache to use, defaults to the process-wide cache
 
     Returns:
-        Dictionary mapping file paths to their statistics (chars, lines, size)
+        Dictionary mapping file paths to their statistics (chars, lines, size, tokens)
     """
+    if cache is None:
+        cache = get_stats_cache()
     stats: Dict[str, Dict[str, int]] = {}
 
-    for file_path in files:
+    with perf.span("calculate_file_stats"):
+        for file_path in files:
+            _file_stats(file_path, cache, stats)
+    return stats
+
+
+def _file_stats(file_path: str, cache: StatsCache, stats: Dict[str, Dict[str, int]]) -> None:
+    """Add the statistics of one file to ``stats``, from the cache if possible."""
+    try:
+        cached = cache.lookup(file_path, os.stat(file_path))
+        if cached is not None:
+            perf.count("stats.cache_hits")
+            stats[file_path] = cached
+            return
+
+        perf.count("stats.cache_misses")
+        with open(file_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            perf.count("files_opened")
+            perf.count("bytes_read", st.st_size)
+            if st.st_size >= MMAP_STATS_THRESHOLD:
+                stats[file_path] = _scan_mapped(f)
+            else:
+                try:
+                    stats[file_path] = _scan_stream(f)
+                except UnicodeDecodeError:
+                    f.seek(0)
+                    stats[file_path] = _scan_bytes(f.read())
+        cache.store(file_path, st, stats[file_path])
+    except Exception as e:
+        logger.error(f"Error reading file {file_path}: {e}")
+        stats[file_path] = {"chars": 0, "lines": 0, "size": 0, "tokens": 0}
+
+
+def _write_text(outfile: BinaryIO, text: str) -> None:
+    """Write a text fragment to the binary output stream."""
+    outfile.write(text.encode("utf-8"))
+
+
+class _PatchedOutput:
+    """
+    Binary output stream with fields whose values are known only later.
+
+    A field is reserved at a fixed width so writing can go on past it, and
+    its value is recorded once known. ``finish`` rewrites the stream in place
+    with every field at the exact width of its value, moving the bytes after
+    it back, so the output reads as if the values had been written directly.
+    Truncating the stream drops the fields reserved past the new end.
+    """
+
+    __slots__ = ("stream", "_fields")
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self.stream = stream  # Opened for reading and writing
+        self._fields: Dict[int, bytes] = {}  # Offset of a reserved field -> its value
+
+    def __enter__(self) -> "_PatchedOutput":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                stats[file_path] = {
-                    "chars": len(content),
-                    "lines": len(content.splitlines()),
-                    "size": os.path.getsize(file_path),
-                }
-        except Exception as e:
-            logging.error(f"Error reading file {file_path}: {e}")
-            stats[file_path] = {"chars": 0, "lines": 0, "size": 0}
+            if exc_type is None:
+                self.finish()
+        finally:
+            self.stream.close()
 
-    return stats
+    def write(self, data: bytes) -> int:
+        return self.stream.write(data)
+
+    def tell(self) -> int:
+        return self.stream.tell()
+
+    def seek(self, offset: int) -> int:
+        return self.stream.seek(offset)
+
+    def truncate(self) -> None:
+        """Cut the stream at the current position, with the fields reserved past it."""
+        end = self.stream.tell()
+        self.stream.truncate()
+        for offset in [offset for offset in self._fields if offset >= end]:
+            del self._fields[offset]
+
+    def reserve(self) -> int:
+        """
+        Reserve a field at the current position.
+
+        Returns:
+            Offset of the field, to pass to ``patch``
+        """
+        offset = self.stream.tell()
+        self.stream.write(b" " * STAT_FIELD_WIDTH)
+        self._fields[offset] = b""
+        return offset
 
+    def patch(self, offset: int, value: str) -> None:
+        """Set the value of a reserved field."""
+        data = value.encode("utf-8")
+        if len(data) > STAT_FIELD_WIDTH:
+            raise ValueError(f"field value too long: {value}")
+        self._fields[offset] = data
 
-def export_selected_files(selected_files: Set[str]) -> str:
+    def finish(self) -> None:
+        """Write the field values at their exact widths, closing up the reserved space."""
+        fields = sorted(self._fields.items())
+        self._fields.clear()
+        stream = self.stream
+        stream.flush()
+        end = stream.seek(0, io.SEEK_END)
+        if not fields:
+            return
+        # The bytes are moved in place through a view of the stream, never copied out
+        if isinstance(stream, io.BytesIO):
+            size = _close_up(stream.getbuffer(), fields, end)
+        else:
+            with mmap.mmap(stream.fileno(), end) as mapped:
+                size = _close_up(memoryview(mapped), fields, end)
+        stream.truncate(size)
+        stream.seek(size)
+
+
+def _close_up(view: memoryview, fields: List[Tuple[int, bytes]], end: int) -> int:
     """
-    Export selected files by concatenating their contents into a single file.
+    Replace the reserved fields of a buffer with their values, moving the rest back.
 
     Args:
-        selected_files: Set of file paths to export
+        view: Writable view of the buffer, released once done
+        fields: Offsets of the reserved fields and their values, in offset order
+        end: Length of the buffer's contents
 
     Returns:
-        A formatted summary string of the export operation
+        Length of the contents afterwards
     """
-    if not selected_files:
-        return "[red]No files selected for export[/]"
+    with view:
+        read_at = write_at = fields[0][0]
+        for offset, value in fields:
+            length = offset - read_at
+            view[write_at : write_at + length] = view[read_at:offset]
+            write_at += length
+            view[write_at : write_at + len(value)] = value
+            write_at += len(value)
+            read_at = offset + STAT_FIELD_WIDTH
+        length = end - read_at
+        view[write_at : write_at + length] = view[read_at:end]
+        return write_at + length
 
-    # Generate a descriptive filename based on the current directory and timestamp
+
+def _reserve_field(outfile: _PatchedOutput, label: str) -> int:
+    """
+    Write a header line with a numeric field to be filled in later.
+
+    Args:
+        outfile: Output stream
+        label: Text preceding the field, e.g. ``"# Lines: "``
+
+    Returns:
+        Offset of the reserved field in the output stream
+    """
+    _write_text(outfile, label)
+    offset = outfile.reserve()
+    _write_text(outfile, "\n")
+    return offset
+
+
+def _patch_field(outfile: _PatchedOutput, offset: int, value: int, suffix: str = "") -> None:
+    """Fill in a field previously reserved with ``_reserve_field``."""
+    outfile.patch(offset, f"{value:,}{suffix}")
+
+
+class _ByteBudget:
+    """
+    Limits the bytes held by prefetched files that have not been written yet.
+
+    Reservations are granted strictly in ticket order, i.e. in output order,
+    so a later file can never take the budget an earlier one is waiting for.
+    A single file larger than the whole budget is admitted once nothing else
+    is in flight.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._used = 0
+        self._next_ticket = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self, ticket: int, size: int) -> bool:
+        """
+        Reserve ``size`` bytes for the file with the given ticket.
+
+        Every ticket must be acquired exactly once, even with a size of zero,
+        or later tickets will wait forever.
+
+        Returns:
+            False if the budget was closed while waiting
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._closed
+                or (
+                    self._next_ticket == ticket
+                    and (self._used == 0 or self._used + size <= self.limit)
+                )
+            )
+            if self._closed:
+                return False
+            self._used += size
+            self._next_ticket += 1
+            self._cond.notify_all()
+            return True
+
+    def release(self, size: int) -> None:
+        """Return bytes reserved by a file that has been written."""
+        with self._cond:
+            self._used -= size
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Wake up and refuse all pending reservations."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class _ReadResult:
+    """Outcome of prefetching one file for export."""
+
+    __slots__ = ("st", "data", "digest", "reserved", "error", "skipped")
+
+    def __init__(self) -> None:
+        self.st: Optional[os.stat_result] = None
+        self.data: Optional[bytes] = None  # None means the writer streams the file itself
+        self.digest: Optional[bytes] = None
+        self.reserved = 0
+        self.error: Optional[Exception] = None
+        self.skipped = False
+
+
+def _prefetch_file(file_path: str, ticket: int, budget: _ByteBudget) -> _ReadResult:
+    """
+    Read and hash a file once the byte budget allows it.
+
+    Files larger than the budget are not read here; the writer streams them
+    in chunks when their turn comes. Prefetched contents are hashed on the
+    reader thread while they are still in memory.
+    """
+    result = _ReadResult()
+    if not os.path.isfile(file_path):
+        result.skipped = True
+        budget.acquire(ticket, 0)
+        return result
+
+    try:
+        infile = open(file_path, "rb")
+    except OSError as e:
+        result.error = e
+        budget.acquire(ticket, 0)
+        return result
+    perf.count("files_opened")
+
+    with infile:
+        result.st = os.fstat(infile.fileno())
+        size = result.st.st_size
+        if size > budget.limit:
+            budget.acquire(ticket, 0)
+            return result
+        if not budget.acquire(ticket, size):
+            return result
+        result.reserved = size
+        try:
+            result.data = infile.read()
+        except OSError as e:
+            result.error = e
+            return result
+    perf.count("bytes_read", size)
+    if result.data is not None:
+        result.digest = _content_hash(result.data).digest()
+    return result
+
+
+def _write_entry_header(
+    outfile: _PatchedOutput,
+    file_path: str,
+    status: Optional[str] = None,
+    part: Optional[str] = None,
+) -> Tuple[int, int, int, int]:
+    """
+    Write the separator and metadata block of a file entry.
+
+    Returns:
+        Offsets of the reserved lines, characters, size and tokens fields
+    """
+    _write_text(outfile, f"{'=' * 80}\n")
+    _write_text(outfile, f"# File: {file_path}\n")
+    if status is not None:
+        _write_text(outfile, f"# Status: {status}\n")
+    if part is not None:
+        _write_text(outfile, f"# Part: {part}\n")
+    lines_at = _reserve_field(outfile, "# Lines: ")
+    chars_at = _reserve_field(outfile, "# Characters: ")
+    size_at = _reserve_field(outfile, "# Size: ")
+    tokens_at = _reserve_field(outfile, "# Estimated Tokens: ")
+    _write_text(outfile, f"{'=' * 80}\n\n")
+    return lines_at, chars_at, size_at, tokens_at
+
+
+def _write_duplicate_entry(
+    outfile: BinaryIO, file_path: str, original: str, status: Optional[str] = None
+) -> None:
+    """Write an entry referring to an earlier file with identical contents."""
+    _write_text(outfile, f"{'=' * 80}\n")
+    _write_text(outfile, f"# File: {file_path}\n")
+    if status is not None:
+        _write_text(outfile, f"# Status: {status}\n")
+    _write_text(outfile, f"# Duplicate of: {original}\n")
+    _write_text(outfile, f"{'=' * 80}\n\n")
+
+
+class ExportResult:
+    """Outcome of writing an export file."""
+
+    def __init__(self, output_file: str) -> None:
+        self.output_file = output_file
+        self.files_processed = 0
+        self.total_lines = 0
+        self.total_chars = 0
+        self.total_size = 0
+        self.total_tokens = 0
+        self.skipped_files: List[str] = []
+        self.duplicate_files: List[Tuple[str, str]] = []  # (path, original path)
+        self.saved_size = 0
+        self.saved_tokens = 0
+        # None for exports that write no manifest
+        self.manifest_file: Optional[str] = manifest_path(output_file)
+        # Only filled in by sharded exports, whose output file is the index
+        self.shard_files: List[str] = []
+        # Only filled in by compacted exports: totals of the contents before compaction
+        self.compacted = False
+        self.original_size = 0
+        self.original_tokens = 0
+        self.truncated_files: List[Tuple[str, str]] = []  # (path, "minified" or "generated")
+        # Only filled in by delta exports
+        self.added_files: List[str] = []
+        self.modified_files: List[str] = []
+        self.deleted_files: List[str] = []
+        self.unchanged_count = 0
+        self.summary = ""
+
+
+def _record_change(result: ExportResult, file_path: str, status: Optional[str]) -> None:
+    """Account for a file written by a delta export."""
+    if status == "added":
+        result.added_files.append(file_path)
+    elif status == "modified":
+        result.modified_files.append(file_path)
+
+
+def _record_duplicate(
+    result: ExportResult,
+    file_path: str,
+    original: Tuple[str, Dict[str, int]],
+    status: Optional[str] = None,
+) -> None:
+    """Account for a file written as a reference to identical earlier contents."""
+    original_path, stats = original
+    result.duplicate_files.append((file_path, original_path))
+    result.saved_size += stats["size"]
+    result.saved_tokens += stats["tokens"]
+    _record_change(result, file_path, status)
+
+
+def _record_compaction(result: ExportResult, contents: CompactedReader) -> None:
+    """Account for a file written compacted."""
+    result.original_size += contents.original_stats["size"]
+    result.original_tokens += contents.original_stats["tokens"]
+    if contents.generated is not None:
+        result.truncated_files.append((contents.file_path, contents.generated))
+
+
+def _reduction(before: int, after: int) -> str:
+    """Describe how much smaller a total became, e.g. `` (-12.5%)``."""
+    if not before:
+        return ""
+    return f" (-{(before - after) / before:.1%})"
+
+
+def _summary(result: ExportResult, baseline: Optional[Manifest] = None) -> str:
+    """Build the summary written at the end of an export."""
+    summary = (
+        f"\n{'=' * 80}\n"
+        f"Export Summary\n"
+        f"{'=' * 80}\n"
+        f"📊 Statistics:\n"
+        f"• Files processed: {result.files_processed}\n"
+        f"• Total lines: {result.total_lines:,}\n"
+        f"• Total characters: {result.total_chars:,}\n"
+        f"• Total size: {result.total_size:,} bytes\n"
+        f"• Estimated tokens: {result.total_tokens:,}\n"
+        f"• Output file: {result.output_file}\n"
+    )
+
+    if baseline is not None:
+        summary += (
+            f"\n🔄 Changes since {baseline.generated}:\n"
+            f"• Added: {len(result.added_files)}\n"
+            f"• Modified: {len(result.modified_files)}\n"
+            f"• Deleted: {len(result.deleted_files)}\n"
+            f"• Unchanged: {result.unchanged_count}\n"
+        )
+
+    if result.compacted:
+        summary += (
+            f"\n🗜️ Compaction:\n"
+            f"• Size: {result.original_size:,} → {result.total_size:,} bytes"
+            f"{_reduction(result.original_size, result.total_size)}\n"
+            f"• Estimated tokens: {result.original_tokens:,} → {result.total_tokens:,}"
+            f"{_reduction(result.original_tokens, result.total_tokens)}\n"
+        )
+        for file_path, reason in result.truncated_files:
+            summary += f"• Shortened {reason} file: {file_path}\n"
+
+    if result.shard_files:
+        summary += f"\n🧩 Shards: {len(result.shard_files)}\n"
+        for shard_file in result.shard_files:
+            summary += f"• {shard_file}\n"
+
+    if result.duplicate_files:
+        summary += (
+            f"\n♻️ Duplicates:\n"
+            f"• Files written as references: {len(result.duplicate_files)}\n"
+            f"• Bytes saved: {result.saved_size:,}\n"
+            f"• Estimated tokens saved: {result.saved_tokens:,}\n"
+        )
+
+    if result.skipped_files:
+        summary += "\n❌ Skipped files:\n"
+        for file in result.skipped_files:
+            summary += f"• {file}\n"
+
+    return summary
+
+
+def default_output_name() -> str:
+    """Generate a descriptive filename based on the current directory and timestamp."""
     current_dir = os.path.basename(os.getcwd())
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file_name = f"{current_dir}_context_{timestamp}.txt"
+    return f"{current_dir}_context_{timestamp}.txt"
+
+
+def write_export(
+    selected_files: Set[str],
+    output_file_name: Optional[str] = None,
+    readers: int = DEFAULT_READERS,
+    max_inflight_bytes: int = MAX_INFLIGHT_BYTES,
+    progress: Optional[ProgressCallback] = None,
+    dedupe: bool = True,
+    baseline: Optional[Manifest] = None,
+    compaction: Optional[CompactionOptions] = None,
+) -> ExportResult:
+    """
+    Concatenate the contents of the given files into a single export file.
+
+    Each file is read exactly once. A pool of reader threads prefetches file
+    contents ahead of a single writer, which emits them in sorted order while
+    counting lines, characters and bytes; prefetched contents never exceed
+    ``max_inflight_bytes`` and larger files are streamed in bounded chunks.
+    Per-file and total statistics go into header fields reserved up front and
+    filled in once the counts are known, without padding in the output.
+
+    Contents are hashed in the same read pass: prefetched files on their
+    reader thread, streamed files chunk by chunk as they are written. With
+    ``dedupe``, a file identical to one already written is emitted as a
+    short reference to the first path instead of a second copy.
+
+    A manifest of every exported file's size, modification time and hash is
+    written next to the output. Given the manifest of an earlier export as
+    ``baseline``, only added and modified files are written, followed by a
+    list of deleted ones. Files whose size and modification time match the
+    baseline are skipped without being opened; files that were touched but
+    hash the same are dropped as unchanged. The new manifest still describes
+    the full selection, so delta exports can be chained.
+
+    With ``compaction``, contents pass through a ``Compactor`` between the
+    input and the export file. Hashes, the manifest and the statistics cache
+    still describe the files as they are on disk; the summary compares the
+    totals before and after compaction.
+
+    Args:
+        selected_files: Set of file paths to export
+        output_file_name: Path of the export file, generated if not given
+        readers: Number of reader threads prefetching file contents
+        max_inflight_bytes: Maximum bytes of prefetched contents held in memory
+        progress: Optional callback receiving (files done, total files)
+        dedupe: Whether to replace repeated contents with references
+        baseline: Manifest of an earlier export to write the changes against
+        compaction: Compaction steps to apply to the contents, if any
+
+    Returns:
+        Statistics and summary of the export
 
-    # Calculate stats before export
-    stats = calculate_file_stats(selected_files)
-    total_chars = sum(info["chars"] for info in stats.values())
-    total_lines = sum(info["lines"] for info in stats.values())
-    total_size = sum(info["size"] for info in stats.values())
-    skipped_files = []
+    Raises:
+        OSError: If the export file or its manifest cannot be written
+    """
+    result = ExportResult(output_file_name or default_output_name())
+    cache = get_stats_cache()
+    skipped_files = result.skipped_files
+    manifest = Manifest()
+    # Content hash -> (first path, its statistics)
+    written: Dict[bytes, Tuple[str, Dict[str, int]]] = {}
+    compactor = Compactor(compaction) if compaction is not None else None
+    result.compacted = compactor is not None
+    # Content hash -> statistics before compaction, for the statistics cache
+    original_stats: Dict[bytes, Dict[str, int]] = {}
+
+    paths = sorted(selected_files)
+    if baseline is not None:
+        changed = []
+        for file_path in paths:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                changed.append(file_path)  # Reported as skipped by the writer
+                continue
+            if baseline.is_unchanged(file_path, st):
+                manifest.entries[file_path] = baseline.entries[file_path]
+            else:
+                changed.append(file_path)
+        result.unchanged_count = len(paths) - len(changed)
+        result.deleted_files = sorted(
+            path
+            for path in baseline.entries
+            if path not in selected_files or not os.path.isfile(path)
+        )
+        paths = changed
+    identical = 0  # Changed files whose contents turned out to be the same
+    # Checked once so the per-file debug records cost nothing while disabled
+    log_files = logger.isEnabledFor(logging.DEBUG)
+
+    budget = _ByteBudget(max_inflight_bytes)
+    executor = ThreadPoolExecutor(
+        max_workers=max(readers, 1), thread_name_prefix="codestract-reader"
+    )
+    futures: List[Optional[Future]] = [
+        executor.submit(_prefetch_file, file_path, ticket, budget)
+        for ticket, file_path in enumerate(paths)
+    ]
 
     try:
-        with open(output_file_name, "w", encoding="utf-8") as outfile:
-            # Write header with statistics
-            outfile.write("# Codebase Export\n")
-            outfile.write(f"# Generated: {datetime.now().isoformat()}\n")
-            outfile.write(f"# Files: {len(selected_files)}\n")
-            outfile.write(f"# Total Lines: {total_lines:,}\n")
-            outfile.write(f"# Total Characters: {total_chars:,}\n")
-            outfile.write(f"# Total Size: {total_size:,} bytes\n\n")
-
-            for file_path in sorted(selected_files):
-                if not os.path.isfile(file_path):
+        with _PatchedOutput(open(result.output_file, "w+b")) as outfile:
+            # Write header, leaving room for totals that are only known at the end
+            _write_text(outfile, "# Codebase Export\n")
+            _write_text(outfile, f"# Generated: {datetime.now().isoformat()}\n")
+            if baseline is not None:
+                _write_text(outfile, f"# Changes Since: {baseline.generated}\n")
+            files_at = _reserve_field(outfile, "# Files: ")
+            total_lines_at = _reserve_field(outfile, "# Total Lines: ")
+            total_chars_at = _reserve_field(outfile, "# Total Characters: ")
+            total_size_at = _reserve_field(outfile, "# Total Size: ")
+            total_tokens_at = _reserve_field(outfile, "# Estimated Tokens: ")
+            _write_text(outfile, "\n")
+
+            for index, (file_path, future) in enumerate(zip(paths, futures)):
+                read: _ReadResult = future.result()
+                futures[index] = None  # Let the contents be freed once written
+
+                if progress is not None:
+                    progress(index, len(paths))
+
+                if read.skipped:
                     skipped_files.append(file_path)
                     continue
 
+                status = None
+                previous_digest = None
+                if baseline is not None:
+                    previous_digest = baseline.digest_of(file_path)
+                    status = "added" if previous_digest is None else "modified"
+
+                entry_start = outfile.tell()
                 try:
-                    with open(file_path, "r", encoding="utf-8") as infile:
-                        contents = infile.read()
-                        file_stats = stats[file_path]
-
-                        # Write file separator and metadata
-                        outfile.write(f"{'=' * 80}\n")
-                        outfile.write(f"# File: {file_path}\n")
-                        outfile.write(f"# Lines: {file_stats['lines']:,}\n")
-                        outfile.write(f"# Characters: {file_stats['chars']:,}\n")
-                        outfile.write(f"# Size: {file_stats['size']:,} bytes\n")
-                        outfile.write(f"{'=' * 80}\n\n")
-
-                        # Write file contents
-                        outfile.write(contents)
-                        outfile.write("\n\n")
+                    if read.error is not None:
+                        raise read.error
+
+                    if read.digest is not None and read.digest.hex() == previous_digest:
+                        # Touched but identical to the baseline
+                        manifest.add(file_path, read.st, previous_digest)
+                        identical += 1
+                        continue
+
+                    original = written.get(read.digest) if dedupe and read.digest else None
+                    if original is not None:
+                        _write_duplicate_entry(outfile, file_path, original[0], status)
+                        _record_duplicate(result, file_path, original, status)
+                        manifest.add(file_path, read.st, read.digest.hex())
+                        on_disk = original_stats.get(read.digest, original[1])
+                        cache.store(file_path, read.st, on_disk)
+                        continue
+
+                    if read.data is not None:
+                        infile = io.BytesIO(read.data)
+                        st = read.st
+                        hasher = None
+                    else:
+                        infile = open(file_path, "rb")
+                        st = os.fstat(infile.fileno())
+                        hasher = _content_hash()
+                        perf.count("files_opened")
+                        perf.count("bytes_read", st.st_size)
+
+                    with infile:
+                        fields_at = _write_entry_header(outfile, file_path, status)
+                        # Stream file contents while counting them
+                        if compactor is None:
+                            file_stats = _scan_stream(infile, outfile, hasher)
+                            on_disk = file_stats
+                        else:
+                            contents = compactor.reader(file_path, infile, hasher)
+                            file_stats = _scan_stream(contents, outfile)
+                            on_disk = contents.original_stats
+                        _write_text(outfile, "\n\n")
+                    cache.store(file_path, st, on_disk)
+
+                    digest = read.digest if hasher is None else hasher.digest()
+                    manifest.add(file_path, st, digest.hex())
+                    if digest.hex() == previous_digest:
+                        # A streamed file is only known to be unchanged once written
+                        outfile.seek(entry_start)
+                        outfile.truncate()
+                        identical += 1
+                        continue
+                    original = written.get(digest) if dedupe else None
+                    if original is not None:
+                        outfile.seek(entry_start)
+                        outfile.truncate()
+                        _write_duplicate_entry(outfile, file_path, original[0], status)
+                        _record_duplicate(result, file_path, original, status)
+                        continue
+                    if file_stats["size"]:
+                        written[digest] = (file_path, file_stats)
+                        if compactor is not None:
+                            original_stats[digest] = on_disk
+                    _record_change(result, file_path, status)
+                    if compactor is not None:
+                        _record_compaction(result, contents)
+                    if log_files:
+                        logger.debug(f"Exported {file_path} ({file_stats['size']:,} bytes)")
+
+                    lines_at, chars_at, size_at, tokens_at = fields_at
+                    _patch_field(outfile, lines_at, file_stats["lines"])
+                    _patch_field(outfile, chars_at, file_stats["chars"])
+                    _patch_field(outfile, size_at, file_stats["size"], " bytes")
+                    _patch_field(outfile, tokens_at, file_stats["tokens"])
+
+                    result.total_chars += file_stats["chars"]
+                    result.total_lines += file_stats["lines"]
+                    result.total_size += file_stats["size"]
+                    result.total_tokens += file_stats["tokens"]
 
                 except Exception as e:
-                    logging.error(f"Error reading file {file_path}: {e}")
+                    logger.error(f"Error reading file {file_path}: {e}")
                     skipped_files.append(file_path)
+                    # Drop whatever was written for this file
+                    outfile.seek(entry_start)
+                    outfile.truncate()
+                finally:
+                    budget.release(read.reserved)
+
+            if progress is not None:
+                progress(len(paths), len(paths))
+
+            if result.deleted_files:
+                _write_text(outfile, f"{'=' * 80}\n# Deleted Files\n{'=' * 80}\n\n")
+                for file_path in result.deleted_files:
+                    _write_text(outfile, f"{file_path}\n")
+                _write_text(outfile, "\n")
+
+            result.files_processed = len(paths) - len(skipped_files) - identical
+            result.unchanged_count += identical
+            _patch_field(outfile, files_at, result.files_processed)
+            _patch_field(outfile, total_lines_at, result.total_lines)
+            _patch_field(outfile, total_chars_at, result.total_chars)
+            _patch_field(outfile, total_size_at, result.total_size, " bytes")
+            _patch_field(outfile, total_tokens_at, result.total_tokens)
+
+            result.summary = _summary(result, baseline)
+            _write_text(outfile, result.summary)
+
+    finally:
+        # Unblock and discard any readers still waiting after a failure
+        budget.close()
+        for pending in futures:
+            if pending is not None:
+                pending.cancel()
+        executor.shutdown(wait=False)
+
+    manifest.save(result.manifest_file)
+    cache.save()
+    logger.info(f"Export completed: {result.output_file}")
+    return result
+
+
+def _write_git_entry(
+    outfile: _PatchedOutput,
+    path: str,
+    contents: BinaryIO,
+    result: ExportResult,
+    compactor: Optional[Compactor] = None,
+) -> Dict[str, int]:
+    """
+    Write one file entry of a git export and add its statistics to the totals.
+
+    Raises:
+        UnicodeDecodeError: If the contents are not valid UTF-8; nothing is
+            written then
+    """
+    entry_start = outfile.tell()
+    if compactor is not None:
+        contents = compactor.reader(path, contents)
+    try:
+        fields_at = _write_entry_header(outfile, path)
+        file_stats = _scan_stream(contents, outfile)
+        _write_text(outfile, "\n\n")
+    except UnicodeDecodeError:
+        outfile.seek(entry_start)
+        outfile.truncate()
+        raise
+
+    lines_at, chars_at, size_at, tokens_at = fields_at
+    _patch_field(outfile, lines_at, file_stats["lines"])
+    _patch_field(outfile, chars_at, file_stats["chars"])
+    _patch_field(outfile, size_at, file_stats["size"], " bytes")
+    _patch_field(outfile, tokens_at, file_stats["tokens"])
+
+    result.total_chars += file_stats["chars"]
+    result.total_lines += file_stats["lines"]
+    result.total_size += file_stats["size"]
+    result.total_tokens += file_stats["tokens"]
+    if compactor is not None:
+        _record_compaction(result, contents)
+    return file_stats
+
+
+def write_git_export(
+    repo: str,
+    files: List[TrackedFile],
+    revision: str,
+    output_file_name: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None,
+    dedupe: bool = True,
+    compaction: Optional[CompactionOptions] = None,
+) -> ExportResult:
+    """
+    Concatenate the contents of files as of a git revision into a single export file.
+
+    Contents are streamed in sorted order from one ``git cat-file --batch``
+    process, without touching the working tree, and counted in the same pass
+    as for ``write_export``. Blobs are requested by object id, so with
+    ``dedupe`` a file whose blob was already written becomes a reference to
+    the first path without being read at all. Files whose leading bytes look
+    binary are left out. No manifest is written, as the files have no
+    modification times to compare against.
+
+    Args:
+        repo: Top directory of the repository
+        files: Files listed from the revision by ``tracked_files``
+        revision: Revision the files were listed from, shown in the header
+        output_file_name: Path of the export file, generated if not given
+        progress: Optional callback receiving (files done, total files)
+        dedupe: Whether to replace repeated contents with references
+        compaction: Compaction steps to apply to the contents, if any
+
+    Returns:
+        Statistics and summary of the export
+
+    Raises:
+        OSError: If the export file cannot be written
+        GitError: If git fails while the blobs are read
+    """
+    result = ExportResult(output_file_name or default_output_name())
+    result.manifest_file = None
+    compactor = Compactor(compaction) if compaction is not None else None
+    result.compacted = compactor is not None
+    files = sorted(files, key=lambda tracked: tracked.path)
+    # Blob id -> (first path, its statistics) if written, else why it was left out
+    outcomes: Dict[str, object] = {}
+    # Blobs are requested in the order the loop below first needs them
+    if dedupe:
+        to_read = list(dict.fromkeys(tracked.oid for tracked in files))
+    else:
+        to_read = [tracked.oid for tracked in files]
+    binary = 0
+    log_files = logger.isEnabledFor(logging.DEBUG)
+
+    with _PatchedOutput(open(result.output_file, "w+b")) as outfile, CatFileBatch(repo) as batch:
+        _write_text(outfile, "# Codebase Export\n")
+        _write_text(outfile, f"# Generated: {datetime.now().isoformat()}\n")
+        _write_text(outfile, f"# Revision: {revision}\n")
+        files_at = _reserve_field(outfile, "# Files: ")
+        total_lines_at = _reserve_field(outfile, "# Total Lines: ")
+        total_chars_at = _reserve_field(outfile, "# Total Characters: ")
+        total_size_at = _reserve_field(outfile, "# Total Size: ")
+        total_tokens_at = _reserve_field(outfile, "# Estimated Tokens: ")
+        _write_text(outfile, "\n")
+
+        # Closed before the process, so an unfinished blob is discarded while it runs
+        with closing(batch.blobs(to_read)) as blobs:
+            for index, tracked in enumerate(files):
+                if progress is not None:
+                    progress(index, len(files))
+
+                if dedupe and tracked.oid in outcomes:
+                    outcome = outcomes[tracked.oid]
+                    if outcome == "binary":
+                        binary += 1
+                    elif outcome == "skipped":
+                        result.skipped_files.append(tracked.path)
+                    elif outcome[1]["size"]:
+                        _write_duplicate_entry(outfile, tracked.path, outcome[0])
+                        _record_duplicate(result, tracked.path, outcome)
+                    else:
+                        # Empty files are written in full rather than as references
+                        _write_git_entry(outfile, tracked.path, io.BytesIO(), result, compactor)
+                    continue
+
+                blob = next(blobs)
+                if blob is None:
+                    outcomes[tracked.oid] = "skipped"
+                    result.skipped_files.append(tracked.path)
+                elif not is_text_data(blob.peek(SNIFF_SIZE)):
+                    outcomes[tracked.oid] = "binary"
+                    binary += 1
+                else:
+                    try:
+                        file_stats = _write_git_entry(
+                            outfile, tracked.path, blob, result, compactor
+                        )
+                    except UnicodeDecodeError as e:
+                        logger.error(f"Error reading {tracked.path} at {revision}: {e}")
+                        outcomes[tracked.oid] = "skipped"
+                        result.skipped_files.append(tracked.path)
+                        continue
+                    outcomes[tracked.oid] = (tracked.path, file_stats)
+                    if log_files:
+                        logger.debug(f"Exported {tracked.path} ({file_stats['size']:,} bytes)")
+
+        if progress is not None:
+            progress(len(files), len(files))
+
+        result.files_processed = len(files) - len(result.skipped_files) - binary
+        _patch_field(outfile, files_at, result.files_processed)
+        _patch_field(outfile, total_lines_at, result.total_lines)
+        _patch_field(outfile, total_chars_at, result.total_chars)
+        _patch_field(outfile, total_size_at, result.total_size, " bytes")
+        _patch_field(outfile, total_tokens_at, result.total_tokens)
+
+        result.summary = _summary(result)
+        _write_text(outfile, result.summary)
+
+    logger.info(f"Export of {revision} completed: {result.output_file}")
+    return result
+
+
+class ShardBudget:
+    """Limit on the bytes or estimated tokens of each shard of a sharded export."""
+
+    __slots__ = ("limit", "unit")
+
+    UNITS = ("bytes", "tokens")
+
+    # Smallest limits leaving room for contents next to the shard and entry headers
+    MINIMUM = {"bytes": 4096, "tokens": 1024}
+
+    def __init__(self, limit: int, unit: str = "bytes") -> None:
+        """
+        Initialize a budget.
+
+        Raises:
+            ValueError: If the unit is unknown or the limit is below its minimum
+        """
+        if unit not in self.UNITS:
+            raise ValueError(f"unknown shard budget unit: {unit}")
+        if limit < self.MINIMUM[unit]:
+            raise ValueError(f"the shard budget must be at least {self.MINIMUM[unit]:,} {unit}")
+        self.limit = limit
+        self.unit = unit
+
+    def __str__(self) -> str:
+        return f"{self.limit:,} {self.unit}"
 
-            # Write summary
-            summary = (
-                f"\n{'=' * 80}\n"
-                f"Export Summary\n"
-                f"{'=' * 80}\n"
-                f"📊 Statistics:\n"
-                f"• Files processed: {len(selected_files) - len(skipped_files)}\n"
-                f"• Total lines: {total_lines:,}\n"
-                f"• Total characters: {total_chars:,}\n"
-                f"• Total size: {total_size:,} bytes\n"
-                f"• Output file: {output_file_name}\n"
-            )
 
-            if skipped_files:
-                summary += "\n❌ Skipped files:\n"
-                for file in skipped_files:
-                    summary += f"• {file}\n"
+class _ShardPiece:
+    """A whole file, or a range of its lines, assigned to a shard."""
 
-            outfile.write(summary)
-            logging.info(f"Export completed: {output_file_name}")
+    __slots__ = ("path", "start", "end", "first_line", "last_line", "part", "parts", "cost")
+
+    def __init__(
+        self,
+        path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        first_line: int = 0,
+        last_line: int = 0,
+        part: int = 0,
+        parts: int = 0,
+    ) -> None:
+        self.path = path
+        self.start = start  # Byte offset of the first line
+        self.end = end  # Byte offset past the last line, None for a whole file
+        self.first_line = first_line
+        self.last_line = last_line
+        self.part = part  # 1-based part number of a split file, 0 for a whole file
+        self.parts = parts
+        self.cost = 0  # Bytes or estimated tokens of the contents, set when planned
+
+    @property
+    def label(self) -> Optional[str]:
+        """Describe which part of the file this is, or None for a whole file."""
+        if not self.part:
+            return None
+        return f"{self.part}/{self.parts} (lines {self.first_line:,}-{self.last_line:,})"
+
+    def to_dict(self) -> Dict[str, object]:
+        """Get the piece as an entry of the shard index."""
+        if not self.part:
+            return {"path": self.path}
+        return {
+            "path": self.path,
+            "part": self.part,
+            "parts": self.parts,
+            "lines": [self.first_line, self.last_line],
+        }
+
+
+def _write_shard_header(
+    outfile: _PatchedOutput, number: int, count: int
+) -> Tuple[int, int, int, int, int]:
+    """
+    Write the header block of a shard.
+
+    Returns:
+        Offsets of the reserved files, total lines, characters, size and tokens fields
+    """
+    _write_text(outfile, "# Codebase Export\n")
+    _write_text(outfile, f"# Generated: {datetime.now().isoformat()}\n")
+    _write_text(outfile, f"# Shard: {number}/{count}\n")
+    files_at = _reserve_field(outfile, "# Files: ")
+    lines_at = _reserve_field(outfile, "# Total Lines: ")
+    chars_at = _reserve_field(outfile, "# Total Characters: ")
+    size_at = _reserve_field(outfile, "# Total Size: ")
+    tokens_at = _reserve_field(outfile, "# Estimated Tokens: ")
+    _write_text(outfile, "\n")
+    return files_at, lines_at, chars_at, size_at, tokens_at
+
+
+def _header_cost(header: _PatchedOutput, fields_at: Tuple[int, ...], budget: ShardBudget) -> int:
+    """Get the cost of a header once its fields hold the largest expected values."""
+    for offset in fields_at:
+        _patch_field(header, offset, 999_999_999_999, " bytes")
+    header.finish()
+    data = header.stream.getvalue()
+    return len(data) if budget.unit == "bytes" else estimate_tokens(data)
+
+
+def _shard_overhead(budget: ShardBudget) -> int:
+    """Get the cost of the header written at the top of every shard."""
+    header = _PatchedOutput(io.BytesIO())
+    fields_at = _write_shard_header(header, 999, 999)
+    return _header_cost(header, fields_at, budget)
+
+
+def _entry_overhead(path: str, budget: ShardBudget) -> int:
+    """Get the cost of the separators and metadata written around a file's contents."""
+    header = _PatchedOutput(io.BytesIO())
+    fields_at = _write_entry_header(header, path, part="00/00 (lines 0,000,000-0,000,000)")
+    _write_text(header, "\n\n")
+    return _header_cost(header, fields_at, budget)
+
+
+def _split_file(path: str, limit: int, unit: str) -> List[_ShardPiece]:
+    """
+    Split a file too large for one shard into pieces at line boundaries.
 
-            # Return a colorized version for the UI
-            return f"[green]✅ Export successful![/]\n{summary}"
+    The cost of every line is measured the way the shard's statistics count
+    it, so each piece stays within the limit. A single line longer than a
+    piece stays whole, so its piece may exceed the limit.
 
+    Args:
+        path: Path of the file
+        limit: Bytes or estimated tokens each piece's contents may have
+        unit: Unit of the limit, as in ``ShardBudget``
+
+    Returns:
+        The pieces, numbered, in file order, each with its cost
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    counter = get_token_counter() if unit == "tokens" else None
+    pieces: List[_ShardPiece] = []
+    start = offset = 0
+    first_line = line_number = 1
+    cost = 0.0
+    with open(path, "rb") as infile:
+        for line in infile:
+            if counter is None:
+                line_cost: float = len(line)
+            elif counter.needs_text:
+                line_cost = counter.count(line, line.decode("utf-8", errors="replace"))
+            else:
+                line_cost = counter.count(line)
+            if offset > start and math.ceil(cost + line_cost) > limit:
+                pieces.append(_ShardPiece(path, start, offset, first_line, line_number - 1))
+                pieces[-1].cost = math.ceil(cost)
+                start = offset
+                first_line = line_number
+                cost = 0.0
+            offset += len(line)
+            line_number += 1
+            cost += line_cost
+    if offset > start or not pieces:
+        pieces.append(_ShardPiece(path, start, offset, first_line, max(line_number - 1, 1)))
+        pieces[-1].cost = math.ceil(cost)
+    for part, piece in enumerate(pieces, 1):
+        piece.part = part
+        piece.parts = len(pieces)
+    return pieces
+
+
+def plan_shards(selected_files: Set[str], budget: ShardBudget) -> List[List[_ShardPiece]]:
+    """
+    Assign files, in sorted order, to shards that each stay within a budget.
+
+    A file goes into the current shard if it fits and starts a new shard
+    otherwise, so files are never split while they fit in a shard of their
+    own. Larger files are split at line boundaries into pieces that each
+    fill a shard; files after the last piece share its shard. The budget
+    covers the headers written around the contents, so a shard only exceeds
+    it when a single line or an unreadable file does not fit. Token costs
+    come from the statistics cache, so only files it does not know are read.
+
+    Args:
+        selected_files: Paths of the files to export
+        budget: Limit on each shard
+
+    Returns:
+        Pieces of each shard, in order
+    """
+    paths = sorted(selected_files)
+    tokens = calculate_file_stats(set(paths)) if budget.unit == "tokens" else {}
+    limit = budget.limit - _shard_overhead(budget)
+    shards: List[List[_ShardPiece]] = [[]]
+    used = 0
+
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0  # Reported as skipped by the writer
+        cost = tokens[path]["tokens"] if tokens else size
+        overhead = _entry_overhead(path, budget)
+
+        if cost + overhead <= limit:
+            if shards[-1] and used + cost + overhead > limit:
+                shards.append([])
+                used = 0
+            shards[-1].append(_ShardPiece(path))
+            used += cost + overhead
+            continue
+
+        try:
+            pieces = _split_file(path, limit - overhead, budget.unit)
+        except OSError:
+            pieces = [_ShardPiece(path)]
+            pieces[0].cost = cost
+        for piece in pieces:
+            if shards[-1]:
+                shards.append([])
+            shards[-1].append(piece)
+        used = pieces[-1].cost + overhead
+
+    return shards if shards[0] else []
+
+
+class _RangeReader:
+    """Reads at most a given number of bytes from a file."""
+
+    __slots__ = ("_infile", "_remaining")
+
+    def __init__(self, infile: BinaryIO, length: int) -> None:
+        self._infile = infile
+        self._remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._infile.read(size)
+        self._remaining -= len(data)
+        return data
+
+
+def shard_path(output_file: str, number: int) -> str:
+    """Get the path of a numbered shard of a sharded export, e.g. ``context.003.txt``."""
+    base, ext = os.path.splitext(output_file)
+    return f"{base}.{number:03d}{ext}"
+
+
+def shard_index_path(output_file: str) -> str:
+    """Get the path of the index of a sharded export."""
+    return os.path.splitext(output_file)[0] + SHARD_INDEX_SUFFIX
+
+
+def _write_shard(
+    shard_file: str, number: int, count: int, pieces: List[_ShardPiece]
+) -> Tuple[Dict[str, int], List[_ShardPiece], List[str]]:
+    """
+    Write one shard of a sharded export.
+
+    Returns:
+        The shard's totals, the pieces written and the paths that could not be read
+
+    Raises:
+        OSError: If the shard cannot be written
+    """
+    totals = {"chars": 0, "lines": 0, "size": 0, "tokens": 0}
+    written: List[_ShardPiece] = []
+    skipped: List[str] = []
+    with _PatchedOutput(open(shard_file, "w+b")) as outfile:
+        total_fields_at = _write_shard_header(outfile, number, count)
+
+        for piece in pieces:
+            entry_start = outfile.tell()
+            try:
+                with open(piece.path, "rb") as infile:
+                    perf.count("files_opened")
+                    fields_at = _write_entry_header(outfile, piece.path, part=piece.label)
+                    if piece.end is None:
+                        file_stats = _scan_stream(infile, outfile)
+                    else:
+                        infile.seek(piece.start)
+                        reader = _RangeReader(infile, piece.end - piece.start)
+                        file_stats = _scan_stream(reader, outfile)
+                    _write_text(outfile, "\n\n")
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"Error reading file {piece.path}: {e}")
+                skipped.append(piece.path)
+                outfile.seek(entry_start)
+                outfile.truncate()
+                continue
+            perf.count("bytes_read", file_stats["size"])
+
+            lines_at, chars_at, size_at, tokens_at = fields_at
+            _patch_field(outfile, lines_at, file_stats["lines"])
+            _patch_field(outfile, chars_at, file_stats["chars"])
+            _patch_field(outfile, size_at, file_stats["size"], " bytes")
+            _patch_field(outfile, tokens_at, file_stats["tokens"])
+            for key in totals:
+                totals[key] += file_stats[key]
+            written.append(piece)
+
+        files_at, total_lines_at, total_chars_at, total_size_at, total_tokens_at = total_fields_at
+        _patch_field(outfile, files_at, len(written))
+        _patch_field(outfile, total_lines_at, totals["lines"])
+        _patch_field(outfile, total_chars_at, totals["chars"])
+        _patch_field(outfile, total_size_at, totals["size"], " bytes")
+        _patch_field(outfile, total_tokens_at, totals["tokens"])
+    return totals, written, skipped
+
+
+def write_sharded_export(
+    selected_files: Set[str],
+    budget: ShardBudget,
+    output_file_name: Optional[str] = None,
+    writers: int = DEFAULT_READERS,
+    progress: Optional[ProgressCallback] = None,
+) -> ExportResult:
+    """
+    Export files into numbered shards that each stay within a budget.
+
+    Files are assigned to shards in sorted order by ``plan_shards`` and the
+    shards are written concurrently, each streaming its files the way
+    ``write_export`` does. Shards are named after the output file, e.g.
+    ``context.001.txt``, and an index next to them (``context.index.json``)
+    lists the files and line ranges written to each shard; it is the output
+    file. Shards left over from an earlier export to the same name are
+    removed. Sharded exports are neither deduplicated nor recorded in a
+    manifest.
+
+    Args:
+        selected_files: Set of file paths to export
+        budget: Limit on the bytes or estimated tokens of each shard
+        output_file_name: Path the shard names are derived from, generated if not given
+        writers: Number of shards written at the same time
+        progress: Optional callback receiving (pieces done, total pieces)
+
+    Returns:
+        Statistics and summary of the export
+
+    Raises:
+        OSError: If a shard or the index cannot be written
+    """
+    output_file = output_file_name or default_output_name()
+    result = ExportResult(shard_index_path(output_file))
+    result.manifest_file = None
+    with perf.span("export.plan_shards"):
+        shards = plan_shards(selected_files, budget)
+    shard_files = [shard_path(output_file, number) for number in range(1, len(shards) + 1)]
+    total = sum(len(pieces) for pieces in shards)
+    done = 0
+
+    with ThreadPoolExecutor(
+        max_workers=max(writers, 1), thread_name_prefix="codestract-shard"
+    ) as executor:
+        futures = [
+            executor.submit(_write_shard, shard_file, number, len(shards), pieces)
+            for number, (shard_file, pieces) in enumerate(zip(shard_files, shards), 1)
+        ]
+        shard_totals = []
+        shard_pieces = []
+        for future, pieces in zip(futures, shards):
+            totals, written, skipped = future.result()
+            shard_totals.append(totals)
+            shard_pieces.append(written)
+            # A split file is skipped once, however many of its parts failed
+            for path in skipped:
+                if path not in result.skipped_files:
+                    result.skipped_files.append(path)
+            done += len(pieces)
+            if progress is not None:
+                progress(done, total)
+
+    # Drop shards of an earlier, larger export to the same name
+    stale = len(shards) + 1
+    while os.path.exists(shard_path(output_file, stale)):
+        os.remove(shard_path(output_file, stale))
+        stale += 1
+
+    for totals in shard_totals:
+        result.total_chars += totals["chars"]
+        result.total_lines += totals["lines"]
+        result.total_size += totals["size"]
+        result.total_tokens += totals["tokens"]
+    result.files_processed = len(selected_files) - len(result.skipped_files)
+    result.shard_files = shard_files
+
+    index = {
+        "version": SHARD_INDEX_VERSION,
+        "generated": datetime.now().isoformat(),
+        "budget": {"limit": budget.limit, "unit": budget.unit},
+        "shards": [
+            {
+                "file": os.path.basename(shard_file),
+                **totals,
+                "files": [piece.to_dict() for piece in pieces],
+            }
+            for shard_file, pieces, totals in zip(shard_files, shard_pieces, shard_totals)
+        ],
+    }
+    with open(result.output_file, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+        f.write("\n")
+
+    result.summary = _summary(result)
+    logger.info(f"Sharded export completed: {len(shards)} shards indexed in {result.output_file}")
+    return result
+
+
+def export_selected_files(
+    selected_files: Set[str],
+    output_file_name: Optional[str] = None,
+    readers: int = DEFAULT_READERS,
+    max_inflight_bytes: int = MAX_INFLIGHT_BYTES,
+    progress: Optional[ProgressCallback] = None,
+    dedupe: bool = True,
+    baseline_file: Optional[str] = None,
+    project_root: Optional[str] = None,
+    shard_budget: Optional[ShardBudget] = None,
+    compaction: Optional[CompactionOptions] = None,
+) -> str:
+    """
+    Export selected files by concatenating their contents into a single file.
+
+    See ``write_export`` for how files are read and written, and
+    ``write_sharded_export`` for exports split into shards.
+
+    Args:
+        selected_files: Set of file paths to export
+        output_file_name: Path of the export file, generated if not given
+        readers: Number of reader threads prefetching file contents
+        max_inflight_bytes: Maximum bytes of prefetched contents held in memory
+        progress: Optional callback receiving (files done, total files)
+        dedupe: Whether to replace repeated contents with references
+        baseline_file: Manifest of an earlier export to write only the changes against
+        project_root: Project whose most recent export manifest is updated on success
+        shard_budget: If given, split the export into shards within this budget;
+            ``baseline_file``, ``dedupe`` and ``compaction`` do not apply then
+        compaction: Compaction steps to apply to the contents, if any
+
+    Returns:
+        A formatted summary string of the export operation
+    """
+    if not selected_files:
+        return "[red]No files selected for export[/]"
+
+    try:
+        baseline = Manifest.load(baseline_file) if baseline_file else None
+        with perf.span("export"):
+            if shard_budget is not None:
+                result = write_sharded_export(
+                    selected_files,
+                    shard_budget,
+                    output_file_name,
+                    writers=readers,
+                    progress=progress,
+                )
+            else:
+                result = write_export(
+                    selected_files,
+                    output_file_name,
+                    readers=readers,
+                    max_inflight_bytes=max_inflight_bytes,
+                    progress=progress,
+                    dedupe=dedupe,
+                    baseline=baseline,
+                    compaction=compaction,
+                )
     except Exception as e:
         error_msg = f"[red]❌ Export failed: {str(e)}[/]"
-        logging.error(error_msg)
+        logger.error(error_msg)
         return error_msg
+
+    if project_root is not None and result.manifest_file is not None:
+        record_last_manifest(project_root, result.manifest_file)
+
+    # Return a colorized version for the UI
+    return f"[green]✅ Export successful![/]\n{result.summary}"
@@ -0,0 +1,309 @@
+"""
+Reading the files of a git repository from its object store.
+
+Paths are listed with ``git ls-tree``, ``git ls-files`` and ``git diff``
+instead of walking the filesystem, so untracked files are never visited.
+Contents are streamed from one long-lived ``git cat-file --batch`` process
+rather than a process or an open file per blob.
+
+Nothing in this module may import Textual or Rich.
+"""
+
+import os
+import subprocess
+import threading
+from typing import Iterable, Iterator, List, Optional
+
+from .utils import perf
+
+# Modes of tracked entries that are not regular files: symlinks and submodules
+_SKIPPED_MODES = (b"120000", b"160000")
+
+# Size of the blocks skipped contents are discarded in
+_DRAIN_CHUNK = 256 * 1024
+
+
+class GitError(Exception):
+    """A git command failed, e.g. because a path is not in a repository."""
+
+
+class TrackedFile:
+    """A regular file tracked in a revision or the index."""
+
+    __slots__ = ("path", "oid")
+
+    def __init__(self, path: str, oid: str) -> None:
+        self.path = path  # Relative to the top of the repository, "/"-separated
+        self.oid = oid  # Object id of the file's blob
+
+
+def _git(repo: str, *args: str) -> bytes:
+    """Run a git command in a repository and return its output."""
+    try:
+        completed = subprocess.run(
+            ["git", "-C", repo, *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except OSError as e:
+        raise GitError(f"cannot run git: {e}") from e
+    if completed.returncode != 0:
+        message = completed.stderr.decode(errors="replace").strip()
+        raise GitError(message or f"git {args[0]} failed")
+    return completed.stdout
+
+
+def repo_root(path: str) -> str:
+    """
+    Get the top directory of the repository containing a path.
+
+    Raises:
+        GitError: If the path is not inside a git work tree
+    """
+    output = _git(path, "rev-parse", "--show-toplevel")
+    return os.path.realpath(os.fsdecode(output.rstrip(b"\n")))
+
+
+def resolve_commit(repo: str, revision: str) -> str:
+    """
+    Get the commit id a revision such as a branch, tag or ``HEAD~2`` names.
+
+    Raises:
+        GitError: If the revision does not name a commit
+    """
+    try:
+        output = _git(repo, "rev-parse", "--verify", "--quiet", f"{revision}^{{commit}}")
+    except GitError:
+        raise GitError(f"unknown revision: {revision}") from None
+    return output.decode().strip()
+
+
+def _pathspec(repo: str, root: Optional[str]) -> List[str]:
+    """Get the arguments limiting a command to the files under ``root``."""
+    if root is None:
+        return []
+    rel_root = os.path.relpath(os.path.realpath(root), repo)
+    return [] if rel_root == "." else ["--", rel_root]
+
+
+def tracked_files(
+    repo: str, revision: Optional[str] = None, root: Optional[str] = None
+) -> List[TrackedFile]:
+    """
+    List the regular files tracked in a revision, or in the index.
+
+    Args:
+        repo: Top directory of the repository
+        revision: Commit to list, the index if not given
+        root: Directory below which to list files, the whole repository if not given
+
+    Returns:
+        Tracked files in git's order; symlinks and submodules are left out
+
+    Raises:
+        GitError: If git fails, e.g. because the revision does not exist
+    """
+    if revision is None:
+        # "<mode> <oid> <stage>\t<path>"
+        output = _git(repo, "ls-files", "-z", "--stage", *_pathspec(repo, root))
+    else:
+        # "<mode> <type> <oid>\t<path>"
+        output = _git(repo, "ls-tree", "-r", "-z", revision, *_pathspec(repo, root))
+
+    files: List[TrackedFile] = []
+    seen = set()
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        meta, _, path = record.partition(b"\t")
+        fields = meta.split()
+        if fields[0] in _SKIPPED_MODES:
+            continue
+        oid = fields[1] if revision is None else fields[2]
+        # The index lists a file once per stage while it has merge conflicts
+        if path in seen:
+            continue
+        seen.add(path)
+        files.append(TrackedFile(os.fsdecode(path), oid.decode()))
+    return files
+
+
+def changed_files(
+    repo: str, base: str, revision: Optional[str] = None, root: Optional[str] = None
+) -> List[str]:
+    """
+    List the files changed since a branch or commit was forked from ``base``.
+
+    Changes are taken from the merge base of ``base`` and the revision, the
+    way a pull request against ``base`` shows them. Deleted files are left out.
+
+    Args:
+        repo: Top directory of the repository
+        base: Branch or commit the changes are relative to, e.g. ``origin/main``
+        revision: Commit whose changes to list, the working tree if not given
+        root: Directory below which to list files, the whole repository if not given
+
+    Returns:
+        Paths relative to the top of the repository, "/"-separated
+
+    Raises:
+        GitError: If git fails, e.g. because a revision does not exist
+    """
+    head = resolve_commit(repo, revision) if revision is not None else "HEAD"
+    merge_base = _git(repo, "merge-base", base, head).decode().strip()
+    targets = [merge_base] if revision is None else [merge_base, head]
+    output = _git(
+        repo, "diff", "--name-only", "-z", "--diff-filter=d", *targets, *_pathspec(repo, root)
+    )
+    return [os.fsdecode(path) for path in output.split(b"\0") if path]
+
+
+class BlobReader:
+    """
+    File-like view of one blob's contents on the ``cat-file`` output.
+
+    Reads never go past the end of the blob. The start of the contents can be
+    peeked at, e.g. to sniff whether they are text, without being consumed.
+    """
+
+    __slots__ = ("size", "_stream", "_remaining", "_pending", "_finished")
+
+    def __init__(self, stream, size: int) -> None:
+        self.size = size
+        self._stream = stream
+        self._remaining = size  # Bytes still on the stream
+        self._pending = b""  # Bytes peeked at but not read yet
+        self._finished = False
+
+    def _take(self, size: int) -> bytes:
+        """Read up to ``size`` bytes of the blob from the stream."""
+        size = min(size, self._remaining)
+        if size <= 0:
+            return b""
+        data = self._stream.read(size)
+        if len(data) != size:
+            raise GitError("git cat-file exited in the middle of a blob")
+        self._remaining -= size
+        return data
+
+    def peek(self, size: int) -> bytes:
+        """Get up to ``size`` leading bytes without consuming them."""
+        if len(self._pending) < size:
+            self._pending += self._take(size - len(self._pending))
+        return self._pending[:size]
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to ``size`` bytes, or everything left if ``size`` is negative."""
+        if size < 0:
+            size = self._remaining + len(self._pending)
+        pending = self._pending
+        if pending:
+            self._pending = pending[size:]
+            pending = pending[:size]
+            if len(pending) == size:
+                return pending
+            size -= len(pending)
+        return pending + self._take(size)
+
+    def drain(self) -> None:
+        """Discard the rest of the blob so the next response can be read."""
+        if self._finished:
+            return
+        self._pending = b""
+        while self._remaining:
+            self._take(_DRAIN_CHUNK)
+        # Every blob is followed by a newline
+        self._stream.read(1)
+        self._finished = True
+
+
+class CatFileBatch:
+    """
+    A ``git cat-file --batch`` process serving blobs by object id.
+
+    Requests are written by a feeder thread while responses are read, so git
+    streams blobs back to back instead of waiting for each request. The
+    process lives until ``close``, serving any number of ``blobs`` calls.
+    """
+
+    def __init__(self, repo: str) -> None:
+        """
+        Start the process.
+
+        Raises:
+            GitError: If git cannot be run
+        """
+        try:
+            self._process = subprocess.Popen(
+                ["git", "-C", repo, "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as e:
+            raise GitError(f"cannot run git: {e}") from e
+
+    def __enter__(self) -> "CatFileBatch":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _feed(self, oids: List[str]) -> None:
+        """Write requests for the given objects."""
+        stdin = self._process.stdin
+        try:
+            for oid in oids:
+                stdin.write(f"{oid}\n".encode())
+            stdin.flush()
+        except (OSError, ValueError):
+            # The process exited or was closed; reading the responses reports it
+            pass
+
+    def blobs(self, oids: Iterable[str]) -> Iterator[Optional[BlobReader]]:
+        """
+        Stream the contents of objects in order.
+
+        Each reader is drained once the next one is requested, so only one can
+        be used at a time.
+
+        Args:
+            oids: Object ids of the blobs
+
+        Yields:
+            A reader of each blob's contents, or None if the object is missing
+
+        Raises:
+            GitError: If the process exits early
+        """
+        oids = list(oids)
+        feeder = threading.Thread(
+            target=self._feed, args=(oids,), name="codestract-cat-file", daemon=True
+        )
+        feeder.start()
+        stdout = self._process.stdout
+        for _ in oids:
+            header = stdout.readline()
+            if not header:
+                raise GitError("git cat-file exited unexpectedly")
+            fields = header.split()
+            if len(fields) != 3:
+                # "<oid> missing"
+                yield None
+                continue
+            blob = BlobReader(stdout, int(fields[2]))
+            perf.count("git.blobs_read")
+            perf.count("bytes_read", blob.size)
+            try:
+                yield blob
+            finally:
+                blob.drain()
+        feeder.join()
+
+    def close(self) -> None:
+        """Stop the process, discarding any responses not read yet."""
+        # Closing the output first makes git exit if it is blocked writing to it
+        for pipe in (self._process.stdout, self._process.stdin):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        self._process.wait()
@@ -0,0 +1,345 @@
+"""
+Non-interactive export mode for CI jobs and hooks.
+
+Nothing in this module may import Textual or Rich.
+"""
+
+import logging
+import os
+import sys
+from typing import Dict, Iterable, Optional, Pattern, Set, Tuple
+
+from .autofit import DEFAULT_HALF_LIFE_DAYS, auto_fit, gather_candidates
+from .compaction import CompactionOptions
+from .content_search import search_contents, search_file
+from .exporter import (
+    DEFAULT_READERS,
+    ShardBudget,
+    default_output_name,
+    write_export,
+    write_git_export,
+    write_sharded_export,
+)
+from .git_source import GitError, changed_files, repo_root, resolve_commit, tracked_files
+from .manifest import Manifest, last_manifest, record_last_manifest
+from .utils import perf
+from .utils.file_utils import has_binary_name, is_text_file
+from .utils.ignore import IgnoreEngine
+from .utils.logging import setup_logging
+from .utils.walker import filter_paths, walk_files
+
+logger = logging.getLogger(__name__)
+
+
+def collect_files(
+    root: str,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+    use_ignore_files: bool = True,
+) -> Set[str]:
+    """
+    Collect the text files under a root that match the given globs.
+
+    Args:
+        root: Directory to scan
+        include: Globs a file's root-relative path must match, if any are given
+        exclude: Globs excluding files and directories by root-relative path
+        use_ignore_files: Whether to honor .gitignore, .ignore and .codestractignore
+
+    Returns:
+        Set of absolute paths of matching text files
+    """
+    root = os.path.realpath(root)
+    ignore = IgnoreEngine(root) if use_ignore_files else None
+    return {
+        path
+        for path, st in walk_files(root, include=include, exclude=exclude, ignore=ignore)
+        if is_text_file(path, st)
+    }
+
+
+def _root_prefix(repo: str, root: str) -> str:
+    """Get the repository-relative prefix of the paths below ``root``."""
+    rel_root = os.path.relpath(os.path.realpath(root), repo)
+    return "" if rel_root == "." else rel_root.replace(os.sep, "/") + "/"
+
+
+def collect_git_files(
+    root: str,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+    since: Optional[str] = None,
+) -> Set[str]:
+    """
+    Collect the tracked text files under a root from git instead of walking it.
+
+    Untracked files are never visited, so build output and other clutter
+    cost nothing.
+
+    Args:
+        root: Directory inside a git work tree
+        include: Globs a file's root-relative path must match, if any are given
+        exclude: Globs excluding files and directories by root-relative path
+        since: If given, only files changed in the working tree since the
+            current branch was forked from this branch or commit
+
+    Returns:
+        Set of absolute paths of matching text files
+
+    Raises:
+        GitError: If the root is not in a git work tree or git fails
+    """
+    repo = repo_root(root)
+    if since is not None:
+        paths = changed_files(repo, since, root=root)
+    else:
+        paths = [tracked.path for tracked in tracked_files(repo, root=root)]
+    prefix = _root_prefix(repo, root)
+    rel_paths = filter_paths((path[len(prefix) :] for path in paths), include, exclude)
+    files = set()
+    for rel_path in rel_paths:
+        path = os.path.join(repo, prefix + rel_path)
+        if os.path.isfile(path) and is_text_file(path):
+            files.add(path)
+    return files
+
+
+def _contains(path: str, pattern: Pattern[bytes]) -> bool:
+    """Check whether a file's contents match a pattern, treating unreadable files as not."""
+    try:
+        return search_file(path, pattern) is not None
+    except (OSError, ValueError):
+        return False
+
+
+def _run_git_export(
+    root: str,
+    revision: str,
+    output: Optional[str],
+    include: Iterable[str],
+    exclude: Iterable[str],
+    since: Optional[str],
+    dedupe: bool,
+    compaction: Optional[CompactionOptions],
+) -> int:
+    """Export the matching files as of a git revision; see ``run_export``."""
+    try:
+        repo = repo_root(root)
+        commit = resolve_commit(repo, revision)
+        files = tracked_files(repo, commit, root)
+        if since is not None:
+            changed = set(changed_files(repo, since, commit, root))
+            files = [tracked for tracked in files if tracked.path in changed]
+    except GitError as e:
+        print(f"codestract: {e}", file=sys.stderr)
+        return 2
+
+    prefix = _root_prefix(repo, root)
+    kept = set(filter_paths((tracked.path[len(prefix) :] for tracked in files), include, exclude))
+    files = [
+        tracked
+        for tracked in files
+        if tracked.path[len(prefix) :] in kept and not has_binary_name(tracked.path)
+    ]
+    if not files:
+        print("codestract: no files matched", file=sys.stderr)
+        return 1
+
+    try:
+        with perf.span("export"):
+            result = write_git_export(
+                repo,
+                files,
+                f"{revision} ({commit[:12]})",
+                output or default_output_name(),
+                dedupe=dedupe,
+                compaction=compaction,
+            )
+    except (OSError, GitError) as e:
+        logger.error(f"Export of {revision} failed: {e}")
+        print(f"codestract: export failed: {e}", file=sys.stderr)
+        return 1
+
+    print(result.summary.strip())
+    return 0
+
+
+def run_export(
+    root: str,
+    output: Optional[str] = None,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+    readers: int = DEFAULT_READERS,
+    use_ignore_files: bool = True,
+    token_budget: Optional[int] = None,
+    path_weights: Iterable[Tuple[str, float]] = (),
+    half_life_days: float = DEFAULT_HALF_LIFE_DAYS,
+    grep: Optional[Pattern[bytes]] = None,
+    dedupe: bool = True,
+    delta_from: Optional[str] = None,
+    revision: Optional[str] = None,
+    since: Optional[str] = None,
+    tracked: bool = False,
+    shard_budget: Optional[ShardBudget] = None,
+    compaction: Optional[CompactionOptions] = None,
+    log_levels: Optional[Dict[str, int]] = None,
+) -> int:
+    """
+    Export the matching files under a root without starting the TUI.
+
+    Logs go to the root's state directory, as they do for the interactive app.
+
+    Args:
+        root: Directory to scan
+        output: Path of the export file, generated in the working directory if not given
+        include: Globs a file's root-relative path must match, if any are given
+        exclude: Globs excluding files and directories by root-relative path
+        readers: Number of reader threads prefetching file contents
+        use_ignore_files: Whether to honor .gitignore, .ignore and .codestractignore
+        token_budget: If given, only export the best files fitting this many tokens
+        path_weights: (glob, weight) priorities used when fitting a token budget
+        half_life_days: Recency half-life used when fitting a token budget
+        grep: If given, only export files whose contents match this pattern
+        dedupe: Whether to write repeated contents as references to the first copy
+        delta_from: Manifest to write only the changes against; an empty string
+            means the manifest of the root's most recent export
+        revision: If given, export the tracked files as of this git revision from
+            the object store instead of the working tree; ``token_budget``,
+            ``grep`` and ``delta_from`` do not apply then
+        since: If given, only export files changed since the current branch, or
+            ``revision``, was forked from this branch or commit
+        tracked: Whether to list the files to export with git instead of walking
+            the root, leaving untracked files out
+        shard_budget: If given, split the export into shards within this budget,
+            listed in an index; ``delta_from``, ``dedupe`` and ``compaction`` do not
+            apply then
+        compaction: Compaction steps to apply to the exported contents, if any
+        log_levels: Log levels by logger name, e.g. from ``parse_levels``
+
+    Returns:
+        Process exit code
+    """
+    if not os.path.isdir(root):
+        print(f"codestract: not a directory: {root}", file=sys.stderr)
+        return 2
+    setup_logging(root, log_levels)
+
+    if revision is not None:
+        return _run_git_export(root, revision, output, include, exclude, since, dedupe, compaction)
+
+    baseline = None
+    if delta_from is not None:
+        manifest_file = delta_from or last_manifest(root)
+        if manifest_file is None:
+            print(f"codestract: no earlier export of {root} to compare against", file=sys.stderr)
+            return 1
+        try:
+            baseline = Manifest.load(manifest_file)
+        except (OSError, ValueError) as e:
+            print(f"codestract: cannot read manifest: {e}", file=sys.stderr)
+            return 2
+
+    if tracked or since is not None:
+        try:
+            with perf.span("collect"):
+                files = collect_git_files(root, include, exclude, since)
+        except GitError as e:
+            print(f"codestract: {e}", file=sys.stderr)
+            return 2
+        if grep is not None:
+            files = {path for path in files if _contains(path, grep)}
+    elif grep is not None:
+        files = {
+            match.path
+            for match in search_contents(
+                root, grep, include, exclude, use_ignore_files, workers=readers
+            )
+        }
+    else:
+        with perf.span("collect"):
+            files = collect_files(root, include, exclude, use_ignore_files)
+    if not files:
+        print("codestract: no files matched", file=sys.stderr)
+        return 1
+
+    if token_budget is not None:
+        files = set(
+            auto_fit(
+                gather_candidates(files),
+                token_budget,
+                root,
+                path_weights=path_weights,
+                half_life_days=half_life_days,
+            )
+        )
+        if not files:
+            print("codestract: no files fit the token budget", file=sys.stderr)
+            return 1
+
+    try:
+        with perf.span("export"):
+            if shard_budget is not None:
+                result = write_sharded_export(
+                    files, shard_budget, output or default_output_name(), writers=readers
+                )
+            else:
+                result = write_export(
+                    files,
+                    output or default_output_name(),
+                    readers=readers,
+                    dedupe=dedupe,
+                    baseline=baseline,
+                    compaction=compaction,
+                )
+    except OSError as e:
+        logger.error(f"Export failed: {e}")
+        print(f"codestract: export failed: {e}", file=sys.stderr)
+        return 1
+
+    if result.manifest_file is not None:
+        record_last_manifest(root, result.manifest_file)
+    print(result.summary.strip())
+    return 0
+
+
+def run_search(
+    root: str,
+    pattern: Pattern[bytes],
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+    workers: int = DEFAULT_READERS,
+    use_ignore_files: bool = True,
+    files_only: bool = False,
+) -> int:
+    """
+    Print the files under a root whose contents match a pattern.
+
+    Matches are printed as they are found, as ``path:line:text`` or, with
+    ``files_only``, as bare paths relative to the root.
+
+    Args:
+        root: Directory to search
+        pattern: Pattern from ``compile_pattern``
+        include: Globs a file's root-relative path must match, if any are given
+        exclude: Globs excluding files and directories by root-relative path
+        workers: Number of worker threads
+        use_ignore_files: Whether to honor .gitignore, .ignore and .codestractignore
+        files_only: Whether to print only the paths of matching files
+
+    Returns:
+        Process exit code: 0 if any file matched, 1 if none did
+    """
+    if not os.path.isdir(root):
+        print(f"codestract: not a directory: {root}", file=sys.stderr)
+        return 2
+
+    prefix = os.path.realpath(root) + os.sep
+    found = False
+    for match in search_contents(root, pattern, include, exclude, use_ignore_files, workers):
+        found = True
+        rel_path = match.path[len(prefix) :] if match.path.startswith(prefix) else match.path
+        if files_only:
+            print(rel_path, flush=True)
+        else:
+            print(f"{rel_path}:{match.line_number}:{match.line}", flush=True)
+    return 0 if found else 1
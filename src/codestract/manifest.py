@@ -0,0 +1,138 @@
+"""
+Export manifests recording what each export contained, for delta exports.
+
+Nothing in this module may import Textual or Rich.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from .utils.constants import STATE_DIR_NAME
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+
+# Pointer to the manifest of the most recent export of a project
+LAST_MANIFEST_FILE_NAME = "last_manifest"
+
+# (size, mtime_ns, content hash as hex)
+ManifestEntry = Tuple[int, int, str]
+
+
+class Manifest:
+    """
+    The files an export contained, with the stat data and content hash of each.
+
+    A file whose size and modification time still match its entry is
+    treated as unchanged without being opened.
+    """
+
+    def __init__(self, generated: Optional[str] = None) -> None:
+        self.generated = generated or datetime.now().isoformat()
+        self.entries: Dict[str, ManifestEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, path: str, st: os.stat_result, digest: str) -> None:
+        """Record a file as exported with the given stat data and content hash."""
+        self.entries[path] = (st.st_size, st.st_mtime_ns, digest)
+
+    def is_unchanged(self, path: str, st: os.stat_result) -> bool:
+        """Check from stat data alone whether a file matches its entry."""
+        entry = self.entries.get(path)
+        return entry is not None and entry[:2] == (st.st_size, st.st_mtime_ns)
+
+    def digest_of(self, path: str) -> Optional[str]:
+        """Get the recorded content hash of a file, if it has an entry."""
+        entry = self.entries.get(path)
+        return entry[2] if entry is not None else None
+
+    def save(self, manifest_file: str) -> None:
+        """
+        Write the manifest atomically.
+
+        Raises:
+            OSError: If the manifest cannot be written
+        """
+        tmp_file = f"{manifest_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "generated": self.generated,
+                    "files": self.entries,
+                },
+                f,
+                separators=(",", ":"),
+            )
+        os.replace(tmp_file, manifest_file)
+
+    @classmethod
+    def load(cls, manifest_file: str) -> "Manifest":
+        """
+        Read a manifest written by ``save``.
+
+        Raises:
+            OSError: If the manifest cannot be read
+            ValueError: If the file is not a well-formed manifest of a supported version
+        """
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"{manifest_file} is not a supported export manifest")
+        files = data.get("files")
+        generated = data.get("generated")
+        if not isinstance(files, dict) or not isinstance(generated, (str, type(None))):
+            raise ValueError(f"{manifest_file} is a malformed export manifest")
+        manifest = cls(generated)
+        for path, entry in files.items():
+            if not _is_entry(entry):
+                raise ValueError(f"{manifest_file} has a malformed entry for {path}")
+            manifest.entries[path] = (entry[0], entry[1], entry[2])
+        return manifest
+
+
+def _is_entry(entry: object) -> bool:
+    """Check whether a value read from JSON is a ``ManifestEntry``."""
+    return (
+        isinstance(entry, list)
+        and len(entry) == 3
+        and all(isinstance(value, int) and not isinstance(value, bool) for value in entry[:2])
+        and isinstance(entry[2], str)
+    )
+
+
+def manifest_path(output_file: str) -> str:
+    """Get the path of the manifest written next to an export file."""
+    return output_file + MANIFEST_SUFFIX
+
+
+def _last_manifest_pointer(root: str) -> str:
+    return os.path.join(os.path.realpath(root), STATE_DIR_NAME, LAST_MANIFEST_FILE_NAME)
+
+
+def record_last_manifest(root: str, manifest_file: str) -> None:
+    """Remember a manifest as the most recent export of a project."""
+    pointer = _last_manifest_pointer(root)
+    try:
+        os.makedirs(os.path.dirname(pointer), exist_ok=True)
+        with open(pointer, "w", encoding="utf-8") as f:
+            f.write(os.path.abspath(manifest_file))
+    except OSError as e:
+        logger.error(f"Error recording last export manifest: {e}")
+
+
+def last_manifest(root: str) -> Optional[str]:
+    """Get the manifest of a project's most recent export, if it still exists."""
+    try:
+        with open(_last_manifest_pointer(root), "r", encoding="utf-8") as f:
+            manifest_file = f.read().strip()
+    except OSError:
+        return None
+    return manifest_file if os.path.isfile(manifest_file) else None
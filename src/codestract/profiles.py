@@ -0,0 +1,156 @@
+"""
+Named selection profiles saved in the project's state directory.
+
+A profile stores the rules of a selection, not the files they cover, as a
+sorted list of root-relative paths with front coding: each line gives the
+number of leading characters shared with the previous path, the rule, and
+the rest of the path. Selecting a folder costs one line however many files
+it holds, and a list of individually selected files in sorted order
+shrinks to little more than their file names.
+
+Nothing in this module may import Textual or Rich.
+"""
+
+import logging
+import os
+import re
+from typing import Iterable, List, Tuple
+
+from .utils.constants import STATE_DIR_NAME
+from .utils.selection import Selection
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR_NAME = "profiles"
+PROFILE_SUFFIX = ".profile"
+PROFILE_HEADER = "codestract-profile 1"
+
+# A rule as returned by ``Selection.rules``: (path, selected, is_dir)
+Rule = Tuple[str, bool, bool]
+
+_NAME_PATTERN = re.compile(r"[\w.-]+")
+
+_KINDS = {"+d": (True, True), "-d": (False, True), "+f": (True, False), "-f": (False, False)}
+
+
+def profile_path(root: str, name: str) -> str:
+    """
+    Get the file a named profile of a project is stored in.
+
+    Raises:
+        ValueError: If the name is not made of letters, digits, dots, dashes and underscores
+    """
+    if not _NAME_PATTERN.fullmatch(name) or name.startswith("."):
+        raise ValueError(f"Invalid profile name: {name!r}")
+    return os.path.join(
+        os.path.realpath(root), STATE_DIR_NAME, PROFILE_DIR_NAME, name + PROFILE_SUFFIX
+    )
+
+
+def list_profiles(root: str) -> List[str]:
+    """Get the names of a project's saved profiles."""
+    directory = os.path.join(os.path.realpath(root), STATE_DIR_NAME, PROFILE_DIR_NAME)
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(name[: -len(PROFILE_SUFFIX)] for name in names if name.endswith(PROFILE_SUFFIX))
+
+
+def encode_rules(root: str, rules: Iterable[Rule]) -> str:
+    """
+    Encode selection rules as the text of a profile.
+
+    Args:
+        root: Project root the rule paths are made relative to
+        rules: Rules below the root, as returned by ``Selection.rules``
+
+    Returns:
+        The profile text
+    """
+    root = os.path.realpath(root)
+    lines = [PROFILE_HEADER]
+    previous = ""
+    for path, selected, is_dir in sorted(rules):
+        rel_path = "." if path == root else path[len(root) + 1 :].replace(os.sep, "/")
+        shared = 0
+        limit = min(len(rel_path), len(previous))
+        while shared < limit and rel_path[shared] == previous[shared]:
+            shared += 1
+        kind = ("+" if selected else "-") + ("d" if is_dir else "f")
+        lines.append(f"{shared} {kind} {rel_path[shared:]}")
+        previous = rel_path
+    return "\n".join(lines) + "\n"
+
+
+def decode_rules(root: str, text: str) -> List[Rule]:
+    """
+    Decode the text of a profile into selection rules, parents first.
+
+    Args:
+        root: Project root the rule paths are relative to
+        text: Profile text written by ``encode_rules``
+
+    Returns:
+        Rules with absolute paths
+
+    Raises:
+        ValueError: If the text is not a supported profile or names paths outside the root
+    """
+    root = os.path.realpath(root)
+    lines = text.split("\n")
+    if lines[0] != PROFILE_HEADER:
+        raise ValueError("Not a supported selection profile")
+
+    rules: List[Rule] = []
+    previous = ""
+    for number, line in enumerate(lines[1:], start=2):
+        if not line:
+            continue
+        try:
+            shared, kind, rest = line.split(" ", 2)
+            selected, is_dir = _KINDS[kind]
+            rel_path = previous[: int(shared)] + rest
+        except (KeyError, ValueError):
+            raise ValueError(f"Malformed profile line {number}: {line!r}") from None
+        previous = rel_path
+        if rel_path == ".":
+            rules.append((root, selected, is_dir))
+            continue
+        if rel_path.startswith("/") or ".." in rel_path.split("/"):
+            raise ValueError(f"Profile line {number} is outside the project: {rel_path!r}")
+        rules.append((root + os.sep + rel_path.replace("/", os.sep), selected, is_dir))
+    return rules
+
+
+def save_profile(selection: Selection, name: str) -> str:
+    """
+    Save the rules of a selection as a named profile of its project.
+
+    Returns:
+        The path of the profile file
+
+    Raises:
+        OSError: If the profile cannot be written
+        ValueError: If the name is invalid
+    """
+    profile_file = profile_path(selection.root, name)
+    os.makedirs(os.path.dirname(profile_file), exist_ok=True)
+    tmp_file = f"{profile_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write(encode_rules(selection.root, selection.rules()))
+    os.replace(tmp_file, profile_file)
+    logger.info(f"Saved selection profile {name} to {profile_file}")
+    return profile_file
+
+
+def load_profile(root: str, name: str) -> List[Rule]:
+    """
+    Read the rules of a named profile of a project.
+
+    Raises:
+        OSError: If the profile cannot be read
+        ValueError: If the name is invalid or the file is not a valid profile
+    """
+    with open(profile_path(root, name), "r", encoding="utf-8") as f:
+        return decode_rules(root, f.read())
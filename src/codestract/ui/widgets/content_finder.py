@@ -0,0 +1,193 @@
+"""
+Content search screen for selecting files by what they contain.
+"""
+
+import os
+import re
+import threading
+import time
+from typing import List, Optional, Pattern
+
+from rich.text import Text
+from textual import on, work
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Input, Label, SelectionList
+
+from ...content_search import ContentMatch, compile_pattern, search_contents
+from ...utils.selection import Selection
+from .path_finder import SelectionCallback
+
+
+class ContentFinder(ModalScreen):
+    """Modal screen streaming the files whose contents match a pattern."""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Close", show=True),
+        Binding("ctrl+a", "select_results", "Select Matches", show=True, priority=True),
+        Binding("ctrl+d", "deselect_results", "Deselect Matches", show=True, priority=True),
+        Binding("ctrl+x", "cancel_search", "Stop Search", show=True, priority=True),
+    ]
+
+    DEFAULT_CSS = """
+    #content-dialog {
+        width: 80%;
+        height: 80%;
+        border: solid #20403F;
+        background: #28282e;
+        padding: 0 1;
+    }
+
+    #content-results {
+        height: 1fr;
+        border: none;
+    }
+
+    #content-status {
+        height: 1;
+        color: #EEE 60%;
+    }
+    """
+
+    # Minimum seconds between batches of streamed results
+    STREAM_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        root: str,
+        selection: Selection,
+        on_select: SelectionCallback,
+    ) -> None:
+        """
+        Initialize the content search screen.
+
+        Args:
+            root: Directory to search
+            selection: The current selection, shared with the tree panel
+            on_select: Callback applying selection changes to the app
+        """
+        super().__init__()
+        self.root = os.path.realpath(root)
+        self.selection = selection
+        self.on_select = on_select
+        self._cancel: Optional[threading.Event] = None
+        self._results: List[str] = []
+
+    def compose(self) -> ComposeResult:
+        """Create child widgets for the screen."""
+        with Vertical(id="content-dialog"):
+            yield Input(
+                placeholder="Search file contents (regular expression), Enter to run...",
+                id="content-input",
+            )
+            yield Label("", id="content-status")
+            yield SelectionList(id="content-results")
+
+    def on_unmount(self) -> None:
+        """Stop a running search when the screen closes."""
+        self.action_cancel_search()
+        self._cancel = None
+
+    @on(Input.Submitted, "#content-input")
+    def handle_pattern_submitted(self, event: Input.Submitted) -> None:
+        """Start a new search, cancelling the previous one."""
+        self.action_cancel_search()
+        if not event.value:
+            return
+        try:
+            # Smart case: all-lowercase patterns ignore case
+            pattern = compile_pattern(event.value, ignore_case=event.value.islower())
+        except re.error as e:
+            self._set_status(f"Invalid pattern: {e}")
+            return
+
+        self._results = []
+        self.query_one(SelectionList).clear_options()
+        self._set_status("Searching...")
+        self._cancel = threading.Event()
+        self._run_search(pattern, self._cancel)
+
+    @work(thread=True, group="content-search")
+    def _run_search(self, pattern: Pattern[bytes], cancel: threading.Event) -> None:
+        """Search the project in a background thread, streaming batches of matches."""
+        searched = 0
+        batch: List[ContentMatch] = []
+        last_flush = time.monotonic()
+
+        def report(count: int) -> None:
+            nonlocal searched
+            searched = count
+
+        for match in search_contents(self.root, pattern, cancel=cancel, progress=report):
+            batch.append(match)
+            now = time.monotonic()
+            if now - last_flush >= self.STREAM_INTERVAL:
+                self.app.call_from_thread(self._add_results, batch, searched, cancel, False)
+                batch = []
+                last_flush = now
+
+        self.app.call_from_thread(self._add_results, batch, searched, cancel, True)
+
+    def _add_results(
+        self,
+        matches: List[ContentMatch],
+        searched: int,
+        cancel: threading.Event,
+        finished: bool,
+    ) -> None:
+        """Append streamed matches and update the status line."""
+        if cancel is not self._cancel:
+            return  # Results of a superseded search
+        prefix = self.root + os.sep
+        options = []
+        for match in matches:
+            rel_path = match.path[len(prefix) :] if match.path.startswith(prefix) else match.path
+            prompt = Text.assemble((f"{rel_path}:{match.line_number}", "bold"), f"  {match.line}")
+            options.append((prompt, match.path, match.path in self.selection))
+            self._results.append(match.path)
+        if options:
+            self.query_one(SelectionList).add_options(options)
+
+        found = f"{len(self._results):,} matching files in {searched:,} searched"
+        if not finished:
+            self._set_status(f"Searching... {found}")
+        elif cancel.is_set():
+            self._set_status(f"Stopped: {found}")
+        else:
+            self._set_status(f"Done: {found}")
+
+    def _set_status(self, message: str) -> None:
+        """Show a message in the status line."""
+        self.query_one("#content-status", Label).update(Text(message))
+
+    def action_cancel_search(self) -> None:
+        """Stop the running search, keeping the matches found so far."""
+        if self._cancel is not None:
+            self._cancel.set()
+
+    @on(SelectionList.SelectionToggled, "#content-results")
+    def handle_result_toggled(self, event: SelectionList.SelectionToggled) -> None:
+        """Apply a single toggled match to the selection."""
+        path = event.selection.value
+        self._apply([path], path not in self.selection)
+
+    def action_select_results(self) -> None:
+        """Add every match found so far to the selection."""
+        self._apply(self._results, True)
+
+    def action_deselect_results(self) -> None:
+        """Remove every match found so far from the selection."""
+        self._apply(self._results, False)
+
+    def _apply(self, paths: List[str], selected: bool) -> None:
+        """Change the selection and sync the check marks with what was applied."""
+        self.on_select(paths, selected)
+        results_list = self.query_one(SelectionList)
+        with results_list.prevent(SelectionList.SelectedChanged):
+            for path in paths:
+                if path in self.selection:
+                    results_list.select(path)
+                else:
+                    results_list.deselect(path)
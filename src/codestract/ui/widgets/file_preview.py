@@ -3,15 +3,54 @@ File preview widget for displaying selected files and their statistics.
 """
 
 import os
-from typing import Dict, Set
+from bisect import bisect_left, insort
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set
 
 from rich.console import Group
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
+from textual import work
+from textual.geometry import Region
+from textual.strip import Strip
+from textual.timer import Timer
 from textual.widgets import Static
+from textual.worker import get_current_worker
 
 from ...exporter import calculate_file_stats
+from ...utils import perf
+from ...utils.dir_index import DirectoryIndex, text_file_counts
+from ...utils.file_utils import is_text_file
+from ...utils.selection import Selection
+
+
+class _PreviewJob:
+    """An immutable snapshot of the selection to compute the preview for."""
+
+    __slots__ = ("generation", "selection", "changed")
+
+    def __init__(self, generation: int, selection: Selection, changed: FrozenSet[str]) -> None:
+        self.generation = generation
+        self.selection = selection  # A copy-on-write copy of the selection
+        self.changed = changed  # Paths whose rules or contents changed
+
+
+class _PreviewResult:
+    """Entries measured by a preview job, applied only if no newer job started."""
+
+    __slots__ = ("job", "entries", "measured", "approximate")
+
+    def __init__(
+        self,
+        job: _PreviewJob,
+        entries: Dict[str, bool],
+        measured: Dict[str, dict],
+        approximate: Set[str],
+    ) -> None:
+        self.job = job
+        self.entries = entries
+        self.measured = measured
+        self.approximate = approximate
 
 
 class FilePreview(Static):
@@ -34,24 +73,230 @@ class FilePreview(Static):
     }
     """
 
+    # Number of selected entries rendered at a time
+    PAGE_SIZE = 20
+
+    # Seconds to wait for further changes before the preview is recomputed
+    DEBOUNCE_DELAY = 0.05
+
+    # Files measured between two checks for a newer job
+    MEASURE_CHUNK = 256
+
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.files_info: Dict[str, dict] = {}
+        self.totals = {"files": 0, "chars": 0, "lines": 0, "size": 0, "tokens": 0}
+        self.window_start = 0
+        self.dir_index: Optional[DirectoryIndex] = None
+        self._sorted_files: List[str] = []
+        self._dirs: Set[str] = set()
+        self._approximate: Set[str] = set()
+        self._selection: Optional[Selection] = None
+        self._changed: Set[str] = set()
+        self._generation = 0
+        self._debounce: Optional[Timer] = None
 
-    def update_preview(self, files: Set[str]) -> None:
-        """Update the preview with selected files info."""
-        if not files:
-            self.update(Panel("[dim]No files selected[/]", padding=(0, 1)))
+    def queue_change(self, selection: Selection, changed: Iterable[str] = ()) -> None:
+        """
+        Schedule the preview to be recomputed after a selection change.
+
+        Bursts of changes are coalesced: the preview is computed once they
+        pause for ``DEBOUNCE_DELAY``, from a snapshot of the selection taken
+        at that moment. A computation still running for an older snapshot is
+        cancelled, and its result is never shown.
+
+        The preview lists the outermost include rules of the selection: single
+        files, and directories totalled without enumerating their files.
+
+        Args:
+            selection: The live selection, read on the UI thread only
+            changed: Paths whose rules or contents changed, so that the
+                entries covering them are measured again
+        """
+        self._selection = selection
+        self._changed.update(changed)
+        self._generation += 1
+        if self._debounce is not None:
+            self._debounce.stop()
+        self._debounce = self.set_timer(self.DEBOUNCE_DELAY, self._start_job)
+
+    def _start_job(self) -> None:
+        """Snapshot the selection and compute the preview for it in the background."""
+        self._debounce = None
+        if self._selection is None:
+            return
+        job = _PreviewJob(self._generation, self._selection.copy(), frozenset(self._changed))
+        self._compute(job)
+
+    @work(thread=True, exclusive=True, group="preview", exit_on_error=False)
+    @perf.timed("preview.compute")
+    def _compute(self, job: _PreviewJob) -> None:
+        """
+        Measure the entries that were added or cover a changed path.
+
+        Removed entries are subtracted from the running totals when the
+        result is applied, so the cost depends on the size of the change
+        rather than the size of the selection.
+
+        The entries shown are read without a copy: only the result of the
+        newest job changes them, and this job's result is applied after it
+        finishes, while an older job still running has its result discarded.
+        """
+        worker = get_current_worker()
+        known = self.files_info
+        entries = job.selection.entries()
+        refreshed = {
+            entry
+            for path in job.changed
+            for entry in self._covering(path, entries, job.selection.root)
+            if entry in known
+        }
+        to_measure = (entries.keys() - known.keys()) | refreshed
+
+        measured: Dict[str, dict] = {}
+        approximate: Set[str] = set()
+        new_files = sorted(path for path in to_measure if not entries[path])
+        for start in range(0, len(new_files), self.MEASURE_CHUNK):
+            if worker.is_cancelled:
+                return
+            chunk = set(new_files[start : start + self.MEASURE_CHUNK])
+            for path, info in calculate_file_stats(chunk).items():
+                measured[path] = dict(info, files=1)
+        for path in to_measure:
+            if entries[path]:
+                if worker.is_cancelled:
+                    return
+                measured[path] = self._measure_dir(job.selection, path, approximate)
+
+        if not worker.is_cancelled:
+            result = _PreviewResult(job, entries, measured, approximate)
+            self.app.call_from_thread(self._apply_result, result)
+
+    def _apply_result(self, result: _PreviewResult) -> None:
+        """Apply a computed preview unless a newer change has been queued since."""
+        job = result.job
+        if job.generation != self._generation:
             return
+        self._changed.clear()
+
+        # Nothing changed the entries shown since the job started
+        known = self.files_info.keys()
+        shown = result.measured.keys() - known
+        removed = (known - result.entries.keys()) | (result.measured.keys() & known)
+        for path in removed:
+            info = self.files_info.pop(path, None)
+            if info is None:
+                continue
+            for key in self.totals:
+                self.totals[key] -= info[key]
+            self._dirs.discard(path)
+            self._approximate.discard(path)
+
+        for path, info in result.measured.items():
+            self.files_info[path] = info
+            for key in self.totals:
+                self.totals[key] += info[key]
+            if result.entries[path]:
+                self._dirs.add(path)
+        self._approximate |= result.approximate
+
+        if len(removed) + len(result.measured) > self.PAGE_SIZE:
+            self._sorted_files = sorted(self.files_info)
+        else:
+            for path in removed:
+                del self._sorted_files[bisect_left(self._sorted_files, path)]
+            for path in result.measured:
+                insort(self._sorted_files, path)
+
+        # Keep the most recently added entry in view
+        if shown:
+            index = bisect_left(self._sorted_files, max(shown))
+            self.window_start = index - index % self.PAGE_SIZE
+        self._clamp_window()
+        self._render_preview()
+
+    @staticmethod
+    def _covering(path: str, entries: Dict[str, bool], root: str) -> Iterator[str]:
+        """Yield the entries at or above a path."""
+        while True:
+            if path in entries:
+                yield path
+            if path == root or len(path) < len(root):
+                return
+            parent = os.path.dirname(path)
+            if parent == path:
+                return
+            path = parent
+
+    def scroll_files(self, pages: int) -> None:
+        """Move the visible window of the selected-files list by whole pages."""
+        self.window_start += pages * self.PAGE_SIZE
+        self._clamp_window()
+        self._render_preview()
+
+    def _measure_dir(self, selection: Selection, dir_path: str, approximate: Set[str]) -> dict:
+        """
+        Total the selected files below a directory rule from the directory index.
+
+        Excluded files are subtracted as the index counted them, from the
+        statistics cache or estimated from their size, so exact and estimated
+        figures never mix. The directory is added to ``approximate`` if part of
+        it has not been scanned yet or any of its figures are estimates.
+        """
+        is_approximate = False
+
+        def measure_dir(path: str) -> dict:
+            nonlocal is_approximate
+            stats = self.dir_index.get(path) if self.dir_index is not None else None
+            if stats is None or not stats.complete:
+                is_approximate = True
+            if stats is None:
+                return {}
+            return {
+                "files": stats.text_files,
+                "chars": stats.chars,
+                "lines": stats.lines,
+                "size": stats.text_bytes,
+                "tokens": stats.tokens,
+                "estimated": stats.estimated,
+            }
 
-        self.files_info = calculate_file_stats(files)
-        self._render_preview(files)
+        def measure_file(path: str) -> dict:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return {}
+            if not is_text_file(path, st):
+                return {}
+            lines, chars, tokens, estimated = text_file_counts(path, st)
+            return {
+                "files": 1,
+                "chars": chars,
+                "lines": lines,
+                "size": st.st_size,
+                "tokens": tokens,
+                "estimated": estimated,
+            }
 
-    def _render_preview(self, files: Set[str]) -> None:
+        totals = selection.measure(dir_path, measure_dir, measure_file)
+        if is_approximate or totals.get("estimated", 0):
+            approximate.add(dir_path)
+        return {key: max(totals.get(key, 0), 0) for key in self.totals}
+
+    def _clamp_window(self) -> None:
+        """Keep the visible window within the selected-files list."""
+        last_page = max(len(self._sorted_files) - 1, 0) // self.PAGE_SIZE
+        self.window_start = min(max(self.window_start, 0), last_page * self.PAGE_SIZE)
+
+    @perf.timed("preview.build")
+    def _render_preview(self) -> None:
         """Render the preview content using Rich components."""
-        total_chars = sum(info["chars"] for info in self.files_info.values())
-        total_lines = sum(info["lines"] for info in self.files_info.values())
-        total_size = sum(info["size"] for info in self.files_info.values())
+        entry_count = len(self._sorted_files)
+        if not entry_count:
+            self.update(Panel("[dim]No files selected[/]", padding=(0, 1)))
+            return
+        # Directory totals are estimates until their subtrees have been scanned
+        approx = "~" if self._approximate else ""
 
         # Create statistics table
         stats_table = Table(
@@ -65,16 +310,23 @@ class FilePreview(Static):
         # Add statistics in a clean, aligned format
         stats_table.add_row(
             Text("Total Files:", style="dim"),
-            Text(str(len(files)), style="cyan bold"),
+            Text(f"{approx}{self.totals['files']:,}", style="cyan bold"),
             Text("Total Lines:", style="dim"),
-            Text(f"{total_lines:,}", style="cyan bold"),
+            Text(f"{approx}{self.totals['lines']:,}", style="cyan bold"),
         )
 
         stats_table.add_row(
             Text("Total Characters:", style="dim"),
-            Text(f"{total_chars:,}", style="cyan bold"),
+            Text(f"{approx}{self.totals['chars']:,}", style="cyan bold"),
             Text("Total Size:", style="dim"),
-            Text(self._format_size(total_size), style="cyan bold"),
+            Text(approx + self._format_size(self.totals["size"]), style="cyan bold"),
+        )
+
+        stats_table.add_row(
+            Text("Est. Tokens:", style="dim"),
+            Text(f"{approx}{self.totals['tokens']:,}", style="cyan bold"),
+            Text(""),
+            Text(""),
         )
 
         # Create files table
@@ -86,17 +338,29 @@ class FilePreview(Static):
             expand=True,
         )
 
-        # Add file listings
-        for file_path in sorted(files):
+        # Add file listings for the visible window only
+        window = self._sorted_files[self.window_start : self.window_start + self.PAGE_SIZE]
+        for file_path in window:
             info = self.files_info[file_path]
             rel_path = os.path.relpath(file_path)
+            prefix = ""
+            if file_path in self._dirs:
+                rel_path += f"{os.sep} ({info['files']:,} files)"
+                prefix = "~" if file_path in self._approximate else ""
 
             files_table.add_row(
                 Text("•", style="dim"),
                 Text(" " + rel_path, style="cyan"),
-                Text(f"{info['lines']:,} lines", style="dim"),
-                Text(f"{info['chars']:,} chars", style="dim"),
-                Text(self._format_size(info["size"]), style="dim"),
+                Text(f"{prefix}{info['lines']:,} lines", style="dim"),
+                Text(f"{prefix}{info['tokens']:,} tokens", style="dim"),
+                Text(prefix + self._format_size(info["size"]), style="dim"),
+            )
+
+        title = "[bold white]Selected Files[/]"
+        if entry_count > self.PAGE_SIZE:
+            title += (
+                f" [dim]({self.window_start + 1:,}-{self.window_start + len(window):,}"
+                f" of {entry_count:,}, [ ] to page)[/]"
             )
 
         # Combine all components into panels
@@ -109,13 +373,18 @@ class FilePreview(Static):
             ),
             Panel(
                 files_table,
-                title="[bold white]Selected Files[/]",
+                title=title,
                 title_align="left",
                 padding=(0, 1),
             ),
         )
         self.update(content)
 
+    @perf.timed("preview.rich_render")
+    def render_lines(self, crop: Region) -> List[Strip]:
+        """Render the preview through Rich, timed while recording."""
+        return super().render_lines(crop)
+
     def _format_size(self, size_in_bytes: int) -> str:
         """Format file size in human-readable format."""
         units = ["B", "KB", "MB", "GB", "TB"]
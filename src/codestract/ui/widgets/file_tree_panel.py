@@ -3,25 +3,77 @@ File tree panel widget for displaying and managing the directory structure.
 """
 
 import os
-from typing import Set
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Set
 
 from rich.text import Text
+from textual import on, work
 from textual.containers import Container
+from textual.message import Message
 from textual.widgets import DirectoryTree, Label
 from textual.widgets.tree import TreeNode
+from textual.worker import Worker
 
+from ...utils import perf
 from ...utils.constants import ICONS
+from ...utils.dir_index import DirectoryIndex, DirStats
 from ...utils.file_utils import is_text_file
+from ...utils.ignore import IgnoreEngine
+from ...utils.selection import Selection
+from .project_tree import ProjectTree
+
+
+def _compact_number(value: int) -> str:
+    """Format a count in at most a few characters, e.g. 12.3k."""
+    if value < 1000:
+        return str(value)
+    if value < 1_000_000:
+        return f"{value / 1000:.1f}k"
+    return f"{value / 1_000_000:.1f}M"
+
+
+def _compact_size(size_in_bytes: int) -> str:
+    """Format a size in bytes in at most a few characters, e.g. 3.2 MB."""
+    size = float(size_in_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024.0:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
+
+
+def _aggregate_text(stats: DirStats) -> str:
+    """Describe the aggregated contents of a directory for its label."""
+    files = f"{stats.files:,} file{'' if stats.files == 1 else 's'}"
+    if stats.text_files != stats.files:
+        files += f" ({stats.text_files:,} text)"
+    lines = f"~{_compact_number(stats.lines)} line{'' if stats.lines == 1 else 's'}"
+    text = f"  {files} · {_compact_size(stats.bytes)} · {lines}"
+    return text if stats.complete else text + " …"
 
 
 class FileTreePanel(Container):
     """A container widget for the file tree and its header."""
 
+    class DirectoryTotalsChanged(Message):
+        """Posted when the background scan updated the totals of directories."""
+
+        def __init__(self, dir_paths: Set[str]) -> None:
+            super().__init__()
+            self.dir_paths = dir_paths
+
     def __init__(self, start_path: str) -> None:
         """Initialize the file tree panel."""
         super().__init__(id="tree-container")
         self.start_path = start_path
-        self.selected_files: Set[str] = set()
+        self._root_path = os.path.realpath(start_path)
+        self.selection = Selection(self._root_path)
+        self.ignore = IgnoreEngine(self._root_path)
+        self._nodes_by_path: Dict[str, TreeNode] = {}
+        self._text_files: Set[str] = set()
+        self.dir_index = DirectoryIndex(self._root_path, IgnoreEngine(self._root_path))
+        self._scan_cancel = threading.Event()
+        self._scan_worker: Optional[Worker] = None
 
     def compose(self):
         """Create child widgets for the panel."""
@@ -29,47 +81,214 @@ class FileTreePanel(Container):
             f"{ICONS['folder']} Project Files (Space: Toggle)",
             id="tree-header",
         )
-        yield DirectoryTree(
+        yield ProjectTree(
             self.start_path,
+            ignore=self.ignore,
             id="file-tree",
         )
 
+    def on_mount(self) -> None:
+        """Start aggregating directory statistics in the background."""
+        self._start_scan()
+
+    def on_unmount(self) -> None:
+        """Stop the directory scan."""
+        self._scan_cancel.set()
+
+    def _start_scan(self) -> None:
+        """Start the directory scan unless it is already running."""
+        if self._scan_worker is None and not self._scan_cancel.is_set():
+            self._scan_worker = self._scan_directories()
+
+    @work(thread=True, group="dir-index", exit_on_error=False)
+    def _scan_directories(self) -> None:
+        """Aggregate directory statistics in a background thread."""
+        self.dir_index.scan(self._scan_cancel, self._report_scan)
+        if not self._scan_cancel.is_set():
+            self.app.call_from_thread(self._scan_stopped)
+
+    def _report_scan(self, dir_paths: Set[str]) -> None:
+        """Forward directories with new aggregates from the scan thread."""
+        if not self._scan_cancel.is_set():
+            self.app.call_from_thread(self._relabel_dirs, dir_paths)
+
+    def _scan_stopped(self) -> None:
+        """Restart the scan if work was requested while it was finishing."""
+        self._scan_worker = None
+        if not self.dir_index.complete:
+            self._start_scan()
+
+    def _relabel_dirs(self, dir_paths: Set[str]) -> None:
+        """Relabel the loaded nodes of directories whose aggregates changed."""
+        for dir_path in dir_paths:
+            node = self._nodes_by_path.get(dir_path)
+            if node is not None:
+                self._label_node(node)
+        self.post_message(self.DirectoryTotalsChanged(dir_paths))
+
+    @on(ProjectTree.NodeHighlighted)
+    def handle_node_highlighted(self, event: ProjectTree.NodeHighlighted) -> None:
+        """Aggregate the highlighted directory first, dropping earlier requests."""
+        node = event.node
+        if node.allow_expand:
+            stats = self.dir_index.get(self.node_path(node))
+            if stats is None or not stats.complete:
+                self.dir_index.prioritize(self.node_path(node))
+
+    @perf.timed("tree.refresh_icons")
     def refresh_tree_icons(self) -> None:
-        """Refresh the file tree icons."""
+        """Relabel every loaded node of the file tree."""
         tree = self.query_one(DirectoryTree)
         root = tree.root
         if root:
+            self._nodes_by_path[self._root_path] = root
             self._update_node_icons(root)
 
     def _update_node_icons(self, node: TreeNode) -> None:
         """Update icons for a node and its children recursively."""
         if hasattr(node, "data") and node.data:
-            path = str(node.data.path)
-            is_selected = path in self.selected_files
-            is_text = is_text_file(path) if os.path.isfile(path) else True
+            self._label_node(node)
+            for child in node.children:
+                self._update_node_icons(child)
 
-            # Show different styling for non-text files
-            if not is_text and os.path.isfile(path):
-                name = os.path.basename(path)
-                node.label = Text.from_markup(f"[dim]⊘ {name}[/]")
+    @on(ProjectTree.DirectoryLoaded)
+    def handle_directory_loaded(self, event: ProjectTree.DirectoryLoaded) -> None:
+        """Register and label a page of children of a directory."""
+        for child in event.children:
+            self._nodes_by_path[str(child.data.path)] = child
+            self._label_node(child)
+
+    def set_selected(self, paths: Iterable[str], selected: bool) -> None:
+        """
+        Select or deselect files and relabel only the affected nodes.
+
+        Args:
+            paths: Paths of the files to change
+            selected: Whether the files should be selected
+        """
+        dirty: Set[str] = set()
+        for path in paths:
+            if self.selection.select(path, selected):
+                dirty.add(path)
+                dirty.update(self._ancestors(path))
+        self._relabel(dirty)
+
+    def set_dir_selected(self, dir_path: str, selected: bool) -> None:
+        """
+        Select or deselect a whole directory as a single rule.
+
+        Rules below the directory are replaced, and files added to it later
+        are covered as well.
+
+        Args:
+            dir_path: Path of the directory to change
+            selected: Whether the directory should be selected
+        """
+        if not self.selection.select(dir_path, selected, is_dir=True):
+            return
+        node = self._nodes_by_path.get(dir_path)
+        if node is not None:
+            self._update_node_icons(node)
+        self._relabel(self._ancestors(dir_path))
+
+    def _relabel(self, paths: Iterable[str]) -> None:
+        """Relabel the loaded nodes of the given paths."""
+        for path in paths:
+            node = self._nodes_by_path.get(path)
+            if node is not None:
+                self._label_node(node)
+
+    def handle_external_changes(self, paths: Set[str], structural: Set[str]) -> None:
+        """
+        Bring the loaded nodes in line with files changed on disk.
+
+        Modified files are only relabeled. Directories gaining or losing
+        entries are reloaded, which keeps their expanded subdirectories
+        expanded. Rules on deleted paths must be forgotten beforehand.
+
+        Args:
+            paths: Paths that were modified, created or deleted
+            structural: The paths among them that were created or deleted
+        """
+        tree = self.get_tree()
+        reload: Set[str] = set()
+        self.dir_index.rescan(
+            {path if path == self._root_path else os.path.dirname(path) for path in paths}
+        )
+        self._start_scan()
+
+        for path in paths:
+            self._text_files.discard(path)
+            if path not in structural:
+                node = self._nodes_by_path.get(path)
+                if node is not None and not node.allow_expand:
+                    self._label_node(node)
+                continue
+            if not os.path.lexists(path):
+                self._forget(path)
+                self._relabel(self._ancestors(path))
+            parent = self._nodes_by_path.get(os.path.dirname(path))
+            if parent is not None and parent.data is not None and parent.data.loaded:
+                reload.add(os.path.dirname(path))
+
+        for dir_path in reload:
+            if any(ancestor in reload for ancestor in self._ancestors(dir_path)):
+                continue
+            tree.reload_node(self._nodes_by_path[dir_path])
+
+    def _forget(self, path: str) -> None:
+        """Drop the cached nodes of a deleted path and everything below it."""
+        self._nodes_by_path.pop(path, None)
+        prefix = path + os.sep
+        for key in [k for k in self._nodes_by_path if k.startswith(prefix)]:
+            del self._nodes_by_path[key]
+        self._text_files = {p for p in self._text_files if not p.startswith(prefix)}
+
+    def _label_node(self, node: TreeNode) -> None:
+        """Rebuild the label of a single node from the selection rules."""
+        perf.count("tree.nodes_relabeled")
+        path = self.node_path(node)
+        name = os.path.basename(path) or path
+
+        if node.allow_expand:
+            state = self.selection.dir_state(path)
+            if state == "all":
+                label = Text.assemble(ICONS["selected"] + " ", name)
+            elif state == "partial":
+                label = Text.assemble((ICONS["partial"] + " ", "dim"), name)
             else:
-                name = os.path.basename(path)
-                # Only show checkbox for selected items
-                prefix = ICONS["selected"] + " " if is_selected else ""
-                node.label = Text.from_markup(f"{prefix}{name}")
+                label = Text(name)
+            stats = self.dir_index.get(path)
+            if stats is not None and (stats.files or stats.complete):
+                label.append(_aggregate_text(stats), style="dim")
+            node.label = label
+        elif path not in self._text_files and not is_text_file(path):
+            # Show different styling for non-text files
+            node.label = Text(f"⊘ {name}", style="dim")
+        else:
+            self._text_files.add(path)
+            # Only show checkbox for selected items
+            prefix = ICONS["selected"] + " " if path in self.selection else ""
+            node.label = Text(prefix + name)
 
-            # Recursively update children
-            for child in node.children:
-                self._update_node_icons(child)
+    def node_path(self, node: TreeNode) -> str:
+        """Get the absolute path a node represents."""
+        if node.parent is None:
+            return self._root_path
+        return str(node.data.path)
+
+    def _ancestors(self, path: str) -> Iterator[str]:
+        """Yield the directories containing a path, up to the tree root."""
+        while path != self._root_path:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return
+            yield parent
+            path = parent
 
     def select_all_in_node(self, node: TreeNode) -> None:
-        """Recursively select all files in a node and its children."""
-        if hasattr(node, "data") and node.data:
-            path = str(node.data.path)
-            if os.path.isfile(path) and is_text_file(path):
-                self.selected_files.add(path)
-            for child in node.children:
-                self.select_all_in_node(child)
+        """Select a directory node and everything below it, loaded or not."""
+        self.set_dir_selected(self.node_path(node), True)
 
     def get_tree(self) -> DirectoryTree:
         """Get the DirectoryTree widget."""
@@ -0,0 +1,141 @@
+"""
+Path finder screen for locating and selecting files by name.
+"""
+
+import threading
+from typing import Callable, Iterable, List
+
+from rich.text import Text
+from textual import on, work
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Input, Label, SelectionList
+
+from ...utils.path_index import FuzzyFinder, PathIndex
+from ...utils.selection import Selection
+
+# Called with (paths, selected) to change the app's selection
+SelectionCallback = Callable[[Iterable[str], bool], None]
+
+
+class PathFinder(ModalScreen):
+    """Modal screen searching the project's path index as the user types."""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Close", show=True),
+        Binding("ctrl+a", "select_results", "Select Results", show=True, priority=True),
+        Binding("ctrl+d", "deselect_results", "Deselect Results", show=True, priority=True),
+    ]
+
+    DEFAULT_CSS = """
+    #finder-dialog {
+        width: 80%;
+        height: 80%;
+        border: solid #20403F;
+        background: #28282e;
+        padding: 0 1;
+    }
+
+    #finder-results {
+        height: 1fr;
+        border: none;
+    }
+
+    #finder-status {
+        height: 1;
+        color: #EEE 60%;
+    }
+    """
+
+    def __init__(
+        self,
+        index: PathIndex,
+        selection: Selection,
+        on_select: SelectionCallback,
+    ) -> None:
+        """
+        Initialize the finder.
+
+        Args:
+            index: Index of the project's paths
+            selection: The current selection, shared with the tree panel
+            on_select: Callback applying selection changes to the app
+        """
+        super().__init__()
+        self.index = index
+        self.selection = selection
+        self.on_select = on_select
+        self._finder = FuzzyFinder(index)
+        self._search_lock = threading.Lock()
+        self._results: List[str] = []
+
+    def compose(self) -> ComposeResult:
+        """Create child widgets for the screen."""
+        with Vertical(id="finder-dialog"):
+            yield Input(placeholder="Find files by path...", id="finder-input")
+            yield Label(f"{len(self.index):,} paths indexed", id="finder-status")
+            yield SelectionList(id="finder-results")
+
+    @on(Input.Changed, "#finder-input")
+    def handle_query_changed(self, event: Input.Changed) -> None:
+        """Search again whenever the query changes."""
+        self._search(event.value)
+
+    @on(Input.Submitted, "#finder-input")
+    def handle_query_submitted(self) -> None:
+        """Move focus to the results so they can be toggled."""
+        results_list = self.query_one(SelectionList)
+        if results_list.option_count and results_list.highlighted is None:
+            results_list.highlighted = 0
+        results_list.focus()
+
+    @work(thread=True, exclusive=True, group="path-finder")
+    def _search(self, query: str) -> None:
+        """Run a query against the index in a background thread."""
+        with self._search_lock:
+            ids = self._finder.search(query)
+        paths = [(self.index.relative(i), self.index.paths[i]) for i in ids]
+        self.app.call_from_thread(self._show_results, query, paths)
+
+    def _show_results(self, query: str, results: List[tuple]) -> None:
+        """Replace the listed results."""
+        if query != self.query_one(Input).value:
+            return  # A newer query is on its way
+        self._results = [path for _, path in results]
+        results_list = self.query_one(SelectionList)
+        results_list.clear_options()
+        results_list.add_options(
+            (Text(label), path, path in self.selection) for label, path in results
+        )
+        status = self.query_one("#finder-status", Label)
+        if query.strip():
+            status.update(f"{len(results):,} matches in {len(self.index):,} paths")
+        else:
+            status.update(f"{len(self.index):,} paths indexed")
+
+    @on(SelectionList.SelectionToggled, "#finder-results")
+    def handle_result_toggled(self, event: SelectionList.SelectionToggled) -> None:
+        """Apply a single toggled result to the selection."""
+        path = event.selection.value
+        self._apply([path], path not in self.selection)
+
+    def action_select_results(self) -> None:
+        """Select every listed result."""
+        self._apply(self._results, True)
+
+    def action_deselect_results(self) -> None:
+        """Deselect every listed result."""
+        self._apply(self._results, False)
+
+    def _apply(self, paths: List[str], selected: bool) -> None:
+        """Change the selection and sync the check marks with what was applied."""
+        self.on_select(paths, selected)
+        results_list = self.query_one(SelectionList)
+        with results_list.prevent(SelectionList.SelectedChanged):
+            for path in paths:
+                if path in self.selection:
+                    results_list.select(path)
+                else:
+                    results_list.deselect(path)
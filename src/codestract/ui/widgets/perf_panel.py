@@ -0,0 +1,104 @@
+"""
+Performance panel widget showing the recorded timing spans and counters.
+"""
+
+from typing import Optional
+
+from rich.console import Group
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+from textual.timer import Timer
+from textual.widgets import Static
+
+from ...utils import perf
+
+
+class PerfPanel(Static):
+    """A panel docked to the right that refreshes the recorded profile while shown."""
+
+    DEFAULT_CSS = """
+    PerfPanel {
+        dock: right;
+        width: 48;
+        height: 100%;
+        padding: 0 1;
+        border-left: solid #20403F;
+        display: none;
+    }
+
+    PerfPanel.-visible {
+        display: block;
+    }
+    """
+
+    # Seconds between refreshes while the panel is shown
+    REFRESH_INTERVAL = 0.5
+
+    def __init__(self) -> None:
+        """Initialize the performance panel."""
+        super().__init__("", id="perf-panel")
+        self._timer: Optional[Timer] = None
+
+    @property
+    def shown(self) -> bool:
+        """Whether the panel is shown."""
+        return self.has_class("-visible")
+
+    def show(self) -> None:
+        """Show the panel and refresh it periodically."""
+        self.add_class("-visible")
+        self.refresh_profile()
+        if self._timer is None:
+            self._timer = self.set_interval(self.REFRESH_INTERVAL, self.refresh_profile)
+
+    def hide(self) -> None:
+        """Hide the panel and stop refreshing it."""
+        self.remove_class("-visible")
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+
+    def refresh_profile(self) -> None:
+        """Render the spans and counters recorded so far."""
+        profile = perf.snapshot()
+        if profile is None:
+            self.update(Panel("[dim]Recording is off[/]", title="Performance", padding=(0, 1)))
+            return
+
+        spans = Table(box=None, show_edge=False, padding=(0, 1), expand=True)
+        spans.add_column("Span", style="dim", ratio=1, overflow="fold")
+        spans.add_column("Calls", justify="right")
+        spans.add_column("Mean", justify="right", style="cyan")
+        spans.add_column("Max", justify="right")
+        for name, stats in profile["spans"].items():
+            spans.add_row(
+                name,
+                f"{stats['count']:,}",
+                self._format_time(stats["mean"]),
+                self._format_time(stats["max"]),
+            )
+
+        counters = Table(show_header=False, box=None, show_edge=False, padding=(0, 1), expand=True)
+        counters.add_column(style="dim", ratio=1, overflow="fold")
+        counters.add_column(justify="right", style="cyan")
+        for name, value in profile["counters"].items():
+            counters.add_row(name, f"{value:,}")
+
+        self.update(
+            Panel(
+                Group(spans, Text(""), counters),
+                title=f"Performance ({profile['elapsed']:.0f}s)",
+                title_align="left",
+                padding=(0, 1),
+            )
+        )
+
+    @staticmethod
+    def _format_time(seconds: float) -> str:
+        """Format a duration with a unit suited to its size."""
+        if seconds >= 1:
+            return f"{seconds:.2f}s"
+        if seconds >= 0.001:
+            return f"{seconds * 1000:.1f}ms"
+        return f"{seconds * 1_000_000:.0f}µs"
@@ -0,0 +1,66 @@
+"""
+Prompt screen asking for the name to save the selection profile under.
+"""
+
+from typing import List, Optional
+
+from textual import on
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Input, Label
+
+
+class ProfilePrompt(ModalScreen[Optional[str]]):
+    """Modal screen returning a profile name, or None when cancelled."""
+
+    BINDINGS = [
+        Binding("escape", "cancel", "Cancel", show=True),
+    ]
+
+    DEFAULT_CSS = """
+    #profile-dialog {
+        width: 60;
+        height: auto;
+        border: solid #20403F;
+        background: #28282e;
+        padding: 0 1;
+    }
+
+    #profile-status {
+        height: auto;
+        color: #EEE 60%;
+    }
+    """
+
+    def __init__(self, name: Optional[str], existing: List[str]) -> None:
+        """
+        Initialize the prompt.
+
+        Args:
+            name: Name to suggest, e.g. the profile loaded at startup
+            existing: Names of the project's saved profiles
+        """
+        super().__init__()
+        self.suggested = name or ""
+        self.existing = existing
+
+    def compose(self) -> ComposeResult:
+        """Create child widgets for the screen."""
+        with Vertical(id="profile-dialog"):
+            yield Label("Save selection as profile:")
+            yield Input(value=self.suggested, placeholder="profile name", id="profile-input")
+            saved = ", ".join(self.existing) if self.existing else "none"
+            yield Label(f"Saved profiles: {saved}", id="profile-status")
+
+    @on(Input.Submitted, "#profile-input")
+    def handle_name_submitted(self, event: Input.Submitted) -> None:
+        """Return the entered name."""
+        name = event.value.strip()
+        if name:
+            self.dismiss(name)
+
+    def action_cancel(self) -> None:
+        """Close the prompt without saving."""
+        self.dismiss(None)
@@ -0,0 +1,176 @@
+"""
+Directory tree widget that reports when directory contents have been loaded.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from textual.await_complete import AwaitComplete
+from textual.binding import Binding
+from textual.geometry import Region
+from textual.message import Message
+from textual.strip import Strip
+from textual.widgets import DirectoryTree
+from textual.widgets.directory_tree import DirEntry
+from textual.widgets.tree import TreeNode, UnknownNodeID
+from textual.worker import Worker
+
+from ...utils import perf
+from ...utils.ignore import IgnoreEngine
+
+
+class ProjectTree(DirectoryTree):
+    """
+    A DirectoryTree that hides ignored paths and fills directories in pages.
+
+    Directory listings run in a worker thread, which also records whether
+    each entry is a directory so the UI thread never stats entries. Large
+    directories are filled in pages with a refresh in between, each page as
+    large as the children already added, so the tree is laid out only a
+    logarithmic number of times. Collapsing a directory before it is filled
+    stops the paging and lists it again on the next expand.
+
+    Space toggles the selection of the node under the cursor, directories
+    included; Enter still expands directories and toggles files.
+
+    The listing and population hooks overridden here are private to
+    ``DirectoryTree``, which is why the Textual requirement has an upper bound.
+    """
+
+    BINDINGS = [
+        Binding("space", "toggle_selection", "Toggle Selection", show=False),
+    ]
+
+    # Children added to a directory node before the first refresh
+    PAGE_SIZE = 500
+
+    class DirectoryLoaded(Message):
+        """Posted after a page of children has been added to a directory node."""
+
+        def __init__(
+            self, node: TreeNode, children: List[TreeNode], first: bool, complete: bool
+        ) -> None:
+            super().__init__()
+            self.node = node
+            self.children = children
+            self.first = first  # Whether this is the first page of a fresh listing
+            self.complete = complete  # Whether every child has been added
+
+    class SelectionToggled(Message):
+        """Posted when the selection of the node under the cursor should be toggled."""
+
+        def __init__(self, node: TreeNode) -> None:
+            super().__init__()
+            self.node = node
+
+    def __init__(self, path: str, ignore: Optional[IgnoreEngine] = None, **kwargs) -> None:
+        """Initialize the tree with an optional ignore engine."""
+        self.ignore = ignore
+        self._is_dir: Dict[Path, bool] = {}
+        self._page_tokens: Dict[int, object] = {}
+        super().__init__(path, **kwargs)
+
+    @perf.timed("tree.render")
+    def render_lines(self, crop: Region) -> List[Strip]:
+        """Render the visible lines of the tree, timed while recording."""
+        return super().render_lines(crop)
+
+    def action_toggle_selection(self) -> None:
+        """Ask for the selection of the node under the cursor to be toggled."""
+        node = self.cursor_node
+        if node is not None and node.data is not None:
+            self.post_message(self.SelectionToggled(node))
+
+    def reload_node(self, node: TreeNode) -> AwaitComplete:
+        """Reload a subtree, forgetting what cancelled or failed listings recorded."""
+        # Entries missing from the record are checked with a stat instead
+        self._is_dir.clear()
+        return super().reload_node(node)
+
+    def _directory_content(self, location: Path, worker: Worker) -> Iterator[Path]:
+        """List a directory with ``os.scandir``, remembering which entries are directories."""
+        listed = []
+        try:
+            with os.scandir(location) as it:
+                for entry in it:
+                    if worker.is_cancelled:
+                        break
+                    path = location / entry.name
+                    try:
+                        self._is_dir[path] = entry.is_dir()
+                    except OSError:
+                        self._is_dir[path] = False
+                    listed.append(path)
+                    yield path
+        except OSError:
+            pass
+        finally:
+            if worker.is_cancelled:
+                # The listing never reaches _populate_node to use these
+                self._forget(listed)
+
+    def _forget(self, paths: Iterable[Path]) -> None:
+        """Drop what the listings recorded about entries that will not be added."""
+        for path in paths:
+            self._is_dir.pop(path, None)
+
+    def _safe_is_dir(self, path: Path) -> bool:
+        """Check whether a path is a directory, using the listing's answer if there is one."""
+        is_dir = self._is_dir.get(path)
+        if is_dir is None:
+            return DirectoryTree._safe_is_dir(path)
+        return is_dir
+
+    def filter_paths(self, paths: Iterable[Path]) -> Iterable[Path]:
+        """Drop ignored entries before they are added to the tree."""
+        if self.ignore is None:
+            return paths
+        kept = []
+        for path in paths:
+            if self.ignore.is_ignored(str(path), self._is_dir.get(path)):
+                self._is_dir.pop(path, None)
+            else:
+                kept.append(path)
+        return kept
+
+    def _populate_node(self, node: TreeNode, content: Iterable[Path]) -> None:
+        """Populate a directory node with its first page of children and queue the rest."""
+        node.remove_children()
+        token = self._page_tokens[node.id] = object()
+        self._add_page(node, list(content), 0, token)
+        node.expand()
+
+    def _add_page(self, node: TreeNode, content: List[Path], start: int, token: object) -> None:
+        """Add one page of children to a directory node and announce them."""
+        if self._page_tokens.get(node.id) is not token:
+            # The node was listed again or reset since this page was queued
+            self._forget(content[start:])
+            return
+        try:
+            self.get_node_by_id(node.id)
+        except UnknownNodeID:
+            # The node was removed along with its parent's children
+            del self._page_tokens[node.id]
+            self._forget(content[start:])
+            return
+        if start and not node.is_expanded:
+            # Collapsed before it was filled; list it again when expanded
+            del self._page_tokens[node.id]
+            node.data.loaded = False
+            self._forget(content[start:])
+            return
+
+        end = min(start + max(start, self.PAGE_SIZE), len(content))
+        children = []
+        for path in content[start:end]:
+            allow_expand = self._safe_is_dir(path)
+            self._is_dir.pop(path, None)
+            children.append(node.add(path.name, data=DirEntry(path), allow_expand=allow_expand))
+
+        complete = end == len(content)
+        if complete:
+            del self._page_tokens[node.id]
+        else:
+            self.call_after_refresh(self._add_page, node, content, end, token)
+        self.post_message(self.DirectoryLoaded(node, children, start == 0, complete))
@@ -2,7 +2,9 @@
 Summary panel widget for displaying file selection summary and export controls.
 """
 
-from typing import Set
+import threading
+import time
+from typing import Iterable, Optional
 
 from rich.panel import Panel
 from rich.table import Table
@@ -11,7 +13,12 @@ from textual import work
 from textual.containers import ScrollableContainer
 from textual.widgets import Label, Static
 
-from ...exporter import export_selected_files
+from ...compaction import CompactionOptions
+from ...exporter import ShardBudget, export_selected_files
+from ...utils.constants import ICONS
+from ...utils.dir_index import DirectoryIndex
+from ...utils.ignore import IgnoreEngine
+from ...utils.selection import Selection
 from .file_preview import FilePreview
 
 
@@ -58,10 +65,15 @@ class SummaryPanel(ScrollableContainer):
     }
     """
 
+    # Minimum seconds between export progress updates
+    PROGRESS_INTERVAL = 0.1
+
     def __init__(self) -> None:
         """Initialize the summary panel."""
         super().__init__(id="summary-container")
-        self.selected_files: Set[str] = set()
+        self.selection: Optional[Selection] = None
+        self._last_progress = 0.0
+        self._export_lock = threading.Lock()
 
     def compose(self):
         """Create child widgets for the panel."""
@@ -84,10 +96,17 @@ class SummaryPanel(ScrollableContainer):
         shortcuts = [
             ("q", "Quit"),
             ("e", "Export Files"),
+            ("d", "Export Changes Since Last Export"),
             ("space", "Toggle Selection"),
             ("enter", "Expand/Collapse"),
             ("f", "Show/Hide Files"),
+            ("[ ]", "Page Selected Files"),
             ("/", "Search"),
+            ("g", "Search Contents"),
+            ("a", "Auto-fit to Token Budget"),
+            ("w", "Watch for Changes"),
+            ("s", "Save Selection Profile"),
+            ("p", "Show/Hide Performance Panel"),
         ]
 
         for key, action in shortcuts:
@@ -104,29 +123,93 @@ class SummaryPanel(ScrollableContainer):
             padding=(0, 1),
         )
 
-    def update_selection_count(self, selected_files: Set[str]) -> None:
+    def set_dir_index(self, dir_index: DirectoryIndex) -> None:
+        """Use a directory index to total selected directories in the preview."""
+        self.query_one(FilePreview).dir_index = dir_index
+
+    def update_selection_count(self, selection: Selection) -> None:
         """Update the selection count display."""
-        self.selected_files = selected_files
-        count = len(selected_files)
+        self.selection = selection
         count_label = self.query_one("#selection-count", Label)
-        count_label.update(f"{count} files selected")
+        count_label.update(selection.describe())
 
-    @work(thread=True)
-    def update_preview(self) -> None:
-        """Update the file preview asynchronously in a background thread."""
+    def update_preview(self, selection: Selection, changed: Iterable[str] = ()) -> None:
+        """Schedule the file preview to be recomputed in the background after a change."""
         preview = self.query_one(FilePreview)
-        preview.update_preview(self.selected_files)
+        preview.queue_change(selection, changed)
 
-    @work(thread=True)
-    def handle_export(self) -> None:
-        """Handle the export action."""
-        if not self.selected_files:
+    def scroll_preview(self, pages: int) -> None:
+        """Page through the selected-files list of the preview."""
+        preview = self.query_one(FilePreview)
+        preview.scroll_files(pages)
+
+    def handle_export(
+        self,
+        project_root: Optional[str] = None,
+        baseline_file: Optional[str] = None,
+        output_file: Optional[str] = None,
+        shard_budget: Optional[ShardBudget] = None,
+        compaction: Optional[CompactionOptions] = None,
+    ) -> None:
+        """Handle the export action, writing only changes if a baseline manifest is given."""
+        if not self.selection:
             self.show_export_error()
             return
+        self._export_in_background(
+            self.selection.copy(),
+            project_root,
+            baseline_file,
+            output_file,
+            shard_budget,
+            compaction,
+        )
 
-        summary = export_selected_files(self.selected_files)
+    @work(thread=True)
+    def _export_in_background(
+        self,
+        selection: Selection,
+        project_root: Optional[str],
+        baseline_file: Optional[str],
+        output_file: Optional[str],
+        shard_budget: Optional[ShardBudget],
+        compaction: Optional[CompactionOptions],
+    ) -> None:
+        """Enumerate the selected files and export them in a background thread."""
+        # Exports to the same file must not overlap, e.g. when re-exporting on changes
+        with self._export_lock:
+            files = set(selection.files(IgnoreEngine(selection.root)))
+            summary = export_selected_files(
+                files,
+                output_file_name=output_file,
+                progress=self._report_export_progress,
+                baseline_file=baseline_file,
+                project_root=project_root,
+                shard_budget=shard_budget,
+                compaction=compaction,
+            )
         self.show_export_summary(summary)
 
+    def _report_export_progress(self, done: int, total: int) -> None:
+        """Forward export progress from the export thread, throttled."""
+        now = time.monotonic()
+        if done < total and now - self._last_progress < self.PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        self.app.call_from_thread(self.show_export_progress, done, total)
+
+    def show_export_progress(self, done: int, total: int) -> None:
+        """Show export progress message."""
+        percent = done * 100 // total if total else 100
+        summary_label = self.query_one("#export-summary", Label)
+        summary_label.update(
+            Panel(
+                f"[cyan]{ICONS['export']} Exporting {done:,}/{total:,} files ({percent}%)[/]",
+                title="Export Progress",
+                title_align="left",
+                padding=(0, 1),
+            )
+        )
+
     def show_export_error(self) -> None:
         """Show export error message."""
         summary_label = self.query_one("#export-summary", Label)
@@ -7,6 +7,29 @@ ICONS = {
     "folder": "📁",  # Directory icon
     "file": "📄",  # File icon
     "selected": "✅",  # Selected indicator
+    "partial": "◐",  # Partially selected directory indicator
     "stats": "📊",  # Statistics icon
     "export": "📤",  # Export icon
 }
+
+# Per-project directory holding caches and other session state
+STATE_DIR_NAME = ".codestract"
+
+# Directories that never contain files worth exporting
+PRUNED_DIR_NAMES = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        STATE_DIR_NAME,
+        "__pycache__",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+        ".tox",
+        ".nox",
+        ".venv",
+        "venv",
+        "node_modules",
+    }
+)
@@ -0,0 +1,375 @@
+"""
+Per-directory aggregate index of file counts, sizes and estimated lines.
+
+Nothing in this module may import Textual or Rich.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .constants import PRUNED_DIR_NAMES
+from .file_utils import is_text_file
+from .ignore import IgnoreEngine
+from .stats_cache import StatsCache, get_stats_cache
+
+logger = logging.getLogger(__name__)
+
+# Bytes per line and per token assumed for text files whose statistics are not cached
+ESTIMATED_LINE_BYTES = 40
+ESTIMATED_TOKEN_BYTES = 4
+
+# Minimum seconds between two update callbacks of a scan
+UPDATE_INTERVAL = 0.2
+
+# Called with the directories whose aggregates changed
+DirUpdateCallback = Callable[[Set[str]], None]
+
+# Totals in the order of ``DirStats.TOTALS``
+_Totals = Tuple[int, ...]
+
+
+def text_file_counts(
+    path: str, st: os.stat_result, cache: Optional[StatsCache] = None
+) -> Tuple[int, int, int, int]:
+    """
+    Count a text file the way directory totals do.
+
+    Args:
+        path: Path of the text file
+        st: The file's stat data
+        cache: Statistics cache to look the file up in, the shared one if not given
+
+    Returns:
+        Lines, characters and tokens from the cache, or estimated from the
+        size, and 1 if they are estimates, else 0
+    """
+    cached = (cache or get_stats_cache()).lookup(path, st)
+    if cached is not None:
+        return cached["lines"], cached["chars"], cached["tokens"], 0
+    if not st.st_size:
+        return 0, 0, 0, 0
+    return (
+        max(1, st.st_size // ESTIMATED_LINE_BYTES),
+        st.st_size,
+        max(1, st.st_size // ESTIMATED_TOKEN_BYTES),
+        1,
+    )
+
+
+class DirStats:
+    """
+    Aggregated totals of the files anywhere below a directory.
+
+    Lines, characters and tokens are summed over text files, taken from
+    the statistics cache where possible and estimated from sizes otherwise;
+    ``estimated`` counts the text files whose figures are estimates.
+    """
+
+    TOTALS = (
+        "files",
+        "text_files",
+        "bytes",
+        "text_bytes",
+        "lines",
+        "chars",
+        "tokens",
+        "estimated",
+    )
+
+    __slots__ = TOTALS + ("pending",)
+
+    def __init__(self) -> None:
+        self.files = 0
+        self.text_files = 0
+        self.bytes = 0
+        self.text_bytes = 0
+        self.lines = 0
+        self.chars = 0
+        self.tokens = 0
+        self.estimated = 0
+        # The directory's own listing plus its subdirectories not yet complete
+        self.pending = 1
+
+    @property
+    def complete(self) -> bool:
+        """Whether every directory below has been scanned."""
+        return self.pending == 0
+
+    def totals(self) -> _Totals:
+        """Get the totals as a tuple in the order of ``TOTALS``."""
+        return tuple(getattr(self, name) for name in self.TOTALS)
+
+    def _add(self, totals: _Totals, sign: int) -> None:
+        for name, value in zip(self.TOTALS, totals):
+            setattr(self, name, getattr(self, name) + sign * value)
+
+
+class DirectoryIndex:
+    """
+    Aggregates file statistics per directory, scanned progressively in the background.
+
+    ``scan`` lists one directory at a time, depth first, and adds each
+    directory's own files to it and all its ancestors, so partial totals are
+    available while the scan runs. ``prioritize`` moves the unscanned part of
+    a subtree to the front; prioritizing another directory drops the
+    previous request, whose directories are then scanned in normal order.
+    A cancelled scan resumes where it stopped on the next call.
+
+    Only the thread running ``scan`` changes the index; other threads may
+    read aggregates at any time and call ``prioritize`` and ``rescan``.
+    """
+
+    def __init__(self, root: str, ignore: Optional[IgnoreEngine] = None) -> None:
+        """
+        Initialize an empty index.
+
+        Args:
+            root: Directory to index
+            ignore: Optional engine applying .gitignore-style rules
+        """
+        self.root = os.path.realpath(root)
+        self.ignore = ignore
+        self._stats: Dict[str, DirStats] = {self.root: DirStats()}
+        self._own: Dict[str, _Totals] = {}
+        self._subdirs: Dict[str, List[str]] = {}
+        self._stack: List[str] = [self.root]
+        self._focus: List[str] = []
+        self._rescans: Set[str] = set()
+        self._lock = threading.Lock()
+        self._dirty: Set[str] = set()
+
+    def get(self, dir_path: str) -> Optional[DirStats]:
+        """Get the aggregates of a directory, or None if it has not been discovered yet."""
+        return self._stats.get(dir_path)
+
+    @property
+    def complete(self) -> bool:
+        """Whether the whole tree has been scanned."""
+        return self._stats[self.root].complete and not self._rescans
+
+    def prioritize(self, dir_path: str) -> None:
+        """Scan the unscanned part of a directory's subtree next, replacing earlier requests."""
+        with self._lock:
+            self._focus = [dir_path]
+
+    def rescan(self, dir_paths: Iterable[str]) -> None:
+        """Request directories to be listed again, e.g. after their entries changed."""
+        with self._lock:
+            self._rescans.update(dir_paths)
+
+    def scan(self, cancel: threading.Event, on_update: Optional[DirUpdateCallback] = None) -> bool:
+        """
+        Scan directories until the tree is complete or the scan is cancelled.
+
+        Args:
+            cancel: Event that stops the scan when set
+            on_update: Optional callback receiving the directories whose
+                aggregates changed, at most every ``UPDATE_INTERVAL`` seconds
+
+        Returns:
+            True if the whole tree has been scanned
+        """
+        last_update = time.monotonic()
+        while not cancel.is_set():
+            with self._lock:
+                rescans, self._rescans = self._rescans, set()
+            for dir_path in rescans:
+                self._rescan_dir(dir_path, cancel)
+
+            dir_path = self._next_dir()
+            if dir_path is None:
+                if not self._rescans:
+                    break
+                continue
+            listing = self._list_dir(dir_path, cancel)
+            if listing is None:
+                # Cancelled half-way; list the directory again next time
+                self._stack.append(dir_path)
+                break
+            self._record(dir_path, *listing)
+
+            now = time.monotonic()
+            if on_update is not None and now - last_update >= UPDATE_INTERVAL:
+                last_update = now
+                self._flush(on_update)
+
+        if on_update is not None:
+            self._flush(on_update)
+        return self.complete
+
+    def _flush(self, on_update: DirUpdateCallback) -> None:
+        """Report the directories changed since the last report."""
+        if self._dirty:
+            dirty, self._dirty = self._dirty, set()
+            on_update(dirty)
+
+    def _next_dir(self) -> Optional[str]:
+        """Pick the next unscanned directory, preferring the prioritized subtree."""
+        with self._lock:
+            focus = self._focus
+            while focus:
+                dir_path = focus.pop()
+                if dir_path not in self._stats:
+                    continue
+                if dir_path not in self._own:
+                    return dir_path
+                focus.extend(
+                    sub_dir
+                    for sub_dir in self._subdirs.get(dir_path, ())
+                    if sub_dir in self._stats and not self._stats[sub_dir].complete
+                )
+
+        while self._stack:
+            dir_path = self._stack.pop()
+            if dir_path in self._stats and dir_path not in self._own:
+                return dir_path
+        return None
+
+    def _list_dir(
+        self, dir_path: str, cancel: threading.Event
+    ) -> Optional[Tuple[_Totals, List[str]]]:
+        """
+        Count a directory's own files and find its subdirectories.
+
+        Returns:
+            The totals and subdirectories, or None if cancelled; an unreadable
+            directory counts as empty
+        """
+        cache = get_stats_cache()
+        files = text_files = size = text_size = lines = chars = tokens = estimated = 0
+        subdirs: List[str] = []
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if cancel.is_set():
+                        return None
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name in PRUNED_DIR_NAMES:
+                                continue
+                            if self.ignore is None or not self.ignore.is_ignored(entry.path, True):
+                                subdirs.append(entry.path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                        if self.ignore is not None and self.ignore.is_ignored(entry.path, False):
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+
+                    files += 1
+                    size += st.st_size
+                    if is_text_file(entry.path, st):
+                        text_files += 1
+                        text_size += st.st_size
+                        counts = text_file_counts(entry.path, st, cache)
+                        lines += counts[0]
+                        chars += counts[1]
+                        tokens += counts[2]
+                        estimated += counts[3]
+        except OSError as e:
+            logger.debug(f"Cannot index {dir_path}: {e}")
+
+        subdirs.sort(reverse=True)
+        return (files, text_files, size, text_size, lines, chars, tokens, estimated), subdirs
+
+    def _record(self, dir_path: str, totals: _Totals, subdirs: List[str]) -> None:
+        """Add a freshly listed directory to the index."""
+        if dir_path not in self._stats:
+            # Dropped by a rescan while it was being listed
+            return
+        self._own[dir_path] = totals
+        self._subdirs[dir_path] = subdirs
+        for sub_dir in subdirs:
+            self._stats[sub_dir] = DirStats()
+        self._stack.extend(subdirs)
+
+        self._propagate(dir_path, totals, 1)
+        stats = self._stats[dir_path]
+        stats.pending += len(subdirs) - 1
+        if stats.complete:
+            self._finish(dir_path)
+
+    def _propagate(self, dir_path: str, totals: _Totals, sign: int) -> None:
+        """Add totals to a directory and all its ancestors."""
+        while True:
+            stats = self._stats.get(dir_path)
+            if stats is not None:
+                stats._add(totals, sign)
+                self._dirty.add(dir_path)
+            if dir_path == self.root:
+                return
+            parent = os.path.dirname(dir_path)
+            if parent == dir_path:
+                return
+            dir_path = parent
+
+    def _finish(self, dir_path: str) -> None:
+        """Propagate the completion of a directory to the ancestors it completes."""
+        self._dirty.add(dir_path)
+        while dir_path != self.root:
+            dir_path = os.path.dirname(dir_path)
+            stats = self._stats.get(dir_path)
+            if stats is None:
+                return
+            stats.pending -= 1
+            self._dirty.add(dir_path)
+            if not stats.complete:
+                return
+
+    def _reopen(self, dir_path: str) -> None:
+        """Mark a directory as incomplete again, along with the ancestors it completed."""
+        while True:
+            stats = self._stats[dir_path]
+            stats.pending += 1
+            self._dirty.add(dir_path)
+            if stats.pending > 1 or dir_path == self.root:
+                return
+            dir_path = os.path.dirname(dir_path)
+
+    def _rescan_dir(self, dir_path: str, cancel: threading.Event) -> None:
+        """List an already scanned directory again and apply the differences."""
+        if dir_path not in self._own:
+            # Not scanned yet; it will be listed in full when reached
+            return
+        listing = self._list_dir(dir_path, cancel)
+        if listing is None:
+            with self._lock:
+                self._rescans.add(dir_path)
+            return
+        totals, subdirs = listing
+
+        old = self._own[dir_path]
+        self._own[dir_path] = totals
+        self._propagate(dir_path, tuple(new - was for new, was in zip(totals, old)), 1)
+
+        old_subdirs = set(self._subdirs[dir_path])
+        self._subdirs[dir_path] = subdirs
+        for removed in old_subdirs.difference(subdirs):
+            self._drop(removed)
+        for added in sorted(set(subdirs) - old_subdirs, reverse=True):
+            self._stats[added] = DirStats()
+            self._reopen(dir_path)
+            self._stack.append(added)
+
+    def _drop(self, dir_path: str) -> None:
+        """Remove a deleted directory and everything below it from the index."""
+        stats = self._stats.get(dir_path)
+        if stats is None:
+            return
+        parent = os.path.dirname(dir_path)
+        self._propagate(parent, stats.totals(), -1)
+        if not stats.complete:
+            # Count the directory as finished for its parent
+            stats.pending = 0
+            self._finish(dir_path)
+
+        prefix = dir_path + os.sep
+        for cached in (self._stats, self._own, self._subdirs):
+            cached.pop(dir_path, None)
+            for key in [k for k in cached if k.startswith(prefix)]:
+                del cached[key]
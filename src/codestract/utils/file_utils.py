@@ -2,21 +2,15 @@
 Utility functions for file filtering operations.
 """
 
+import codecs
 import os
+from typing import Dict, Optional, Tuple
 
+from . import perf
 
-def is_text_file(file_path: str) -> bool:
-    """
-    Check if a file is a text file.
-
-    Args:
-        file_path (str): Path to the file to check
-
-    Returns:
-        bool: True if the file is a text file, False otherwise
-    """
-    # Common binary file extensions to ignore
-    BINARY_EXTENSIONS = {
+# Common binary file extensions to ignore
+BINARY_EXTENSIONS = frozenset(
+    {
         ".gif",
         ".jpg",
         ".jpeg",
@@ -38,18 +32,124 @@ def is_text_file(file_path: str) -> bool:
         ".bin",
         ".dat",
     }
-    # Git-specific files to ignore
-    GIT_FILES = {".git/index", ".git/HEAD", ".git/COMMIT_EDITMSG"}
+)
 
-    ext = os.path.splitext(file_path)[1].lower()
-    base = os.path.basename(file_path)
+# Git-specific files to ignore
+GIT_FILES = tuple(os.path.join(".git", name) for name in ("index", "HEAD", "COMMIT_EDITMSG"))
+
+# Leading bytes of common binary formats; formats with ASCII-only magic numbers
+# are left to the NUL byte check to avoid misclassifying text files
+BINARY_SIGNATURES = (
+    b"\x89PNG\r\n\x1a\n",  # PNG
+    b"GIF87a",  # GIF
+    b"GIF89a",  # GIF
+    b"\xff\xd8\xff",  # JPEG
+    b"%PDF-",  # PDF
+    b"PK\x03\x04",  # ZIP, JAR, wheel, Office documents
+    b"\x1f\x8b",  # gzip
+    b"\xfd7zXZ\x00",  # xz
+    b"7z\xbc\xaf\x27\x1c",  # 7-Zip
+    b"Rar!\x1a\x07",  # RAR
+    b"\x7fELF",  # ELF executables and shared objects
+    b"\xcf\xfa\xed\xfe",  # Mach-O 64-bit
+    b"\xce\xfa\xed\xfe",  # Mach-O 32-bit
+    b"\xca\xfe\xba\xbe",  # Mach-O universal binary, Java class
+    b"SQLite format 3\x00",  # SQLite database
+    b"\x00asm",  # WebAssembly
+    b"OggS",  # Ogg
+    b"wOFF",  # WOFF font
+    b"wOF2",  # WOFF2 font
+)
+
+# Number of leading bytes sniffed to classify a file
+SNIFF_SIZE = 1024
 
-    if ext in BINARY_EXTENSIONS or base in GIT_FILES:
+# Files with a larger share of control bytes than this are considered binary
+MAX_CONTROL_RATIO = 0.3
+
+# Control bytes that do not occur in text, used to strip everything else
+_CONTROL_BYTES = bytes(b for b in range(32) if b not in b"\t\n\r\f\b\x1b") + b"\x7f"
+_TEXT_BYTES = bytes(b for b in range(256) if b not in _CONTROL_BYTES)
+
+# Verdicts keyed by path, valid while (inode, mtime_ns) are unchanged
+_verdicts: Dict[str, Tuple[int, int, bool]] = {}
+
+
+def is_text_data(sample: bytes) -> bool:
+    """
+    Check whether a leading sample of file contents looks like text.
+
+    Text must be UTF-8, the encoding exports are written in; a multi-byte
+    sequence cut off at the end of the sample is allowed.
+
+    Args:
+        sample (bytes): The first bytes of a file
+
+    Returns:
+        bool: True if the sample looks like text, False otherwise
+    """
+    if not sample:
+        return True
+    if b"\x00" in sample or sample.startswith(BINARY_SIGNATURES):
         return False
 
+    # Delete every text byte; whatever remains are control bytes
+    control = len(sample.translate(None, _TEXT_BYTES))
+    if control / len(sample) > MAX_CONTROL_RATIO:
+        return False
+    if sample.isascii():
+        return True
     try:
-        with open(file_path, "tr") as f:
-            f.read(1024)  # Try reading first 1KB
-            return True
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
     except UnicodeDecodeError:
         return False
+    return True
+
+
+def has_binary_name(file_path: str) -> bool:
+    """Check whether a file's extension or name marks it as binary without reading it."""
+    ext = os.path.splitext(file_path)[1].lower()
+    return ext in BINARY_EXTENSIONS or file_path.endswith(GIT_FILES)
+
+
+def is_text_file(file_path: str, st: Optional[os.stat_result] = None) -> bool:
+    """
+    Check if a file is a text file.
+
+    Files are first filtered by extension and then classified by sniffing
+    their leading bytes. Verdicts are cached, so each file is read at most
+    once until its inode or modification time changes.
+
+    Args:
+        file_path (str): Path to the file to check
+        st (os.stat_result, optional): Stat result of the file, if already known
+
+    Returns:
+        bool: True if the file is a text file, False otherwise
+    """
+    if has_binary_name(file_path):
+        return False
+
+    try:
+        if st is None:
+            st = os.stat(file_path)
+        cached = _verdicts.get(file_path)
+        if cached is not None and cached[:2] == (st.st_ino, st.st_mtime_ns):
+            return cached[2]
+
+        perf.count("classify.cache_misses")
+        with perf.span("classify.sniff"), open(file_path, "rb") as f:
+            sample = f.read(SNIFF_SIZE)
+            verdict = is_text_data(sample)
+        perf.count("files_opened")
+        perf.count("bytes_read", len(sample))
+    except OSError:
+        return False
+
+    _verdicts[file_path] = (st.st_ino, st.st_mtime_ns, verdict)
+    return verdict
+
+
+def forget_text_file(file_path: str) -> None:
+    """Drop the cached classification of a file."""
+    _verdicts.pop(file_path, None)
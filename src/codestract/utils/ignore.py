@@ -0,0 +1,236 @@
+"""
+Ignore engine applying .gitignore-style rules to paths below a project root.
+"""
+
+import logging
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+from .constants import PRUNED_DIR_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Files whose patterns are honored in every directory, lowest precedence first
+IGNORE_FILE_NAMES = (".gitignore", ".ignore", ".codestractignore")
+
+# Rules applied at the root before any ignore file
+DEFAULT_IGNORE_PATTERNS = tuple(f"{name}/" for name in sorted(PRUNED_DIR_NAMES))
+
+
+def _translate_glob(glob: str) -> str:
+    """Translate the body of a gitignore pattern into a regular expression."""
+    regex: List[str] = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if c == "*":
+            if glob.startswith("**", i):
+                at_start = i == 0 or glob[i - 1] == "/"
+                if at_start and glob.startswith("**/", i):
+                    regex.append("(?:.*/)?")
+                    i += 3
+                    continue
+                if at_start and i + 2 == n:
+                    regex.append(".*")
+                    i += 2
+                    continue
+                i += 1
+            regex.append("[^/]*")
+        elif c == "?":
+            regex.append("[^/]")
+        elif c == "[":
+            end = glob.find("]", i + 2)
+            if end == -1:
+                regex.append(re.escape(c))
+            else:
+                body = glob[i + 1 : end].replace("\\", "\\\\")
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                regex.append(f"[{body}]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            regex.append(re.escape(glob[i]))
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    return "".join(regex)
+
+
+def parse_pattern(line: str) -> Optional[Tuple[str, bool, bool]]:
+    """
+    Parse one line of an ignore file.
+
+    Args:
+        line: Raw line, without its newline
+
+    Returns:
+        Tuple of (regex, negated, directory-only), or None for blanks and comments
+    """
+    # Trailing spaces are ignored unless escaped
+    line = re.sub(r"(?<!\\) +$", "", line)
+    if not line or line.startswith("#"):
+        return None
+
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # Patterns with a slash anywhere but the end are relative to the ignore file
+    anchored = "/" in line
+    regex = _translate_glob(line.lstrip("/"))
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return regex, negated, dir_only
+
+
+class RuleSet:
+    """The compiled patterns of one ignore file (or of the built-in defaults)."""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        parsed = [rule for rule in map(parse_pattern, patterns) if rule is not None]
+        self.negated = [negated for _, negated, _ in parsed]
+        self.dir_only = [dir_only for _, _, dir_only in parsed]
+        # Alternatives are tried in order, so list the last pattern first:
+        # the first alternative that matches is the one gitignore says wins.
+        indexed = list(enumerate(parsed))[::-1]
+        self._any_re = self._compile((i, regex) for i, (regex, _, _) in indexed)
+        self._file_re = self._compile(
+            (i, regex) for i, (regex, _, dir_only) in indexed if not dir_only
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.negated)
+
+    @staticmethod
+    def _compile(alternatives: Iterable[Tuple[int, str]]) -> Optional[Pattern[str]]:
+        """Combine patterns into one regex whose last group names the winner."""
+        body = "|".join(f"(?P<p{i}>{regex})" for i, regex in alternatives)
+        return re.compile(body) if body else None
+
+    def match(self, rel_path: str, path: str, is_dir: Optional[bool]) -> Optional[bool]:
+        """
+        Decide whether a path is ignored by this rule set.
+
+        Args:
+            rel_path: Path relative to the ignore file's directory, "/"-separated
+            path: Absolute path, only stat'ed if a directory-only rule decides
+            is_dir: Whether the path is a directory, if known
+
+        Returns:
+            True if ignored, False if re-included, None if no rule matches
+        """
+        match = self._any_re.fullmatch(rel_path) if self._any_re else None
+        if match is None:
+            return None
+        index = int(match.lastgroup[1:])
+        if self.dir_only[index]:
+            if is_dir is None:
+                is_dir = os.path.isdir(path)
+            if not is_dir:
+                match = self._file_re.fullmatch(rel_path) if self._file_re else None
+                if match is None:
+                    return None
+                index = int(match.lastgroup[1:])
+        return not self.negated[index]
+
+
+def load_rule_set(dir_path: str, file_names: Iterable[str] = IGNORE_FILE_NAMES) -> RuleSet:
+    """Load and compile the ignore files present in a directory."""
+    patterns: List[str] = []
+    for name in file_names:
+        try:
+            with open(os.path.join(dir_path, name), "r", encoding="utf-8") as f:
+                patterns.extend(f.read().splitlines())
+        except FileNotFoundError:
+            continue
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"Ignoring unreadable ignore file in {dir_path}: {e}")
+    return RuleSet(patterns)
+
+
+class IgnoreEngine:
+    """
+    Decides which paths below a root are ignored.
+
+    Ignore files are loaded lazily the first time a directory is consulted.
+    Rules in deeper directories take precedence over shallower ones and,
+    within one directory, later patterns win, as in git. Callers are expected
+    to walk top-down and skip ignored directories, so a path's ancestors are
+    not re-checked; use ``is_path_ignored`` for arbitrary paths.
+    """
+
+    def __init__(self, root: str, default_patterns: Iterable[str] = DEFAULT_IGNORE_PATTERNS):
+        """Initialize the engine for a project root."""
+        self.root = os.path.realpath(root)
+        self._defaults = RuleSet(default_patterns)
+        self._chains: Dict[str, List[Tuple[str, RuleSet]]] = {}
+
+    def _chain(self, dir_path: str) -> List[Tuple[str, RuleSet]]:
+        """Get the rule sets applying inside a directory, deepest first."""
+        chain = self._chains.get(dir_path)
+        if chain is not None:
+            return chain
+
+        if dir_path == self.root:
+            root_rules = load_rule_set(dir_path)
+            exclude_rules = load_rule_set(os.path.join(dir_path, ".git", "info"), ("exclude",))
+            chain = [(dir_path, rules) for rules in (root_rules, exclude_rules) if rules]
+            if self._defaults:
+                chain.append((dir_path, self._defaults))
+        else:
+            parent = os.path.dirname(dir_path)
+            if parent == dir_path or not dir_path.startswith(self.root):
+                chain = []
+            else:
+                rules = load_rule_set(dir_path)
+                chain = ([(dir_path, rules)] if rules else []) + self._chain(parent)
+
+        self._chains[dir_path] = chain
+        return chain
+
+    def is_ignored(self, path: str, is_dir: Optional[bool] = None) -> bool:
+        """
+        Check whether a path is ignored by the rules of its ancestor directories.
+
+        Args:
+            path: Absolute path below the root
+            is_dir: Whether the path is a directory, looked up only if it matters
+
+        Returns:
+            True if the path is ignored
+        """
+        for base, rules in self._chain(os.path.dirname(path)):
+            rel_path = path[len(base) + 1 :]
+            if os.sep != "/":
+                rel_path = rel_path.replace(os.sep, "/")
+            verdict = rules.match(rel_path, path, is_dir)
+            if verdict is not None:
+                return verdict
+        return False
+
+    def is_path_ignored(self, path: str) -> bool:
+        """Check whether a path or any directory between it and the root is ignored."""
+        if not path.startswith(self.root + os.sep):
+            return False
+        rel_parts = path[len(self.root) + 1 :].split(os.sep)
+        current = self.root
+        for part in rel_parts[:-1]:
+            current = os.path.join(current, part)
+            if self.is_ignored(current, True):
+                return True
+        return self.is_ignored(path)
+
+    def invalidate(self, dir_path: Optional[str] = None) -> None:
+        """Forget loaded rules, e.g. after an ignore file changed."""
+        if dir_path is None:
+            self._chains.clear()
+            return
+        prefix = dir_path + os.sep
+        for key in [k for k in self._chains if k == dir_path or k.startswith(prefix)]:
+            del self._chains[key]
@@ -1,47 +1,139 @@
 """
 Logging configuration for the application.
+
+Records are handed to a queue by the threads that log them and written by a
+single background thread, so logging never blocks the UI, export or preview
+threads on file I/O. The log lives in the project's state directory and is
+rotated by size. Levels can be set per subsystem, the module path below the
+``codestract`` package, e.g. ``exporter`` or ``utils.watcher``; loggers of
+disabled levels drop records before they are formatted or queued.
+
+Nothing in this module may import Textual or Rich.
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+from typing import Dict, Optional
+
+from .constants import STATE_DIR_NAME
+
+LOG_DIR_NAME = "logs"
+LOG_FILE_NAME = "codestract.log"
+
+# Size at which the log is rotated, and number of rotated logs kept
+MAX_LOG_BYTES = 1024 * 1024
+BACKUP_COUNT = 3
+
+# Logger every module logs below, as ``logging.getLogger(__name__)``
+PACKAGE_LOGGER = "codestract"
+
+DEFAULT_LEVEL = logging.INFO
+
+_LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def log_path(root: str) -> str:
+    """Get the path of the log of the project at ``root``."""
+    return os.path.join(os.path.realpath(root), STATE_DIR_NAME, LOG_DIR_NAME, LOG_FILE_NAME)
+
 
+def _parse_level(name: str) -> int:
+    """Get the numeric value of a level name such as ``debug``."""
+    level = logging.getLevelName(name.strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"unknown log level: {name.strip()}")
+    return level
 
-def setup_logging() -> None:
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """
+    Parse log levels given as ``LEVEL`` and ``SUBSYSTEM=LEVEL`` items separated by commas.
+
+    Args:
+        spec: Levels such as ``"warning,exporter=debug,utils.watcher=info"``; an item
+            without a subsystem sets the level of the whole package
+
+    Returns:
+        Levels by logger name
+
+    Raises:
+        ValueError: If an item names an unknown level
+    """
+    levels: Dict[str, int] = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        subsystem, _, level = item.rpartition("=")
+        subsystem = subsystem.strip()
+        name = f"{PACKAGE_LOGGER}.{subsystem}" if subsystem else PACKAGE_LOGGER
+        levels[name] = _parse_level(level)
+    return levels
+
+
+def _file_handler(log_file: str) -> logging.Handler:
+    """Create the rotating handler writing the log, or a null handler if it cannot."""
+    try:
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        handler: logging.Handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=MAX_LOG_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+        )
+    except OSError:
+        return logging.NullHandler()
+    handler.setFormatter(logging.Formatter(_LOG_FORMAT, _DATE_FORMAT))
+    return handler
+
+
+def setup_logging(root: Optional[str] = None, levels: Optional[Dict[str, int]] = None) -> None:
     """
     Configure logging for the application.
 
-    Sets up logging to both console and a file in the current directory.
-    The log file is named with a timestamp for each session.
+    Replaces the handlers of the root logger with a queue drained by a
+    background thread into a rotating log in the project's state directory.
+    Nothing is written to the console, which belongs to the interface.
+    Calling this again reconfigures logging.
+
+    Args:
+        root: Project whose state directory holds the log, the working directory if not given
+        levels: Levels by logger name, from ``parse_levels``; the package logs at
+            ``DEFAULT_LEVEL`` unless given
     """
-    # Create .codestract directory if it doesn't exist
-    output_dir = "."
-    os.makedirs(output_dir, exist_ok=True)
+    shutdown_logging()
+    log_file = log_path(root or os.getcwd())
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.handlers.clear()
+    root_logger.addHandler(logging.handlers.QueueHandler(records))
+    # Other libraries only log warnings
+    root_logger.setLevel(logging.WARNING)
 
-    # Create a timestamped log file name
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = os.path.join(output_dir, f"codestract_{timestamp}.log")
+    levels = dict(levels or {})
+    levels.setdefault(PACKAGE_LOGGER, DEFAULT_LEVEL)
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
 
-    # Configure logging format
-    log_format = "%(asctime)s - %(levelname)s - %(message)s"
-    date_format = "%Y-%m-%d %H:%M:%S"
+    global _listener
+    _listener = logging.handlers.QueueListener(records, _file_handler(log_file))
+    _listener.start()
 
-    # Set up root logger
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
+    logging.getLogger(__name__).info(f"Logging initialized, writing to {log_file}")
 
-    # Clear any existing handlers
-    logger.handlers.clear()
 
-    # Create and configure file handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(logging.Formatter(log_format, date_format))
-    logger.addHandler(file_handler)
+def shutdown_logging() -> None:
+    """Write the queued records and stop the background writer, if running."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
 
-    # Create and configure console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter(log_format, date_format))
-    logger.addHandler(console_handler)
 
-    # Log initial message
-    logging.info("Logging initialized")
+atexit.register(shutdown_logging)
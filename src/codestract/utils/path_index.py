@@ -0,0 +1,336 @@
+"""
+Trigram index over project paths for the interactive path finder.
+"""
+
+import heapq
+import os
+import re
+from array import array
+from bisect import bisect_right
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Pattern, Set, Tuple
+
+# Results returned by a search unless a different limit is requested
+DEFAULT_LIMIT = 200
+
+# Previous fuzzy matches are rescanned one by one below this many, otherwise
+# the whole index is scanned as a single string
+POOL_SCAN_LIMIT = 20_000
+
+# Intersecting stops once the candidates are this many times fewer than the
+# entries of the next posting list; the survivors are checked one by one anyway
+INTERSECT_RATIO = 8
+
+# Picking n of m candidates out of all N paths in rank order visits about
+# n * N / m paths, while sorting the candidates costs about m * log(m); sets
+# with m * m below this factor times n * N are sorted
+RANK_SORT_FACTOR = 4
+
+
+def _trigrams(text: str) -> set:
+    """Get the distinct trigrams of a string."""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def compile_fuzzy(term: str) -> Pattern[str]:
+    """
+    Compile a pattern matching a term as a subsequence within one line.
+
+    Each gap excludes the character that ends it, so the pattern takes the
+    first occurrence of every character and never backtracks into a gap.
+    """
+    body = [re.escape(term[0])]
+    for char in term[1:]:
+        char = re.escape(char)
+        body.append(f"[^\\n{char}]*{char}")
+    return re.compile("".join(body))
+
+
+class PathIndex:
+    """
+    Index of file paths below a root for ranked substring search.
+
+    Every lowercased relative path is split into trigrams, each mapping to
+    the ids of the paths containing it, and so is every file name. A query
+    term of three or more characters is answered by intersecting the posting
+    lists of its trigrams, smallest first. Shorter terms use an index of file
+    name prefixes. Paths are also ranked once by length and then
+    alphabetically, so the best of a large candidate set can be picked
+    without scoring all of it, and lookups take milliseconds even for
+    hundreds of thousands of paths.
+    """
+
+    def __init__(self, root: str, paths: Iterable[str] = ()) -> None:
+        """Create an index of absolute paths below a root."""
+        self.root = os.path.realpath(root)
+        self.paths: List[str] = []
+        self._lower: List[str] = []
+        self._name_start: List[int] = []
+        self._postings: Dict[str, array] = {}
+        self._name_postings: Dict[str, array] = {}
+        self._prefixes: Dict[str, array] = {}
+        self._joined: Optional[Tuple[str, array]] = None
+        # Rank of every path by (length, path), and the ids in that order
+        self._order: Optional[Tuple[array, array]] = None
+        for path in paths:
+            self.add(path)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def relative(self, path_id: int) -> str:
+        """Get the root-relative path of an entry."""
+        return self._relative(self.paths[path_id])
+
+    def _relative(self, path: str) -> str:
+        prefix = self.root + os.sep
+        return path[len(prefix) :] if path.startswith(prefix) else path
+
+    def add(self, path: str) -> int:
+        """
+        Add an absolute path to the index.
+
+        Returns:
+            Id of the new entry
+        """
+        path_id = len(self.paths)
+        lower = self._relative(path).replace(os.sep, "/").lower()
+        name_start = lower.rfind("/") + 1
+
+        self.paths.append(path)
+        self._lower.append(lower)
+        self._name_start.append(name_start)
+        self._joined = None
+        self._order = None
+
+        name = lower[name_start:]
+        for index, text in ((self._postings, lower), (self._name_postings, name)):
+            for gram in _trigrams(text):
+                postings = index.get(gram)
+                if postings is None:
+                    postings = index[gram] = array("I")
+                postings.append(path_id)
+
+        for length in (1, 2, 3):
+            if len(name) >= length:
+                prefixes = self._prefixes.get(name[:length])
+                if prefixes is None:
+                    prefixes = self._prefixes[name[:length]] = array("I")
+                prefixes.append(path_id)
+        return path_id
+
+    def prepare(self) -> None:
+        """Build the lookup structures that are otherwise built by the first search."""
+        self._static_order()
+        self._joined_text()
+
+    def _static_order(self) -> Tuple[array, array]:
+        """Get the rank of every path by length and then path, and the ids in rank order."""
+        if self._order is None:
+            lower = self._lower
+            by_rank = sorted(range(len(lower)), key=lower.__getitem__)
+            by_rank.sort(key=lambda path_id: len(lower[path_id]))
+            ranks = array("I", bytes(4 * len(lower)))
+            for rank, path_id in enumerate(by_rank):
+                ranks[path_id] = rank
+            self._order = (ranks, array("I", by_rank))
+        return self._order
+
+    def _joined_text(self) -> Tuple[str, array]:
+        """Get every lowercased path on its own line, and the offset of each line."""
+        if self._joined is None:
+            starts = array("I")
+            position = 0
+            for lower in self._lower:
+                starts.append(position)
+                position += len(lower) + 1
+            self._joined = ("\n".join(self._lower), starts)
+        return self._joined
+
+    @staticmethod
+    def _intersect(index: Dict[str, array], term: str) -> Set[int]:
+        """Get the ids that may be listed under every trigram of a term, smallest list first."""
+        posting_lists = []
+        for gram in _trigrams(term):
+            postings = index.get(gram)
+            if postings is None:
+                return set()
+            posting_lists.append(postings)
+        posting_lists.sort(key=len)
+        candidates = set(posting_lists[0])
+        for postings in posting_lists[1:]:
+            # Checking a few candidates later is cheaper than reading a long list
+            if len(candidates) * INTERSECT_RATIO < len(postings):
+                break
+            candidates.intersection_update(postings)
+            if not candidates:
+                break
+        return candidates
+
+    def in_rank_order(self, path_ids: Set[int], wanted: int) -> Iterator[int]:
+        """
+        Iterate over paths from the shortest, then alphabetically.
+
+        A small set is sorted; a large one is picked out of every path in
+        rank order, so taking the first ``wanted`` costs little either way.
+        """
+        ranks, by_rank = self._static_order()
+        if len(path_ids) * len(path_ids) < RANK_SORT_FACTOR * wanted * len(by_rank):
+            return iter(sorted(path_ids, key=ranks.__getitem__))
+        return (path_id for path_id in by_rank if path_id in path_ids)
+
+    def best_substring_matches(self, terms: List[str], limit: int) -> List[int]:
+        """
+        Find the best paths containing every term.
+
+        The longest term ranks the matches: paths whose file name starts with
+        it come first, then paths whose file name contains it, then the rest,
+        each group shortest first and then alphabetically. Each group is
+        drawn in rank order from a candidate set, built only if the earlier
+        groups fall short, and checked one by one until ``limit`` paths are
+        found, so the cost follows the number of results rather than the
+        number of candidates.
+
+        Args:
+            terms: Lowercase terms, all of which must occur in a path
+            limit: Most paths to return
+
+        Returns:
+            Ids of matching paths, best first
+        """
+        anchor = max(terms, key=len)
+        pools: List[Callable[[], Set[int]]] = [lambda: set(self._prefixes.get(anchor[:3], ()))]
+        if len(anchor) >= 3:
+            pools.append(lambda: self._intersect(self._name_postings, anchor))
+            pools.append(lambda: self._intersect(self._postings, anchor))
+
+        lower_paths = self._lower
+        name_starts = self._name_start
+
+        def group(path_id: int) -> Optional[int]:
+            lower = lower_paths[path_id]
+            for term in terms:
+                if term not in lower:
+                    return None
+            name_start = name_starts[path_id]
+            if lower.startswith(anchor, name_start):
+                return 0
+            return 1 if lower.find(anchor, name_start) >= 0 else 2
+
+        found: List[int] = []
+        for number, pool in enumerate(pools):
+            # A candidate belonging to a later group is taken from that group's pool
+            for path_id in self.in_rank_order(pool(), limit - len(found)):
+                if group(path_id) == number:
+                    found.append(path_id)
+                    if len(found) == limit:
+                        return found
+        return found
+
+    def fuzzy_spans(
+        self, pattern: Pattern[str], pool: Optional[Iterable[int]] = None
+    ) -> Dict[int, int]:
+        """
+        Find the paths matching a pattern from ``compile_fuzzy``.
+
+        Args:
+            pattern: Compiled subsequence pattern
+            pool: Ids to check one by one; scans every path at once if None
+
+        Returns:
+            Mapping of matching path ids to the length of their matched span
+        """
+        if pool is not None:
+            spans = {}
+            for path_id in pool:
+                match = pattern.search(self._lower[path_id])
+                if match is not None:
+                    spans[path_id] = match.end() - match.start()
+            return spans
+
+        text, starts = self._joined_text()
+
+        spans = {}
+        for match in pattern.finditer(text):
+            path_id = bisect_right(starts, match.start()) - 1
+            if path_id not in spans:
+                spans[path_id] = match.end() - match.start()
+        return spans
+
+    def tightest(self, spans: Dict[int, int], limit: int) -> List[int]:
+        """
+        Pick the fuzzy matches with the shortest spans, then the best ranked paths.
+
+        Args:
+            spans: Mapping of path ids to matched span lengths, from ``fuzzy_spans``
+            limit: Most paths to return
+
+        Returns:
+            Ids of the best matches, best first
+        """
+        ranks = self._static_order()[0]
+        return heapq.nsmallest(limit, spans, key=lambda i: (spans[i] << 32) | ranks[i])
+
+
+class FuzzyFinder:
+    """
+    Incremental search session over a ``PathIndex``.
+
+    Whitespace-separated terms must all match. Paths containing every term
+    as a substring rank first, preferring matches in the file name; if they
+    do not fill the result list, paths containing every term as a
+    subsequence follow, tightest match first. The fuzzy pass is a scan, but
+    when a query extends the previous one only the previous fuzzy matches
+    are rescanned, so each keystroke narrows the work instead of repeating it.
+    """
+
+    def __init__(self, index: PathIndex, limit: int = DEFAULT_LIMIT) -> None:
+        self.index = index
+        self.limit = limit
+        self._last_query = ""
+        self._last_fuzzy: Optional[List[int]] = None
+
+    def search(self, query: str) -> List[int]:
+        """
+        Find the best matches for a query.
+
+        Args:
+            query: Text typed by the user
+
+        Returns:
+            Ids of matching paths, best first, at most ``limit`` of them
+        """
+        query = query.lower().strip()
+        terms = query.split()
+        if not terms:
+            self._last_query, self._last_fuzzy = "", None
+            return []
+
+        index = self.index
+        ranked = index.best_substring_matches(terms, self.limit)
+
+        if len(ranked) < self.limit:
+            pool = None
+            if self._last_fuzzy is not None and query.startswith(self._last_query):
+                if len(self._last_fuzzy) <= POOL_SCAN_LIMIT:
+                    pool = self._last_fuzzy
+
+            spans: Dict[int, int] = {}
+            for term in terms:
+                term_spans = index.fuzzy_spans(compile_fuzzy(term), pool)
+                if spans:
+                    spans = {i: spans[i] + span for i, span in term_spans.items() if i in spans}
+                else:
+                    spans = term_spans
+                pool = list(spans)
+                if not spans:
+                    break
+
+            self._last_fuzzy = list(spans)
+            for path_id in ranked:
+                spans.pop(path_id, None)
+            ranked.extend(index.tightest(spans, self.limit - len(ranked)))
+        else:
+            self._last_fuzzy = None
+        self._last_query = query
+
+        return ranked
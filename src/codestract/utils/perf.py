@@ -0,0 +1,208 @@
+"""
+Lightweight timing spans and counters for the hot paths.
+
+Recording is off by default. While it is off, ``count`` returns after a
+single global check and ``span`` returns a shared no-op context manager, so
+instrumented code pays about the cost of one function call. While it is
+on, spans are aggregated per name (count, total and maximum time) and
+counters are summed, so memory does not grow with the number of events.
+
+Nothing in this module may import Textual or Rich.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+PROFILE_VERSION = 1
+
+
+class _SpanStats:
+    """Aggregated timings of one span name."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Recorder:
+    """Collects span timings and counters from any thread."""
+
+    def __init__(self) -> None:
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self._spans: Dict[str, _SpanStats] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, elapsed: float) -> None:
+        """Record one timing of a span."""
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = _SpanStats()
+            stats.count += 1
+            stats.total += elapsed
+            if elapsed > stats.max:
+                stats.max = elapsed
+
+    def add_count(self, name: str, value: int) -> None:
+        """Add to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict[str, object]:
+        """Get the recorded spans and counters as a JSON-serializable profile."""
+        with self._lock:
+            spans = {
+                name: {
+                    "count": stats.count,
+                    "total": stats.total,
+                    "mean": stats.total / stats.count,
+                    "max": stats.max,
+                }
+                for name, stats in sorted(self._spans.items())
+            }
+            counters = dict(sorted(self._counters.items()))
+        return {
+            "version": PROFILE_VERSION,
+            "started": self.started.isoformat(),
+            "elapsed": time.perf_counter() - self._start,
+            "pid": os.getpid(),
+            "spans": spans,
+            "counters": counters,
+        }
+
+
+class _Span:
+    """Times the block it guards into the active recorder."""
+
+    __slots__ = ("recorder", "name", "start")
+
+    def __init__(self, recorder: Recorder, name: str) -> None:
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.recorder.add_span(self.name, time.perf_counter() - self.start)
+
+
+class _NoSpan:
+    """Context manager doing nothing, used while recording is off."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+_recorder: Optional[Recorder] = None
+
+
+def enable() -> Recorder:
+    """Start recording, keeping what was recorded so far if already recording."""
+    global _recorder
+    if _recorder is None:
+        _recorder = Recorder()
+    return _recorder
+
+
+def disable() -> None:
+    """Stop recording and drop everything recorded."""
+    global _recorder
+    _recorder = None
+
+
+def is_enabled() -> bool:
+    """Whether spans and counters are being recorded."""
+    return _recorder is not None
+
+
+def span(name: str):
+    """
+    Time a block under a name, e.g. ``with perf.span("export"): ...``.
+
+    Returns:
+        A context manager; a shared no-op one while recording is off
+    """
+    recorder = _recorder
+    if recorder is None:
+        return _NO_SPAN
+    return _Span(recorder, name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorate a function so every call is timed as a span under a name."""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _recorder
+            if recorder is None:
+                return func(*args, **kwargs)
+            with _Span(recorder, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add to a counter, e.g. ``perf.count("bytes_read", size)``."""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.add_count(name, value)
+
+
+def snapshot() -> Optional[Dict[str, object]]:
+    """Get the profile recorded so far, or None if recording is off."""
+    recorder = _recorder
+    return recorder.snapshot() if recorder is not None else None
+
+
+def default_profile_name() -> str:
+    """Get a timestamped file name for a profile dump."""
+    return f"codestract_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+
+def dump(profile_file: Optional[str] = None) -> Optional[str]:
+    """
+    Write the profile recorded so far as JSON.
+
+    Args:
+        profile_file: Path of the file to write, generated in the working
+            directory if not given
+
+    Returns:
+        The path written, or None if recording is off
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    profile = snapshot()
+    if profile is None:
+        return None
+    profile_file = profile_file or default_profile_name()
+    with open(profile_file, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+        f.write("\n")
+    return profile_file
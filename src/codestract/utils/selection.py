@@ -0,0 +1,372 @@
+"""
+Selection of files stored as include and exclude rules on a path trie.
+
+Nothing in this module may import Textual or Rich.
+"""
+
+import itertools
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .constants import PRUNED_DIR_NAMES
+from .file_utils import is_text_file
+from .ignore import IgnoreEngine
+
+# Totals measured for a file or directory, e.g. {"files": 1, "lines": 12, ...}
+Totals = Dict[str, int]
+
+# Returns the totals of everything below a directory, or of a single file
+MeasureCallback = Callable[[str], Totals]
+
+# Owners of trie nodes; a selection only changes the nodes it owns
+_owners = itertools.count()
+
+
+class _RuleNode:
+    """One path component of the selection trie."""
+
+    __slots__ = ("children", "rule", "is_dir", "owner")
+
+    def __init__(self, owner: int) -> None:
+        self.children: Dict[str, "_RuleNode"] = {}
+        self.rule: Optional[bool] = None  # True includes, False excludes, None inherits
+        self.is_dir = True
+        self.owner = owner  # The selection allowed to change this node in place
+
+
+class Selection:
+    """
+    Selected files, stored as rules instead of as every selected path.
+
+    Selecting a directory is a single include rule covering everything
+    below it, including files not loaded or not yet created; deselecting a
+    file or directory underneath adds an exclude rule, under which further
+    include rules may follow. The deepest rule on a path decides whether
+    it is selected. Rules repeating the verdict inherited from above are
+    never stored, so the trie only grows with the number of exceptions.
+    Files are enumerated by ``files``, which walks the disk only below
+    include rules.
+
+    Copies share the trie: each node records which selection owns it, and a
+    selection changing a node it does not own replaces it, and its
+    ancestors, by copies it owns. A copy thus costs nothing up front, and
+    each change afterwards copies at most the nodes on one path.
+    """
+
+    def __init__(self, root: str) -> None:
+        """Initialize an empty selection for a project root."""
+        self.root = os.path.realpath(root)
+        self._owner = next(_owners)
+        self._trie = _RuleNode(self._owner)
+
+    def __contains__(self, path: str) -> bool:
+        node, selected = self._trie, bool(self._trie.rule)
+        for part in self._parts(path):
+            node = node.children.get(part)
+            if node is None:
+                break
+            if node.rule is not None:
+                selected = node.rule
+        return selected
+
+    def __bool__(self) -> bool:
+        """Whether any include rule exists."""
+        return any(node.rule for _, node in self._walk_rules())
+
+    def copy(self) -> "Selection":
+        """Get an independent copy in constant time, e.g. to hand to a background thread."""
+        clone = Selection.__new__(Selection)
+        clone.root = self.root
+        clone._owner = next(_owners)
+        clone._trie = self._trie
+        # Neither side may change the shared nodes in place any more
+        self._owner = next(_owners)
+        return clone
+
+    def _own(self, node: _RuleNode) -> _RuleNode:
+        """Get a node this selection may change: the node itself, or a copy of it."""
+        if node.owner == self._owner:
+            return node
+        clone = _RuleNode(self._owner)
+        clone.rule = node.rule
+        clone.is_dir = node.is_dir
+        clone.children = dict(node.children)
+        return clone
+
+    def _own_child(self, node: _RuleNode, name: str) -> Optional[_RuleNode]:
+        """Get a child of an owned node that this selection may change, if it exists."""
+        child = node.children.get(name)
+        if child is not None and child.owner != self._owner:
+            child = node.children[name] = self._own(child)
+        return child
+
+    def _parts(self, path: str) -> List[str]:
+        """Split a path below the root into its components."""
+        if path == self.root:
+            return []
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"{path} is not below {self.root}")
+        return path[len(self.root) + 1 :].split(os.sep)
+
+    def select(self, path: str, selected: bool = True, is_dir: bool = False) -> bool:
+        """
+        Select or deselect a file or a whole directory.
+
+        Changing a directory replaces every rule below it.
+
+        Args:
+            path: Absolute path below the root
+            selected: Whether to select or deselect
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if the selection changed
+        """
+        parts = self._parts(path)
+        node = self._trie = self._own(self._trie)
+        chain = [node]
+        inherited = False
+        for part in parts:
+            if node.rule is not None:
+                inherited = node.rule
+            child = self._own_child(node, part)
+            if child is None:
+                if inherited == selected:
+                    return False
+                child = node.children[part] = _RuleNode(self._owner)
+            chain.append(child)
+            node = child
+
+        rule = None if selected == inherited else selected
+        if node.rule == rule and not (is_dir and node.children):
+            return False
+        node.rule = rule
+        node.is_dir = is_dir
+        if is_dir:
+            node.children.clear()
+        self._prune(chain, parts)
+        return True
+
+    def forget(self, path: str) -> None:
+        """Drop every rule at or below a path, e.g. after it was deleted."""
+        parts = self._parts(path)
+        if not parts:
+            self.clear()
+            return
+        chain = [self._trie]
+        for part in parts:
+            child = chain[-1].children.get(part)
+            if child is None:
+                return
+            chain.append(child)
+        # Own the path only once there is something to drop
+        chain = [self._own(self._trie)]
+        self._trie = chain[0]
+        for part in parts[:-1]:
+            chain.append(self._own_child(chain[-1], part))
+        del chain[-1].children[parts[-1]]
+        self._prune(chain, parts[:-1])
+
+    def clear(self) -> None:
+        """Deselect everything."""
+        self._trie = _RuleNode(self._owner)
+
+    def set_rules(self, rules: Iterable[Tuple[str, bool, bool]]) -> None:
+        """
+        Replace the selection with rules as returned by ``rules``.
+
+        Args:
+            rules: (path, selected, is_dir) tuples, each directory before
+                the rules below it
+        """
+        self.clear()
+        for path, selected, is_dir in rules:
+            self.select(path, selected, is_dir)
+
+    @staticmethod
+    def _prune(chain: List[_RuleNode], parts: List[str]) -> None:
+        """Remove trie nodes left without a rule or children."""
+        for depth in range(len(parts), 0, -1):
+            node = chain[depth]
+            if node.rule is not None or node.children:
+                return
+            del chain[depth - 1].children[parts[depth - 1]]
+
+    def dir_state(self, dir_path: str) -> str:
+        """Selection state of a directory: none, partial or all."""
+        node, selected = self._trie, bool(self._trie.rule)
+        for part in self._parts(dir_path):
+            node = node.children.get(part)
+            if node is None:
+                return "all" if selected else "none"
+            if node.rule is not None:
+                selected = node.rule
+        if node.children:
+            return "partial"
+        return "all" if selected else "none"
+
+    def _walk_rules(self) -> Iterator[Tuple[str, _RuleNode]]:
+        """Yield every trie node with its path, parents first."""
+        stack = [(self.root, self._trie)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            for name in sorted(node.children, reverse=True):
+                stack.append((os.path.join(path, name), node.children[name]))
+
+    def rules(self) -> List[Tuple[str, bool, bool]]:
+        """Get the rules as (path, selected, is_dir) tuples, parents first."""
+        return [
+            (path, node.rule, node.is_dir)
+            for path, node in self._walk_rules()
+            if node.rule is not None
+        ]
+
+    def entries(self) -> Dict[str, bool]:
+        """Get the outermost include rules as a mapping of path to whether it is a directory."""
+        entries: Dict[str, bool] = {}
+        stack = [(self.root, self._trie)]
+        while stack:
+            path, node = stack.pop()
+            if node.rule:
+                entries[path] = node.is_dir
+                continue
+            for name, child in node.children.items():
+                stack.append((os.path.join(path, name), child))
+        return entries
+
+    def explicit_files(self) -> List[str]:
+        """Get the files selected one by one rather than through a directory."""
+        return [path for path, selected, is_dir in self.rules() if selected and not is_dir]
+
+    def describe(self) -> str:
+        """Summarize the selection by its rules, e.g. "3 files and 1 folder selected"."""
+        files = folders = 0
+        for is_dir in self.entries().values():
+            if is_dir:
+                folders += 1
+            else:
+                files += 1
+        parts = [f"{files} file{'' if files == 1 else 's'}"]
+        if folders:
+            parts.append(f"{folders} folder{'' if folders == 1 else 's'}")
+        return " and ".join(parts) + " selected"
+
+    def measure(
+        self, path: str, measure_dir: MeasureCallback, measure_file: MeasureCallback
+    ) -> Totals:
+        """
+        Total the selected files below an include rule without enumerating them.
+
+        A directory's totals come from ``measure_dir``; the totals of the
+        excluded files and directories underneath are subtracted, and those
+        of includes nested inside exclusions are added back.
+
+        Args:
+            path: Path of an include rule, as returned by ``entries``
+            measure_dir: Returns the totals of everything below a directory
+            measure_file: Returns the totals of a single file
+
+        Returns:
+            The totals of the selected files below the path
+        """
+        node = self._trie
+        for part in self._parts(path):
+            node = node.children[part]
+        return self._measure(node, path, True, measure_dir, measure_file)
+
+    def _measure(
+        self,
+        node: _RuleNode,
+        path: str,
+        selected: bool,
+        measure_dir: MeasureCallback,
+        measure_file: MeasureCallback,
+    ) -> Totals:
+        """Total the selected files below a trie node with an inherited verdict."""
+        if node.rule is not None:
+            selected = node.rule
+        if not node.is_dir:
+            return dict(measure_file(path)) if selected else {}
+
+        totals: Totals = dict(measure_dir(path)) if selected else {}
+        for name, child in node.children.items():
+            child_path = os.path.join(path, name)
+            child_selected = self._measure(child, child_path, selected, measure_dir, measure_file)
+            if selected:
+                full = measure_dir(child_path) if child.is_dir else measure_file(child_path)
+                for key, value in full.items():
+                    totals[key] = totals.get(key, 0) - value
+            for key, value in child_selected.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def files(self, ignore: Optional[IgnoreEngine] = None, text_only: bool = True) -> Iterator[str]:
+        """
+        Enumerate the selected files that exist, in path order.
+
+        Only directories below include rules are listed; excluded subtrees
+        are skipped without being read. Ignored and pruned paths are left
+        out unless a rule names them explicitly.
+
+        Args:
+            ignore: Optional engine applying .gitignore-style rules
+            text_only: Whether to leave out files that are not text
+
+        Yields:
+            Absolute paths of the selected files
+        """
+        yield from self._files(self.root, self._trie, False, ignore, text_only)
+
+    def _files(
+        self,
+        path: str,
+        node: Optional[_RuleNode],
+        selected: bool,
+        ignore: Optional[IgnoreEngine],
+        text_only: bool,
+    ) -> Iterator[str]:
+        """Enumerate the selected files below a directory."""
+        if node is not None and node.rule is not None:
+            selected = node.rule
+        children = node.children if node is not None else {}
+
+        if not selected:
+            # Only the rules underneath can select anything; no need to list
+            for name in sorted(children):
+                child = children[name]
+                child_path = os.path.join(path, name)
+                if child.is_dir:
+                    yield from self._files(child_path, child, False, ignore, text_only)
+                elif child.rule and os.path.isfile(child_path):
+                    if not text_only or is_text_file(child_path):
+                        yield child_path
+            return
+
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            return
+        for entry in entries:
+            child = children.get(entry.name)
+            explicit = child is not None and child.rule is not None
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not explicit and (
+                        entry.name in PRUNED_DIR_NAMES
+                        or (ignore is not None and ignore.is_ignored(entry.path, True))
+                    ):
+                        continue
+                    yield from self._files(entry.path, child, True, ignore, text_only)
+                    continue
+                if not entry.is_file():
+                    continue
+                if child is not None and child.rule is False:
+                    continue
+                if not explicit and ignore is not None and ignore.is_ignored(entry.path, False):
+                    continue
+                if not text_only or is_text_file(entry.path, entry.stat()):
+                    yield entry.path
+            except OSError:
+                continue
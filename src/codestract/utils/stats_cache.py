@@ -0,0 +1,182 @@
+"""
+Persistent cache of per-file statistics, validated against file metadata.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from .constants import STATE_DIR_NAME
+from .tokens import get_token_counter
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE_NAME = "stats_cache.json"
+CACHE_VERSION = 2
+
+# (inode, size, mtime_ns, chars, lines, tokens)
+_Entry = Tuple[int, int, int, int, int, int]
+
+
+class StatsCache:
+    """
+    Cache mapping file paths to their chars/lines/size/tokens statistics.
+
+    An entry is only valid while the file's inode, size and modification time
+    are unchanged, so a stat call is enough to decide whether a file needs to
+    be read again. The cache can be persisted to the project's state directory
+    so warm starts skip reading unchanged files entirely. A store written with
+    a different tokenizer than the current one is discarded on load.
+    """
+
+    def __init__(self, root: Optional[str] = None) -> None:
+        """Initialize an empty cache, optionally bound to a project root."""
+        self.root = os.path.realpath(root) if root else None
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache_file(self) -> Optional[str]:
+        """Path of the on-disk store, or None if the cache is memory-only."""
+        if self.root is None:
+            return None
+        return os.path.join(self.root, STATE_DIR_NAME, CACHE_FILE_NAME)
+
+    def lookup(self, path: str, st: os.stat_result) -> Optional[Dict[str, int]]:
+        """
+        Return cached statistics for a file if its metadata still matches.
+
+        Args:
+            path: Absolute path of the file
+            st: Current stat result of the file
+
+        Returns:
+            Statistics dictionary, or None on a miss
+        """
+        entry = self._entries.get(path)
+        if entry is None or entry[:3] != (st.st_ino, st.st_size, st.st_mtime_ns):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"chars": entry[3], "lines": entry[4], "size": entry[1], "tokens": entry[5]}
+
+    def store(self, path: str, st: os.stat_result, stats: Dict[str, int]) -> None:
+        """
+        Record statistics computed for a file.
+
+        Stats whose size disagrees with ``st`` describe a file that changed
+        while it was being read and are not cached.
+        """
+        if stats["size"] != st.st_size:
+            return
+        entry = (
+            st.st_ino,
+            st.st_size,
+            st.st_mtime_ns,
+            stats["chars"],
+            stats["lines"],
+            stats["tokens"],
+        )
+        with self._lock:
+            if self._entries.get(path) != entry:
+                self._entries[path] = entry
+                self._dirty = True
+
+    def invalidate(self, path: str) -> None:
+        """Drop the entry for a path, if any."""
+        with self._lock:
+            if self._entries.pop(path, None) is not None:
+                self._dirty = True
+
+    def load(self) -> None:
+        """Load entries from the on-disk store, ignoring missing or stale stores."""
+        cache_file = self.cache_file
+        if cache_file is None or not os.path.isfile(cache_file):
+            return
+
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable stats cache {cache_file}: {e}")
+            return
+
+        if data.get("version") != CACHE_VERSION:
+            return
+        if data.get("tokenizer") != get_token_counter().name:
+            return
+
+        prefix = self.root + os.sep
+        entries = {}
+        for rel_path, entry in data.get("entries", {}).items():
+            path = rel_path if os.path.isabs(rel_path) else prefix + rel_path
+            entries[path] = tuple(entry)
+
+        with self._lock:
+            entries.update(self._entries)
+            self._entries = entries
+        logger.info(f"Loaded {len(entries):,} cached file stats from {cache_file}")
+
+    def save(self) -> None:
+        """Write the cache to the on-disk store if it changed since the last save."""
+        cache_file = self.cache_file
+        if cache_file is None or not self._dirty:
+            return
+
+        with self._lock:
+            snapshot = dict(self._entries)
+            self._dirty = False
+
+        # Store paths relative to the root to keep the file compact
+        prefix = self.root + os.sep
+        entries = {
+            path[len(prefix) :] if path.startswith(prefix) else path: entry
+            for path, entry in snapshot.items()
+        }
+
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f"{cache_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "version": CACHE_VERSION,
+                        "tokenizer": get_token_counter().name,
+                        "entries": entries,
+                    },
+                    f,
+                    separators=(",", ":"),
+                )
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.error(f"Error writing stats cache {cache_file}: {e}")
+            self._dirty = True
+
+
+_stats_cache = StatsCache()
+
+
+def get_stats_cache() -> StatsCache:
+    """Get the process-wide statistics cache."""
+    return _stats_cache
+
+
+def load_stats_cache(root: str) -> StatsCache:
+    """
+    Bind the process-wide cache to a project root and load its on-disk store.
+
+    Args:
+        root: Project directory whose state directory holds the store
+
+    Returns:
+        The process-wide statistics cache
+    """
+    global _stats_cache
+    _stats_cache = StatsCache(root)
+    _stats_cache.load()
+    return _stats_cache
@@ -0,0 +1,89 @@
+"""
+Token-count estimation for exported contents.
+"""
+
+import math
+from typing import Callable, Optional
+
+# Bytes deleted to isolate whitespace and punctuation in the heuristic
+_WORD_BYTES = bytes(b for b in range(256) if chr(b).isalnum() or b == ord("_") or b >= 0x80)
+_SPACE_BYTES = b" \t\r\n\f\v"
+
+# Average bytes of word-like text per token
+BYTES_PER_WORD_TOKEN = 4.0
+
+# Average tokens per punctuation byte; runs like ")):" often merge
+TOKENS_PER_PUNCTUATION = 0.5
+
+# Exact tokenizers map a decoded text fragment to its token count
+Tokenizer = Callable[[str], int]
+
+
+class TokenCounter:
+    """
+    Counts tokens chunk by chunk as files are streamed.
+
+    Without a tokenizer the count is a byte heuristic that never decodes
+    anything: word bytes are divided by ``BYTES_PER_WORD_TOKEN`` and each
+    punctuation byte adds ``TOKENS_PER_PUNCTUATION``. With a tokenizer, the
+    decoded text of every chunk is passed to it.
+    """
+
+    def __init__(self, name: str = "heuristic", tokenizer: Optional[Tokenizer] = None) -> None:
+        self.name = name
+        self.tokenizer = tokenizer
+
+    @property
+    def needs_text(self) -> bool:
+        """Whether ``count`` needs the decoded text of a chunk."""
+        return self.tokenizer is not None
+
+    def count(self, chunk: bytes, text: Optional[str] = None) -> float:
+        """
+        Count the tokens of one chunk.
+
+        The heuristic returns fractional counts so that chunk boundaries do
+        not accumulate rounding; callers round the total with ``finish``.
+        """
+        if self.tokenizer is not None:
+            return self.tokenizer(text if text is not None else chunk.decode("utf-8"))
+        other = chunk.translate(None, _WORD_BYTES)
+        punctuation = len(other.translate(None, _SPACE_BYTES))
+        words = len(chunk) - len(other)
+        return words / BYTES_PER_WORD_TOKEN + punctuation * TOKENS_PER_PUNCTUATION
+
+    @staticmethod
+    def finish(total: float) -> int:
+        """Round an accumulated count to a whole number of tokens."""
+        return math.ceil(total)
+
+
+_token_counter = TokenCounter()
+
+
+def get_token_counter() -> TokenCounter:
+    """Get the token counter used by statistics and exports."""
+    return _token_counter
+
+
+def set_tokenizer(name: str, tokenizer: Optional[Tokenizer]) -> None:
+    """
+    Plug in an exact tokenizer, or restore the byte heuristic with None.
+
+    For example, with ``tiktoken`` installed::
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        set_tokenizer("cl100k_base", lambda text: len(encoding.encode(text)))
+
+    Args:
+        name: Identifier of the tokenizer, used to invalidate cached counts
+        tokenizer: Function returning the token count of a text fragment
+    """
+    global _token_counter
+    _token_counter = TokenCounter(name if tokenizer else "heuristic", tokenizer)
+
+
+def estimate_tokens(data: bytes) -> int:
+    """Estimate the token count of a complete piece of contents."""
+    counter = get_token_counter()
+    return counter.finish(counter.count(data))
@@ -0,0 +1,142 @@
+"""
+Fast filesystem walker used by headless exports.
+"""
+
+import fnmatch
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Pattern, Tuple
+
+from .constants import PRUNED_DIR_NAMES
+from .ignore import IgnoreEngine
+
+
+def compile_globs(patterns: Iterable[str]) -> Optional[Pattern[str]]:
+    """
+    Compile glob patterns into a single regular expression.
+
+    Args:
+        patterns: Glob patterns matched against root-relative, "/"-separated paths
+
+    Returns:
+        Compiled pattern, or None if no patterns were given
+    """
+    translated = [fnmatch.translate(pattern) for pattern in patterns]
+    if not translated:
+        return None
+    return re.compile("|".join(f"(?:{regex})" for regex in translated))
+
+
+def walk_files(
+    root: str,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+    pruned_dirs: Iterable[str] = PRUNED_DIR_NAMES,
+    ignore: Optional[IgnoreEngine] = None,
+) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    Walk a directory tree with ``os.scandir``, yielding matching files.
+
+    Directories are pruned before they are listed if their name is in
+    ``pruned_dirs``, their relative path matches an exclude glob or the
+    ignore engine ignores them, so ignored subtrees cost a single directory
+    entry. Symlinked directories are not followed.
+
+    Args:
+        root: Directory to walk
+        include: Globs a file's relative path must match, if any are given
+        exclude: Globs excluding files and directories by relative path
+        pruned_dirs: Directory names that are never descended into
+        ignore: Optional engine applying .gitignore-style rules
+
+    Yields:
+        Tuples of (absolute path, stat result) for each matching regular file
+    """
+    include_re = compile_globs(include)
+    exclude_re = compile_globs(exclude)
+    pruned = frozenset(pruned_dirs)
+
+    root = os.path.abspath(root)
+    stack: List[Tuple[str, str]] = [(root, "")]
+
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}{entry.name}"
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in pruned:
+                        continue
+                    if exclude_re is not None and (
+                        exclude_re.match(rel_path) or exclude_re.match(rel_path + "/")
+                    ):
+                        continue
+                    if ignore is not None and ignore.is_ignored(entry.path, True):
+                        continue
+                    subdirs.append((entry.path, rel_path + "/"))
+                    continue
+
+                if not entry.is_file():
+                    continue
+                if include_re is not None and not include_re.match(rel_path):
+                    continue
+                if exclude_re is not None and exclude_re.match(rel_path):
+                    continue
+                if ignore is not None and ignore.is_ignored(entry.path, False):
+                    continue
+                yield entry.path, entry.stat()
+            except OSError:
+                continue
+
+        stack.extend(subdirs)
+
+
+def filter_paths(
+    paths: Iterable[str],
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+    pruned_dirs: Iterable[str] = PRUNED_DIR_NAMES,
+) -> Iterator[str]:
+    """
+    Filter relative file paths, e.g. listed by git, the way ``walk_files`` would.
+
+    Args:
+        paths: Relative, "/"-separated file paths
+        include: Globs a path must match, if any are given
+        exclude: Globs excluding files and directories by relative path
+        pruned_dirs: Directory names whose files are left out
+
+    Yields:
+        The paths that ``walk_files`` would have yielded
+    """
+    include_re = compile_globs(include)
+    exclude_re = compile_globs(exclude)
+    pruned = frozenset(pruned_dirs)
+
+    for path in paths:
+        dir_names = path.split("/")[:-1]
+        if pruned.intersection(dir_names):
+            continue
+        if include_re is not None and not include_re.match(path):
+            continue
+        if exclude_re is not None:
+            if exclude_re.match(path):
+                continue
+            rel_dir = ""
+            excluded = False
+            for name in dir_names:
+                rel_dir = f"{rel_dir}{name}"
+                if exclude_re.match(rel_dir) or exclude_re.match(rel_dir + "/"):
+                    excluded = True
+                    break
+                rel_dir += "/"
+            if excluded:
+                continue
+        yield path
@@ -0,0 +1,390 @@
+"""
+Filesystem watcher reporting changed paths below a project root.
+
+Uses inotify through ctypes on Linux and falls back to polling elsewhere,
+or when the inotify watch limit is reached.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .constants import PRUNED_DIR_NAMES
+from .ignore import IGNORE_FILE_NAMES, IgnoreEngine
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two polls of the polling backend
+POLL_INTERVAL = 1.0
+
+# Seconds without new events before a batch of changes is reported
+SETTLE_DELAY = 0.2
+
+# Longest a batch is held back while events keep arriving
+MAX_BATCH_DELAY = 2.0
+
+# Called with the paths that changed and the subset of them that were created or deleted
+ChangeCallback = Callable[[Set[str], Set[str]], None]
+
+# inotify constants from <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+_STRUCTURE_MASK = _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE_SELF
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _watched_dirs(root: str, ignore: Optional[IgnoreEngine]) -> Iterable[str]:
+    """Yield the directories below (and including) a root that are not pruned."""
+    stack = [root]
+    while stack:
+        dir_path = stack.pop()
+        yield dir_path
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if not entry.is_dir(follow_symlinks=False) or entry.name in PRUNED_DIR_NAMES:
+                        continue
+                    if ignore is not None and ignore.is_ignored(entry.path, True):
+                        continue
+                    stack.append(entry.path)
+        except OSError:
+            continue
+
+
+class _InotifyBackend:
+    """Watches every directory of a tree with one inotify instance."""
+
+    name = "inotify"
+
+    def __init__(self, root: str, ignore: Optional[IgnoreEngine]) -> None:
+        """
+        Create the inotify instance and watch the tree.
+
+        Raises:
+            OSError: If inotify is unavailable or the watch limit is reached
+        """
+        library = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(library or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._libc = libc
+        self._ignore = ignore
+        self._dirs: Dict[int, str] = {}
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            self._watch_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch_tree(self, root: str) -> List[str]:
+        """Add watches for a directory and all its unpruned subdirectories."""
+        watched = []
+        for dir_path in _watched_dirs(root, self._ignore):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dir_path), _WATCH_MASK)
+            if wd >= 0:
+                self._dirs[wd] = dir_path
+                watched.append(dir_path)
+                continue
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                raise OSError(error, "inotify watch limit reached")
+            # The directory vanished or is unreadable; nothing to watch
+        return watched
+
+    def read(self, timeout: float, changed: Set[str], structural: Set[str]) -> None:
+        """
+        Wait up to ``timeout`` seconds and collect the paths events were reported for.
+
+        Args:
+            timeout: Seconds to wait for the first event
+            changed: Set receiving every reported path
+            structural: Set receiving the paths that were created or deleted
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+
+                if mask & _IN_Q_OVERFLOW:
+                    # Events were lost; report every watched directory
+                    changed.update(self._dirs.values())
+                    structural.update(self._dirs.values())
+                    continue
+                dir_path = self._dirs.get(wd)
+                if dir_path is None:
+                    continue
+                if mask & _IN_IGNORED:
+                    del self._dirs[wd]
+                    continue
+
+                path = os.path.join(dir_path, os.fsdecode(name)) if name else dir_path
+                if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                    if self._ignore is None or not self._ignore.is_ignored(path, True):
+                        try:
+                            new_dirs = self._watch_tree(path)
+                        except OSError as e:
+                            logger.warning(f"Not watching {path}: {e}")
+                            new_dirs = []
+                        # Entries created before the watches were added raised no events
+                        for new_dir in new_dirs:
+                            try:
+                                entries = [os.path.join(new_dir, n) for n in os.listdir(new_dir)]
+                            except OSError:
+                                continue
+                            changed.update(entries)
+                            structural.update(entries)
+                changed.add(path)
+                if mask & _STRUCTURE_MASK:
+                    structural.add(path)
+
+    def close(self) -> None:
+        """Release the inotify instance."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class _PollingBackend:
+    """
+    Detects changes by polling directory modification times and chosen files.
+
+    A directory's mtime changes whenever an entry is created, deleted or
+    renamed in it, so only directories whose mtime moved are listed again.
+    File contents are compared by stat data for the files of interest only,
+    keeping each poll proportional to the number of directories plus the
+    size of the selection.
+    """
+
+    name = "polling"
+
+    def __init__(
+        self,
+        root: str,
+        ignore: Optional[IgnoreEngine],
+        interest: Optional[Callable[[], Iterable[str]]],
+        stopped: threading.Event,
+        interval: float = POLL_INTERVAL,
+    ) -> None:
+        self._ignore = ignore
+        self._interest = interest
+        self._stopped = stopped
+        self.interval = interval
+        self._dirs: Dict[str, Tuple[int, frozenset]] = {}
+        self._files: Dict[str, Tuple[int, int, int]] = {}
+        for dir_path in _watched_dirs(root, ignore):
+            self._list_dir(dir_path)
+
+    def _list_dir(self, dir_path: str) -> Optional[frozenset]:
+        """Record a directory's mtime and entry names."""
+        try:
+            mtime = os.stat(dir_path).st_mtime_ns
+            names = frozenset(os.listdir(dir_path))
+        except OSError:
+            self._dirs.pop(dir_path, None)
+            return None
+        self._dirs[dir_path] = (mtime, names)
+        return names
+
+    def read(self, timeout: float, changed: Set[str], structural: Set[str]) -> None:
+        """Wait for the next poll and collect the paths that changed since the last one."""
+        if self._stopped.wait(min(timeout, self.interval)):
+            return
+
+        for dir_path, (mtime, names) in list(self._dirs.items()):
+            try:
+                current = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                current = None
+            if current == mtime:
+                continue
+            new_names = self._list_dir(dir_path)
+            if new_names is None:
+                changed.add(dir_path)
+                structural.add(dir_path)
+                prefix = dir_path + os.sep
+                for sub_dir in [d for d in self._dirs if d.startswith(prefix)]:
+                    del self._dirs[sub_dir]
+                continue
+            for name in names ^ new_names:
+                path = os.path.join(dir_path, name)
+                changed.add(path)
+                structural.add(path)
+                if name in new_names and name not in PRUNED_DIR_NAMES and os.path.isdir(path):
+                    if self._ignore is None or not self._ignore.is_ignored(path, True):
+                        for sub_dir in _watched_dirs(path, self._ignore):
+                            self._list_dir(sub_dir)
+
+        if self._interest is not None:
+            seen = set()
+            for path in list(self._interest()):
+                seen.add(path)
+                try:
+                    st = os.stat(path)
+                    signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+                except OSError:
+                    signature = None
+                previous = self._files.get(path)
+                if signature is None:
+                    self._files.pop(path, None)
+                else:
+                    self._files[path] = signature
+                if previous is not None and previous != signature:
+                    changed.add(path)
+            for path in [p for p in self._files if p not in seen]:
+                del self._files[path]
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+class FileWatcher:
+    """
+    Reports batches of changed paths below a root from a background thread.
+
+    Events are coalesced: a batch is delivered once no new event arrived
+    for ``SETTLE_DELAY`` seconds, or after ``MAX_BATCH_DELAY`` while events
+    keep coming, so an editor's save or a ``git checkout`` produces one
+    callback. Paths ignored by the ignore engine are never reported.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        on_change: ChangeCallback,
+        ignore: Optional[IgnoreEngine] = None,
+        interest: Optional[Callable[[], Iterable[str]]] = None,
+        force_polling: bool = False,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        """
+        Initialize the watcher.
+
+        Args:
+            root: Directory to watch
+            on_change: Callback receiving each batch, called on the watcher thread
+            ignore: Optional engine applying .gitignore-style rules, used only
+                by the watcher thread
+            interest: Callable returning the files whose contents the polling
+                backend should compare; inotify reports every file
+            force_polling: Whether to poll even where inotify is available
+            poll_interval: Seconds between polls of the polling backend
+        """
+        self.root = os.path.realpath(root)
+        self.on_change = on_change
+        self.ignore = ignore
+        self.interest = interest
+        self.force_polling = force_polling
+        self.poll_interval = poll_interval
+        self.backend_name = ""
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start watching in a daemon thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="codestract-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching and wait for the thread to exit."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _create_backend(self):
+        """Set up inotify, falling back to polling when it cannot be used."""
+        if not self.force_polling:
+            try:
+                return _InotifyBackend(self.root, self.ignore)
+            except OSError as e:
+                logger.info(f"Falling back to polling for file changes: {e}")
+        return _PollingBackend(
+            self.root, self.ignore, self.interest, self._stopped, self.poll_interval
+        )
+
+    def _run(self) -> None:
+        """Collect events and deliver coalesced batches until stopped."""
+        backend = self._create_backend()
+        self.backend_name = backend.name
+        logger.info(f"Watching {self.root} for changes ({backend.name})")
+        pending: Set[str] = set()
+        structural: Set[str] = set()
+        first_event = last_event = 0.0
+
+        try:
+            while not self._stopped.is_set():
+                count = len(pending)
+                backend.read(SETTLE_DELAY if pending else 0.5, pending, structural)
+                now = time.monotonic()
+                if len(pending) > count:
+                    if not count:
+                        first_event = now
+                    last_event = now
+                if pending and (
+                    now - last_event >= SETTLE_DELAY or now - first_event >= MAX_BATCH_DELAY
+                ):
+                    batch = self._filter(pending)
+                    if batch:
+                        self.on_change(batch, structural & batch)
+                    pending, structural = set(), set()
+        except Exception as e:
+            logger.error(f"File watcher stopped: {e}")
+        finally:
+            backend.close()
+
+    def _filter(self, paths: Set[str]) -> Set[str]:
+        """Drop paths the ignore engine ignores, reloading rules whose files changed."""
+        if self.ignore is None:
+            return paths
+        for path in paths:
+            if os.path.basename(path) in IGNORE_FILE_NAMES:
+                self.ignore.invalidate(os.path.dirname(path))
+        kept: Set[str] = set()
+        for path in paths:
+            if not path.startswith(self.root + os.sep) or not self.ignore.is_path_ignored(path):
+                kept.add(path)
+        return kept